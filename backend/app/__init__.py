@@ -25,6 +25,9 @@ def make_celery(app: Flask):
         backend=app.config.get('CELERY_BACKEND'),
     )
     celery.conf.update(app.config)
+    celery.conf.beat_schedule = {
+        'email-digests': {'task': 'app.tasks.send_digests', 'schedule': float(app.config.get('DIGEST_INTERVAL', 300))},
+    }
 
     class ContextTask(celery.Task):
         def __call__(self, *args, **kwargs):
@@ -41,6 +44,34 @@ def create_app(config_object=None):
         SECRET_KEY=os.environ.get('SECRET_KEY', 'dev'),
         SQLALCHEMY_DATABASE_URI=os.environ.get('DATABASE_URL', 'sqlite:///data.db'),
         SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        VIEW_COUNT_FLUSH_INTERVAL=float(os.environ.get('VIEW_COUNT_FLUSH_INTERVAL', 10)),
+        HTTP_CACHE_MAX_AGE=int(os.environ.get('HTTP_CACHE_MAX_AGE', 60)),
+        TRENDING_HALF_LIFE_HOURS=float(os.environ.get('TRENDING_HALF_LIFE_HOURS', 6)),
+        TRENDING_SNAPSHOT_INTERVAL=float(os.environ.get('TRENDING_SNAPSHOT_INTERVAL', 60)),
+        MENTOR_LOAD_TTL=float(os.environ.get('MENTOR_LOAD_TTL', 60)),
+        BCRYPT_ROUNDS=int(os.environ.get('BCRYPT_ROUNDS', 12)),
+        PASSWORD_HASH_WORKERS=int(os.environ.get('PASSWORD_HASH_WORKERS', 1)),
+        PASSWORD_HASH_MAX_PENDING=int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 4)),
+        PASSWORD_HASH_TIMEOUT=float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10)),
+        AUTH_TOKEN_SWEEP_INTERVAL=float(os.environ.get('AUTH_TOKEN_SWEEP_INTERVAL', 3600)),
+        TOKEN_VERSION_TTL=float(os.environ.get('TOKEN_VERSION_TTL', 30)),
+        TOKEN_VERSION_REDIS_URL=os.environ.get('TOKEN_VERSION_REDIS_URL'),
+        NOTIFICATION_STREAM_REDIS_URL=os.environ.get('NOTIFICATION_STREAM_REDIS_URL'),
+        NOTIFICATION_STREAM_KEEPALIVE=float(os.environ.get('NOTIFICATION_STREAM_KEEPALIVE', 15)),
+        NOTIFICATION_STREAM_MAX_SECONDS=float(os.environ.get('NOTIFICATION_STREAM_MAX_SECONDS', 300)),
+        NOTIFICATION_STREAM_MAX_CONNECTIONS=int(os.environ.get('NOTIFICATION_STREAM_MAX_CONNECTIONS', 4)),
+        BACKGROUND_TASKS_ENABLED=os.environ.get('BACKGROUND_TASKS_ENABLED', '1') != '0',
+        EMAIL_TEMPLATE_CACHE_DIR=os.environ.get('EMAIL_TEMPLATE_CACHE_DIR'),
+        DIGEST_INTERVAL=float(os.environ.get('DIGEST_INTERVAL', 300)),
+        SMS_PROVIDER=os.environ.get('SMS_PROVIDER'),
+        SMS_CONCURRENCY=int(os.environ.get('SMS_CONCURRENCY', 8)),
+        SMS_RATE_LIMIT=float(os.environ.get('SMS_RATE_LIMIT', 0)),
+        OUTBOX_RELAY_INTERVAL=float(os.environ.get('OUTBOX_RELAY_INTERVAL', 1)),
+        OUTBOX_BATCH_SIZE=int(os.environ.get('OUTBOX_BATCH_SIZE', 100)),
+        OUTBOX_MAX_ATTEMPTS=int(os.environ.get('OUTBOX_MAX_ATTEMPTS', 10)),
+        TASK_EXECUTOR_WORKERS=int(os.environ.get('TASK_EXECUTOR_WORKERS', 2)),
+        TASK_EXECUTOR_MAX_QUEUE=int(os.environ.get('TASK_EXECUTOR_MAX_QUEUE', 1000)),
+        TASK_EXECUTOR_DRAIN_TIMEOUT=float(os.environ.get('TASK_EXECUTOR_DRAIN_TIMEOUT', 20)),
     )
 
     if config_object:
@@ -53,6 +84,22 @@ def create_app(config_object=None):
     limiter.init_app(app)
     CORS(app, resources={r"/*": {"origins": "*"}})
 
+    from . import background, view_counter, trending, mentor_directory, passwords, request_auth, auth_tokens, token_revocation, notification_stream, email_templates, mailer, digests, sms, outbox
+    background.init_app(app)
+    passwords.init_app(app)
+    token_revocation.init_app(app)
+    request_auth.init_app(app)
+    auth_tokens.init_app(app)
+    notification_stream.init_app(app)
+    email_templates.init_app(app)
+    mailer.init_app(app)
+    digests.init_app(app)
+    sms.init_app(app)
+    outbox.init_app(app)
+    view_counter.init_app(app)
+    trending.init_app(app)
+    mentor_directory.init_app(app)
+
     # register blueprints
     from .routes.auth import auth_bp
     from .routes.users import users_bp
@@ -63,6 +110,7 @@ def create_app(config_object=None):
     from .routes.analytics import analytics_bp
     from .routes.mentors import mentors_bp
     from .routes.admin import admin_bp
+    from .routes.sessions import sessions_bp
     
     # Import API health routes (direct routes, not blueprints)
     from .routes import api_health
@@ -76,6 +124,7 @@ def create_app(config_object=None):
     app.register_blueprint(analytics_bp, url_prefix='/analytics')
     app.register_blueprint(mentors_bp, url_prefix='/mentors')
     app.register_blueprint(admin_bp, url_prefix='/admin')
+    app.register_blueprint(sessions_bp, url_prefix='/sessions')
 
     # create celery instance attached to app for tasks (only if broker configured)
     broker = app.config.get('CELERY_BROKER_URL')
@@ -86,11 +135,10 @@ def create_app(config_object=None):
         except Exception:
             app.logger.exception('failed to register celery tasks')
     else:
-        # attach a dummy celery-like object with send_task to avoid broker errors in tests
-        class DummyCelery:
-            def send_task(self, *args, **kwargs):
-                app.logger.debug('dummy send_task called', args)
-        app.celery = DummyCelery()
+        # no broker: run the same tasks on a thread pool inside this worker
+        from . import executor
+        app.celery = executor.init_app(app)
+        register_tasks(app.celery, app)
 
     # admin UI (optional)
     enable_admin = app.config.get('ENABLE_ADMIN') or os.environ.get('ENABLE_ADMIN') == '1'
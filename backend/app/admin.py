@@ -1,22 +1,12 @@
 from flask_admin import Admin, expose, AdminIndexView
 from flask_admin.contrib.sqla import ModelView
-from flask import current_app, request, redirect, url_for, jsonify, session
-import jwt
+from flask import current_app, redirect, url_for, jsonify, session
+from .request_auth import current_claims
 
 
 def _get_payload():
     # Support Authorization header or admin_token cookie for browser admin sessions
-    auth = request.headers.get('Authorization', '')
-    token = None
-    if auth.startswith('Bearer '):
-        token = auth.split(' ', 1)[1]
-    else:
-        token = request.cookies.get('admin_token')
-    secret = current_app.config.get('JWT_SECRET') or current_app.config.get('SECRET_KEY')
-    try:
-        return jwt.decode(token, secret, algorithms=['HS256'])
-    except Exception:
-        return None
+    return current_claims(cookie='admin_token')
 
 
 class SecureAdminIndexView(AdminIndexView):
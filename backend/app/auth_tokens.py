@@ -0,0 +1,97 @@
+"""Opaque refresh, password-reset and email-verification tokens.
+
+Only the SHA-256 digest of a token is stored, in ``auth_tokens`` under a unique index,
+so a lookup is one index probe and a leaked table does not leak usable tokens. A user
+may hold any number of refresh tokens (one per signed-in device) but only the latest
+reset and verification token. Expired rows are deleted in batches by a background
+sweeper.
+"""
+import hashlib
+import secrets
+from datetime import datetime, timedelta, timezone
+
+from . import db
+from .background import schedule
+from .models import AuthToken
+
+REFRESH = 'refresh'
+RESET = 'reset'
+VERIFY = 'verify'
+
+LIFETIMES = {
+    REFRESH: timedelta(days=30),
+    RESET: timedelta(hours=2),
+    VERIFY: timedelta(days=2),
+}
+# token types of which a user holds at most one at a time
+SINGLE_USE = (RESET, VERIFY)
+
+
+def digest(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def issue(user_id, token_type, nbytes=32):
+    """Create a token for ``user_id`` and return it. Does not commit."""
+    if token_type in SINGLE_USE:
+        revoke(user_id, token_type)
+    token = secrets.token_urlsafe(nbytes)
+    db.session.add(AuthToken(
+        user_id=user_id,
+        token_type=token_type,
+        digest=digest(token),
+        expires_at=datetime.now(timezone.utc) + LIFETIMES[token_type],
+    ))
+    return token
+
+
+def lookup(token, token_type):
+    """The live AuthToken row for ``token``, or None if unknown, of another type or expired."""
+    if not token or not isinstance(token, str):
+        return None
+    return AuthToken.query.filter(
+        AuthToken.digest == digest(token),
+        AuthToken.token_type == token_type,
+        AuthToken.expires_at > datetime.now(timezone.utc),
+    ).first()
+
+
+def consume(token, token_type):
+    """Look up and delete ``token``; returns the owning user_id or None. Does not commit."""
+    row = lookup(token, token_type)
+    if row is None:
+        return None
+    table = AuthToken.__table__
+    # the delete is the claim: of two concurrent uses only one sees a row go away
+    deleted = db.session.execute(table.delete().where(table.c.id == row.id)).rowcount
+    db.session.expunge(row)
+    return row.user_id if deleted else None
+
+
+def revoke(user_id, token_type=None):
+    """Delete the user's tokens (of one type, or all). Does not commit."""
+    table = AuthToken.__table__
+    stmt = table.delete().where(table.c.user_id == user_id)
+    if token_type:
+        stmt = stmt.where(table.c.token_type == token_type)
+    return db.session.execute(stmt).rowcount
+
+
+def sweep(batch_size=1000, now=None):
+    """Delete expired tokens ``batch_size`` at a time, committing each batch."""
+    now = now or datetime.now(timezone.utc)
+    table = AuthToken.__table__
+    total = 0
+    while True:
+        ids = [i for (i,) in db.session.query(AuthToken.id).filter(AuthToken.expires_at <= now).limit(batch_size)]
+        if not ids:
+            return total
+        db.session.execute(table.delete().where(table.c.id.in_(ids)))
+        db.session.commit()
+        total += len(ids)
+
+
+def init_app(app):
+    batch_size = int(app.config.get('AUTH_TOKEN_SWEEP_BATCH', 1000))
+    schedule(app, 'auth-token-sweep', app.config.get('AUTH_TOKEN_SWEEP_INTERVAL', 3600),
+             lambda: sweep(batch_size))
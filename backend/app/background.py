@@ -0,0 +1,92 @@
+import atexit
+import threading
+
+
+class PeriodicTask:
+    """Run ``func`` every ``interval`` seconds on a daemon thread inside an app context.
+
+    ``wake()`` runs it early, e.g. as soon as there is new work.
+    """
+
+    def __init__(self, app, name, interval, func, run_at_exit=False):
+        self.app = app
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.run_at_exit = run_at_exit
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def run_once(self):
+        with self.app.app_context():
+            try:
+                return self.func()
+            except Exception:
+                self.app.logger.exception('background task %s failed', self.name)
+
+    def _loop(self):
+        while True:
+            self._wake.wait(self.interval)
+            if self._stop.is_set():
+                return
+            self._wake.clear()
+            self.run_once()
+
+    def wake(self):
+        self._wake.set()
+
+    def start(self):
+        if self._thread is not None or not self.interval or self.interval <= 0:
+            return
+        self._thread = threading.Thread(target=self._loop, name=f'bg-{self.name}', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        self._thread = None
+        if self.run_at_exit:
+            self.run_once()
+
+
+def schedule(app, name, interval, func, run_at_exit=False):
+    """Register a periodic task; it is started on the first request of the worker."""
+    tasks = app.extensions.setdefault('background_tasks', {})
+    task = PeriodicTask(app, name, interval, func, run_at_exit=run_at_exit)
+    tasks[name] = task
+    return task
+
+
+def start_all(app):
+    for task in app.extensions.get('background_tasks', {}).values():
+        task.start()
+
+
+def stop_all(app):
+    for task in app.extensions.get('background_tasks', {}).values():
+        task.stop()
+
+
+def init_app(app):
+    # Threads are started lazily so each gunicorn worker owns its own after the fork,
+    # and so tests (app.testing) and CLI commands never spin them up.
+    state = {'started': False}
+    lock = threading.Lock()
+
+    @app.before_request
+    def _start_background_tasks():
+        if state['started']:
+            return
+        with lock:
+            if state['started']:
+                return
+            state['started'] = True
+            if app.testing or not app.config.get('BACKGROUND_TASKS_ENABLED', True):
+                return
+            start_all(app)
+
+    atexit.register(stop_all, app)
@@ -0,0 +1,118 @@
+"""Full-text search over published blog posts.
+
+The index lives in two ordinary tables (``search_postings`` and ``search_documents``)
+so it works the same on SQLite, MySQL and Postgres. Postings are rewritten whenever a
+post changes status and the whole index can be rebuilt from ``blog_posts`` in batches.
+Ranking is Okapi BM25 computed in Python over the postings of the query terms.
+"""
+import heapq
+import math
+import re
+from collections import Counter
+
+from sqlalchemy import func
+
+from . import db
+from .models import BlogPost, SearchDocument, SearchPosting
+
+TOKEN_RE = re.compile(r'[^\W_]+', re.UNICODE)
+STOPWORDS = frozenset(
+    'a an and are as at be but by for from has have he her his i if in into is it its '
+    'me my no not of on or our she so that the their them there they this to was we '
+    'were what when which who will with you your'.split()
+)
+MAX_TERM_LENGTH = 64
+TITLE_WEIGHT = 2
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text):
+    if not text:
+        return []
+    return [
+        t[:MAX_TERM_LENGTH]
+        for t in TOKEN_RE.findall(text.lower())
+        if len(t) > 1 and t not in STOPWORDS
+    ]
+
+
+def document_terms(title, content, tags):
+    counts = Counter(tokenize(content))
+    counts.update(tokenize(tags))
+    for term in tokenize(title):
+        counts[term] += TITLE_WEIGHT
+    return counts
+
+
+def _insert(rows):
+    docs, postings = [], []
+    for post_id, counts in rows:
+        if not counts:
+            continue
+        docs.append({'post_id': post_id, 'length': sum(counts.values())})
+        postings.extend({'term': term, 'post_id': post_id, 'tf': tf} for term, tf in counts.items())
+    if docs:
+        db.session.execute(SearchDocument.__table__.insert(), docs)
+        db.session.execute(SearchPosting.__table__.insert(), postings)
+
+
+def remove_post(post_id):
+    db.session.execute(SearchPosting.__table__.delete().where(SearchPosting.post_id == post_id))
+    db.session.execute(SearchDocument.__table__.delete().where(SearchDocument.post_id == post_id))
+
+
+def index_post(post):
+    """Bring the index in line with ``post``; call before the status change is committed."""
+    remove_post(post.post_id)
+    if post.status == 'published':
+        _insert([(post.post_id, document_terms(post.title, post.content, post.tags))])
+
+
+def rebuild_index(batch_size=500):
+    """Drop and rebuild the whole index from the published posts, one batch per commit."""
+    db.session.execute(SearchPosting.__table__.delete())
+    db.session.execute(SearchDocument.__table__.delete())
+    db.session.commit()
+    total = 0
+    last_id = 0
+    while True:
+        rows = (
+            db.session.query(BlogPost.post_id, BlogPost.title, BlogPost.content, BlogPost.tags)
+            .filter(BlogPost.status == 'published', BlogPost.post_id > last_id)
+            .order_by(BlogPost.post_id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+        _insert([(r.post_id, document_terms(r.title, r.content, r.tags)) for r in rows])
+        db.session.commit()
+        total += len(rows)
+        last_id = rows[-1].post_id
+    return total
+
+
+def search(query, limit=20):
+    """Return ``[(post_id, score), ...]`` for the best ``limit`` matches, best first."""
+    terms = set(tokenize(query))
+    if not terms:
+        return []
+    n_docs, avg_length = db.session.query(func.count(SearchDocument.post_id), func.avg(SearchDocument.length)).one()
+    if not n_docs:
+        return []
+    avg_length = float(avg_length or 1)
+
+    rows = (
+        db.session.query(SearchPosting.term, SearchPosting.post_id, SearchPosting.tf, SearchDocument.length)
+        .join(SearchDocument, SearchDocument.post_id == SearchPosting.post_id)
+        .filter(SearchPosting.term.in_(terms))
+        .all()
+    )
+    df = Counter(r.term for r in rows)
+    scores = Counter()
+    for r in rows:
+        idf = math.log(1 + (n_docs - df[r.term] + 0.5) / (df[r.term] + 0.5))
+        norm = r.tf + K1 * (1 - B + B * r.length / avg_length)
+        scores[r.post_id] += idf * r.tf * (K1 + 1) / norm
+    return heapq.nlargest(limit, scores.items(), key=lambda kv: (kv[1], kv[0]))
@@ -0,0 +1,105 @@
+"""Normalized blog tags.
+
+``BlogPost.tags`` keeps the canonical comma-separated form for existing clients, while
+``tags``/``blog_post_tags`` hold the indexed association. ``Tag.post_count`` counts
+published posts only and is adjusted in place whenever a post's tags or status change.
+"""
+import re
+
+from . import db
+from .models import BlogPost, BlogPostTag, Tag
+
+MAX_TAG_LENGTH = 64
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_tags(raw):
+    """Accept a list or a comma-separated string; return unique, lower-cased tag names."""
+    if not raw:
+        return []
+    parts = raw if isinstance(raw, (list, tuple)) else str(raw).split(',')
+    out = []
+    for part in parts:
+        name = _SPACES.sub(' ', str(part)).strip().lower()[:MAX_TAG_LENGTH]
+        if name and name not in out:
+            out.append(name)
+    return out
+
+
+def _adjust_counts(tag_ids, delta):
+    if not tag_ids or not delta:
+        return
+    table = Tag.__table__
+    db.session.execute(
+        table.update().where(table.c.tag_id.in_(list(tag_ids))).values(post_count=table.c.post_count + delta)
+    )
+
+
+def _get_or_create(names):
+    existing = {t.name: t.tag_id for t in db.session.query(Tag.name, Tag.tag_id).filter(Tag.name.in_(names))}
+    missing = [n for n in names if n not in existing]
+    if missing:
+        db.session.execute(Tag.__table__.insert(), [{'name': n, 'post_count': 0} for n in missing])
+        existing.update({t.name: t.tag_id for t in db.session.query(Tag.name, Tag.tag_id).filter(Tag.name.in_(missing))})
+    return existing
+
+
+def post_tag_ids(post_id):
+    return {r.tag_id for r in db.session.query(BlogPostTag.tag_id).filter(BlogPostTag.post_id == post_id)}
+
+
+def set_post_tags(post, names):
+    """Replace the tags of a flushed ``post``; call before the commit."""
+    names = normalize_tags(names)
+    wanted = set(_get_or_create(names).values()) if names else set()
+    current = post_tag_ids(post.post_id)
+    added, removed = wanted - current, current - wanted
+    table = BlogPostTag.__table__
+    if added:
+        db.session.execute(table.insert(), [{'post_id': post.post_id, 'tag_id': t} for t in added])
+    if removed:
+        db.session.execute(table.delete().where(table.c.post_id == post.post_id, table.c.tag_id.in_(list(removed))))
+    if post.status == 'published':
+        _adjust_counts(added, 1)
+        _adjust_counts(removed, -1)
+    canonical = ','.join(names) or None
+    if post.tags != canonical:
+        post.tags = canonical
+
+
+def status_changed(post, old_status):
+    """Move the post's tags in or out of the published counts after a status change."""
+    was, now = old_status == 'published', post.status == 'published'
+    if was != now:
+        _adjust_counts(post_tag_ids(post.post_id), 1 if now else -1)
+
+
+def tag_cloud(limit=100):
+    rows = (
+        db.session.query(Tag.name, Tag.post_count)
+        .filter(Tag.post_count > 0)
+        .order_by(Tag.post_count.desc(), Tag.name)
+        .limit(limit)
+    )
+    return [{'tag': r.name, 'count': r.post_count} for r in rows]
+
+
+def backfill(batch_size=500):
+    """Populate the association from the legacy comma-separated column, one batch per commit."""
+    total = 0
+    last_id = 0
+    while True:
+        posts = (
+            BlogPost.query.filter(BlogPost.post_id > last_id)
+            .order_by(BlogPost.post_id)
+            .limit(batch_size)
+            .all()
+        )
+        if not posts:
+            break
+        for post in posts:
+            set_post_tags(post, post.tags)
+        db.session.commit()
+        total += len(posts)
+        last_id = posts[-1].post_id
+    return total
@@ -0,0 +1,192 @@
+"""Mentorship session booking.
+
+A mentor's active sessions never overlap, so ordered by ``start_at`` their ends are
+ordered too. That makes conflict detection a predecessor lookup: only the last active
+session starting before the requested end can overlap it. ``IntervalIndex`` does this
+with bisect in memory, and ``find_conflict`` does the same against the
+``(mentor_id, start_at)`` index.
+
+Concurrent bookings for one mentor are serialized by a no-op UPDATE of the mentor row,
+issued as the first statement of the booking transaction. That is a row lock on
+MySQL/Postgres and the database write lock on SQLite, so the check-then-insert below it
+cannot interleave with another booking.
+"""
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+
+from . import db
+from .models import Mentor, MentorshipSession
+
+ACTIVE_STATUSES = ('pending', 'confirmed')
+MAX_SESSION_LENGTH = timedelta(hours=4)
+
+
+class BookingError(Exception):
+    pass
+
+
+class BookingConflict(BookingError):
+    def __init__(self, session):
+        super().__init__('slot overlaps an existing session')
+        self.session = session
+
+
+def as_utc(dt):
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def parse_datetime(value):
+    """Parse an ISO 8601 string (``Z`` allowed); naive values are taken as UTC."""
+    if not value:
+        raise ValueError('datetime required')
+    return as_utc(datetime.fromisoformat(str(value).replace('Z', '+00:00')))
+
+
+class IntervalIndex:
+    """Sorted, non-overlapping half-open intervals with O(log n) overlap checks."""
+
+    def __init__(self, intervals=()):
+        self._starts = []
+        self._ends = []
+        for start, end in sorted(intervals):
+            self.add(start, end)
+
+    def __len__(self):
+        return len(self._starts)
+
+    def conflict(self, start, end):
+        """Return the interval overlapping ``[start, end)``, or None."""
+        i = bisect_left(self._starts, end) - 1
+        if i >= 0 and self._ends[i] > start:
+            return self._starts[i], self._ends[i]
+        return None
+
+    def add(self, start, end):
+        if self.conflict(start, end):
+            raise ValueError('interval overlaps an existing one')
+        i = bisect_right(self._starts, start)
+        self._starts.insert(i, start)
+        self._ends.insert(i, end)
+
+    def free_windows(self, range_start, range_end, min_length=None):
+        """Gaps between intervals inside ``[range_start, range_end)``."""
+        windows = []
+        cursor = range_start
+        i = max(bisect_left(self._starts, range_start) - 1, 0)
+        while i < len(self._starts) and self._starts[i] < range_end:
+            if self._ends[i] > cursor:
+                if self._starts[i] > cursor:
+                    windows.append((cursor, self._starts[i]))
+                cursor = self._ends[i]
+            i += 1
+        if cursor < range_end:
+            windows.append((cursor, range_end))
+        if min_length:
+            windows = [(s, e) for s, e in windows if e - s >= min_length]
+        return windows
+
+
+def lock_mentor(mentor_id):
+    """Take the per-mentor booking lock; returns False if the mentor does not exist."""
+    table = Mentor.__table__
+    result = db.session.execute(
+        table.update().where(table.c.mentor_id == mentor_id).values(availability_status=table.c.availability_status)
+    )
+    return result.rowcount > 0
+
+
+def find_conflict(mentor_id, start, end):
+    candidate = (
+        MentorshipSession.query
+        .filter(
+            MentorshipSession.mentor_id == mentor_id,
+            MentorshipSession.status.in_(ACTIVE_STATUSES),
+            MentorshipSession.start_at < end,
+        )
+        .order_by(MentorshipSession.start_at.desc())
+        .first()
+    )
+    if candidate is not None and as_utc(candidate.end_at) > start:
+        return candidate
+    return None
+
+
+def busy_index(mentor_id, range_start, range_end):
+    """IntervalIndex of the mentor's active sessions touching ``[range_start, range_end)``."""
+    rows = (
+        db.session.query(MentorshipSession.start_at, MentorshipSession.end_at)
+        .filter(
+            MentorshipSession.mentor_id == mentor_id,
+            MentorshipSession.status.in_(ACTIVE_STATUSES),
+            MentorshipSession.start_at < range_end,
+            MentorshipSession.end_at > range_start,
+        )
+        .order_by(MentorshipSession.start_at)
+    )
+    return IntervalIndex((as_utc(r.start_at), as_utc(r.end_at)) for r in rows)
+
+
+def available_slots(mentor_id, range_start, range_end, slot_length=None):
+    """Free windows, or fixed-length slots when ``slot_length`` is given."""
+    windows = busy_index(mentor_id, range_start, range_end).free_windows(range_start, range_end, slot_length)
+    if not slot_length:
+        return windows
+    slots = []
+    for start, end in windows:
+        while start + slot_length <= end:
+            slots.append((start, start + slot_length))
+            start += slot_length
+    return slots
+
+
+def book_session(mentor_id, mentee_id, start, end, notes=None, status='confirmed'):
+    """Create a session or raise BookingError/BookingConflict. Commits on success."""
+    start, end = as_utc(start), as_utc(end)
+    if end <= start:
+        raise BookingError('end must be after start')
+    if end - start > MAX_SESSION_LENGTH:
+        raise BookingError('session too long')
+    # end any read-only transaction so the lock below is the first statement of ours
+    db.session.commit()
+    try:
+        if not lock_mentor(mentor_id):
+            raise BookingError('mentor not found')
+        existing = find_conflict(mentor_id, start, end)
+        if existing is not None:
+            raise BookingConflict(existing)
+        session = MentorshipSession(
+            mentor_id=mentor_id,
+            mentee_id=mentee_id,
+            start_at=start,
+            end_at=end,
+            date_booked=start,
+            time_slot=f'{start:%H:%M}-{end:%H:%M} UTC',
+            status=status,
+            session_notes=notes,
+        )
+        db.session.add(session)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return session
+
+
+def cancel(session):
+    """Cancel ``session`` if it is still active; returns whether it is cancelled now. Does not commit.
+
+    Completed sessions are counted in the mentor's stats, so they cannot be cancelled;
+    the UPDATE is conditional so a concurrent completion cannot slip in between.
+    """
+    table = MentorshipSession.__table__
+    db.session.execute(
+        table.update()
+        .where(table.c.session_id == session.session_id, table.c.status.in_(ACTIVE_STATUSES))
+        .values(status='cancelled')
+    )
+    db.session.refresh(session, ['status'])
+    return session.status == 'cancelled'
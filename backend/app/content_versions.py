@@ -0,0 +1,134 @@
+"""Per-namespace content versions used for HTTP validators and in-process caches.
+
+Models are registered with ``watch()``. Whenever a flush inserts, deletes or (for the
+watched fields) updates one of them that passes the watch's ``when`` filter, the namespace's row in ``content_versions`` is
+bumped on the same connection, so the new version becomes visible to every worker
+exactly when the business change commits. Code that changes watched rows with Core
+statements, which the ORM does not see, calls ``touch()`` instead. Callbacks registered
+with ``on_change()`` run after that commit with the new version and the primary keys
+that changed.
+"""
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .models import BlogPost, ContentVersion, Mentor, Program, User
+
+_watched = defaultdict(list)    # model class -> [(namespace, fields or None, key_func, when)]
+_listeners = defaultdict(list)  # namespace -> [callback(version, keys)]
+
+# dialects with INSERT .. ON CONFLICT, so the first bump of a namespace cannot race
+_UPSERT = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+def watch(model, namespace, fields=None, key=None, when=None):
+    """Bump ``namespace`` when ``model`` rows change (only ``fields`` for updates, if given).
+
+    ``when(obj)``, if given, must also hold for an inserted, updated or deleted row to count.
+    """
+    key_func = key or (lambda obj: inspect(obj).mapper.primary_key_from_instance(obj)[0])
+    _watched[model].append((namespace, frozenset(fields) if fields else None, key_func, when))
+
+
+def on_change(namespace, callback):
+    _listeners[namespace].append(callback)
+
+
+def get_versions(session, namespaces):
+    """Return ``{namespace: (version, updated_at)}``; unknown namespaces are ``(0, None)``."""
+    table = ContentVersion.__table__
+    rows = session.execute(
+        select(table.c.namespace, table.c.version, table.c.updated_at).where(table.c.namespace.in_(list(namespaces)))
+    )
+    found = {r.namespace: (r.version, r.updated_at) for r in rows}
+    return {ns: found.get(ns, (0, None)) for ns in namespaces}
+
+
+def get_version(session, namespace):
+    return get_versions(session, [namespace])[namespace][0]
+
+
+def bump(connection, namespace):
+    """Increment ``namespace`` on ``connection`` and return the new version."""
+    table = ContentVersion.__table__
+    now = datetime.now(timezone.utc)
+    insert = _UPSERT.get(connection.dialect.name)
+    if insert is not None:
+        connection.execute(
+            insert(table).values(namespace=namespace, version=1, updated_at=now)
+            .on_conflict_do_update(index_elements=[table.c.namespace],
+                                   set_={'version': table.c.version + 1, 'updated_at': now})
+        )
+    else:
+        result = connection.execute(
+            table.update().where(table.c.namespace == namespace).values(version=table.c.version + 1, updated_at=now)
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(namespace=namespace, version=1, updated_at=now))
+    return connection.execute(select(table.c.version).where(table.c.namespace == namespace)).scalar()
+
+
+def _changed_fields(obj):
+    state = inspect(obj)
+    return {attr.key for attr in state.attrs if attr.history.has_changes()}
+
+
+@event.listens_for(Session, 'after_flush')
+def _bump_after_flush(session, flush_context):
+    changes = defaultdict(set)
+    for kind, objects in (('new', session.new), ('dirty', session.dirty), ('deleted', session.deleted)):
+        for obj in objects:
+            for namespace, fields, key_func, when in _watched.get(type(obj), ()):
+                if kind == 'dirty':
+                    changed = _changed_fields(obj)
+                    if not changed or (fields is not None and not changed & fields):
+                        continue
+                if when is not None and not when(obj):
+                    continue
+                changes[namespace].add(key_func(obj))
+    for namespace, keys in changes.items():
+        touch(session, namespace, keys)
+
+
+def touch(session, namespace, keys=()):
+    """Bump ``namespace`` in ``session``'s transaction for rows ``keys`` changed outside the ORM."""
+    version = bump(session.connection(), namespace)
+    pending = session.info.setdefault('content_versions', {})
+    pending.setdefault(namespace, [version, set()])
+    pending[namespace][0] = version
+    pending[namespace][1].update(k for k in keys if k is not None)
+
+
+@event.listens_for(Session, 'after_commit')
+def _notify_after_commit(session):
+    pending = session.info.pop('content_versions', None)
+    if not pending:
+        return
+    for namespace, (version, keys) in pending.items():
+        for callback in _listeners.get(namespace, ()):
+            callback(version, keys)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_after_rollback(session):
+    session.info.pop('content_versions', None)
+
+
+def _has_mentor_row(user):
+    # only users listed in the directory; a new Mentor row bumps the namespace itself
+    session = inspect(user).session
+    if user.user_id is None or session is None:
+        return False
+    with session.no_autoflush:
+        return session.get(Mentor, user.user_id) is not None
+
+
+watch(BlogPost, 'blogs')
+watch(Program, 'programs')
+watch(Mentor, 'mentors')
+watch(User, 'mentors', fields=('name', 'email', 'profile_photo_url', 'bio', 'region'), when=_has_mentor_row)
+# sessions are not watched: completions and reviews reach the directory through the Mentor
+# row's stats, and load is refreshed by the directory itself (see app.mentor_directory)
@@ -0,0 +1,187 @@
+"""Opt-in email digests.
+
+Users with ``email_digest`` set to ``'hourly'`` or ``'daily'`` get one email per period
+instead of one per event: ``notify_email`` appends the event to ``pending_emails`` in
+the caller's transaction, and ``compact`` picks every user whose oldest pending event is
+a period old, renders all of their events into a single digest and sends the batch over
+one SMTP connection. Events of users who went back to ``'off'`` go out in the next run.
+
+``compact`` runs only as the ``app.tasks.send_digests`` task, every ``DIGEST_INTERVAL``
+seconds: triggered by Celery beat, or without a broker by a timer that hands it to the
+in-process executor, so rendering and SMTP never run on a request thread. Runs may
+overlap, so each batch first leases its events (``locked_by``/``locked_until``, for
+``DIGEST_LEASE`` seconds) and renders only those. Sent events are deleted, and the
+events of digests that failed transiently released for the next run, in one
+transaction; a run that dies leaves its events to be claimed again once the lease ends.
+"""
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import func, or_
+
+from . import db, mailer
+from .background import schedule
+from .email_templates import render_email_template
+from .models import PendingEmail, User
+
+OFF = 'off'
+CADENCES = {
+    'hourly': timedelta(hours=1),
+    'daily': timedelta(days=1),
+}
+DIGEST_TEMPLATE = 'digest.txt'
+DIGEST_TASK = 'app.tasks.send_digests'
+
+
+def notify_email(user, subject=None, body=None, template_name=None, template_context=None):
+    """Email ``user`` now or hold it for their digest. Call before the transaction commits."""
+    if not user or not user.email:
+        return
+    if user.email_digest in CADENCES:
+        db.session.add(PendingEmail(
+            user_id=user.user_id,
+            subject=subject,
+            body=body,
+            template_name=template_name,
+            template_context=json.dumps(template_context, default=str) if template_context else None,
+        ))
+    else:
+        mailer.queue_email(user.email, subject, body, template_name, template_context)
+
+
+def _as_utc(ts):
+    # SQLite hands back naive datetimes
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def _claimable(now):
+    return or_(PendingEmail.locked_until.is_(None), PendingEmail.locked_until < now)
+
+
+def due_users(now=None):
+    """Ids of the users whose digest should go out at ``now``."""
+    now = now or datetime.now(timezone.utc)
+    rows = (
+        db.session.query(PendingEmail.user_id, User.email_digest, func.min(PendingEmail.created_at))
+        .join(User, User.user_id == PendingEmail.user_id)
+        .filter(_claimable(now))
+        .group_by(PendingEmail.user_id, User.email_digest)
+    )
+    return [
+        user_id for user_id, cadence, oldest in rows
+        if _as_utc(oldest) <= now - CADENCES.get(cadence, timedelta(0))
+    ]
+
+
+def _summary(row):
+    """``{'subject', 'text'}`` for one pending event."""
+    subject, text = row.subject, row.body
+    if row.template_name:
+        context = json.loads(row.template_context) if row.template_context else {}
+        rendered = render_email_template(row.template_name.replace('.txt', '').replace('.html', ''), context)
+        subject = subject or rendered.get('subject')
+        text = text or rendered.get('text', '')
+    return {'subject': subject or '(no subject)', 'text': text or ''}
+
+
+def claim(user_ids, lease, now):
+    """Lease the claimable events of ``user_ids`` to a new token and commit; returns the token."""
+    token = uuid.uuid4().hex
+    ids = [i for (i,) in (
+        db.session.query(PendingEmail.id)
+        .filter(PendingEmail.user_id.in_(user_ids), _claimable(now))
+        .with_for_update(skip_locked=True)
+    )]
+    if ids:
+        table = PendingEmail.__table__
+        db.session.execute(
+            table.update()
+            .where(table.c.id.in_(ids), or_(table.c.locked_until.is_(None), table.c.locked_until < now))
+            .values(locked_by=token, locked_until=now + lease)
+        )
+    db.session.commit()
+    return token
+
+
+def build_digests(user_ids, token=None):
+    """Rendered digest emails for ``user_ids`` and the pending row ids each one covers.
+
+    With ``token``, only the events leased to it.
+    """
+    users = {u.user_id: u for u in User.query.filter(User.user_id.in_(user_ids))}
+    query = PendingEmail.query.filter(PendingEmail.user_id.in_(user_ids))
+    if token is not None:
+        query = query.filter(PendingEmail.locked_by == token)
+    rows = query.order_by(PendingEmail.user_id, PendingEmail.id).all()
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(row.user_id, []).append(row)
+    digests = []
+    for user_id, events in grouped.items():
+        user = users.get(user_id)
+        if user is None or not user.email:
+            continue
+        if len(events) == 1 and user.email_digest not in CADENCES:
+            # a single leftover event goes out as itself
+            event = events[0]
+            item = mailer.email(user.email, event.subject, event.body, event.template_name,
+                                json.loads(event.template_context) if event.template_context else None)
+        else:
+            item = mailer.email(user.email, template_name=DIGEST_TEMPLATE, template_context={
+                'name': user.name or user.email,
+                'cadence': user.email_digest if user.email_digest in CADENCES else 'regular',
+                'items': [_summary(e) for e in events],
+            })
+        digests.append((item, [e.id for e in events]))
+    return digests
+
+
+def compact(now=None, batch_size=200, mail=None, lease=600):
+    """Send every due digest, ``batch_size`` users per SMTP connection.
+
+    Returns ``{'users': ..., 'events': ..., 'sent': ..., 'connections': ...}``.
+    """
+    now = now or datetime.now(timezone.utc)
+    stats = {'users': 0, 'events': 0, 'sent': 0, 'connections': 0}
+    user_ids = due_users(now)
+    table = PendingEmail.__table__
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        token = claim(batch, timedelta(seconds=lease), now)
+        digests = build_digests(batch, token)
+        if not digests:
+            continue
+        result = mailer.send_bulk([item for item, _ in digests], mail)
+        stats['connections'] += 1
+        stats['sent'] += result['sent']
+        retry = {id(item) for item in result['retry']}
+        done = [i for item, ids in digests if id(item) not in retry for i in ids]
+        for item, error in result['failed']:
+            current_app.logger.warning('digest to %s failed permanently: %s', item.get('to'), error)
+        if done:
+            db.session.execute(table.delete().where(table.c.id.in_(done), table.c.locked_by == token))
+        # whatever is left (retries, events of users without an address) is free again
+        db.session.execute(
+            table.update().where(table.c.locked_by == token).values(locked_by=None, locked_until=None)
+        )
+        db.session.commit()
+        stats['users'] += len(digests) - len(retry)
+        stats['events'] += len(done)
+    return stats
+
+
+def run(app):
+    """Body of the send_digests task."""
+    return compact(batch_size=int(app.config.get('DIGEST_BATCH_SIZE', 200)),
+                   lease=float(app.config.get('DIGEST_LEASE', 600)))
+
+
+def init_app(app):
+    if app.config.get('CELERY_BROKER_URL'):
+        # Celery beat triggers the task (see make_celery)
+        return
+    # no broker: a timer hands the task to the in-process executor's pool
+    schedule(app, 'email-digests', app.config.get('DIGEST_INTERVAL', 300),
+             lambda: app.celery.send_task(DIGEST_TASK))
@@ -1,9 +1,76 @@
-from jinja2 import Environment, FileSystemLoader, select_autoescape, TemplateNotFound
+"""Email templates: one shared Jinja environment and a registry of compiled templates.
+
+Templates are compiled once per process and kept in ``_registry`` (misses included, so a
+lookup for a missing part, such as the HTML of a text-only template, is not repeated on
+disk), and Jinja's bytecode cache keeps the compiled code on disk so a fresh worker
+loads it instead of recompiling. ``init_app`` preloads
+every template at worker start. Only with ``EMAIL_TEMPLATE_AUTO_RELOAD`` (on by default
+under ``FLASK_ENV=development``) are template files checked for changes on each render.
+"""
+import os
+import threading
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape, TemplateNotFound
 from pathlib import Path
 
 
 TEMPLATE_DIR = Path(__file__).resolve().parent / 'templates' / 'email'
 
+_env = None
+_registry = {}
+_lock = threading.Lock()
+
+
+def configure(auto_reload=False, cache_dir=None, template_dir=TEMPLATE_DIR):
+    """(Re)build the shared environment; ``cache_dir`` None uses Jinja's per-user temp dir."""
+    global _env
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+    env = Environment(
+        loader=FileSystemLoader(str(template_dir)),
+        autoescape=select_autoescape(['html', 'xml']),
+        auto_reload=auto_reload,
+        bytecode_cache=FileSystemBytecodeCache(cache_dir),
+    )
+    with _lock:
+        _env = env
+        _registry.clear()
+    return env
+
+
+def get_environment():
+    return _env or configure()
+
+
+def get_template(name):
+    """The compiled template ``name``, or None if there is no such file."""
+    env = get_environment()
+    if env.auto_reload:
+        # development: let Jinja stat the file and recompile it when it changed
+        try:
+            return env.get_template(name)
+        except TemplateNotFound:
+            return None
+    try:
+        return _registry[name]
+    except KeyError:
+        pass
+    try:
+        template = env.get_template(name)
+    except TemplateNotFound:
+        template = None
+    _registry[name] = template
+    return template
+
+
+def preload():
+    """Compile every email template into the registry; returns how many were loaded."""
+    env = get_environment()
+    names = env.list_templates(extensions=['txt', 'html'])
+    for name in names:
+        get_template(name)
+    return len(names)
+
 
 def render_email_template(base_name: str, context: dict) -> dict:
     """Render text and optional HTML templates.
@@ -14,33 +81,34 @@ def render_email_template(base_name: str, context: dict) -> dict:
       - text: rendered plain text (may be empty string)
       - html: rendered HTML (or None)
     """
-    env = Environment(
-        loader=FileSystemLoader(str(TEMPLATE_DIR)),
-        autoescape=select_autoescape(['html', 'xml'])
-    )
     result = {'subject': None, 'text': '', 'html': None}
+    context = context or {}
 
     # text template
-    txt_name = f"{base_name}.txt"
-    try:
-        tmpl = env.get_template(txt_name)
-        rendered = tmpl.render(**(context or {}))
+    tmpl = get_template(f"{base_name}.txt")
+    if tmpl is not None:
+        rendered = tmpl.render(**context)
         # parse Subject: first line if present
         if rendered.startswith('Subject:'):
-            first_line, rest = rendered.split('\n', 1)
+            first_line, _, rest = rendered.partition('\n')
             result['subject'] = first_line.replace('Subject:', '').strip()
             result['text'] = rest.strip()
         else:
             result['text'] = rendered
-    except TemplateNotFound:
-        result['text'] = ''
 
     # optional HTML template
-    html_name = f"{base_name}.html"
-    try:
-        tmpl_html = env.get_template(html_name)
-        result['html'] = tmpl_html.render(**(context or {}))
-    except TemplateNotFound:
-        result['html'] = None
+    tmpl_html = get_template(f"{base_name}.html")
+    if tmpl_html is not None:
+        result['html'] = tmpl_html.render(**context)
 
     return result
+
+
+def init_app(app):
+    development = os.environ.get('FLASK_ENV') == 'development' or app.debug
+    configure(
+        auto_reload=app.config.get('EMAIL_TEMPLATE_AUTO_RELOAD', development),
+        cache_dir=app.config.get('EMAIL_TEMPLATE_CACHE_DIR'),
+    )
+    if app.config.get('EMAIL_TEMPLATE_PRELOAD', True):
+        preload()
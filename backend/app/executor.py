@@ -0,0 +1,311 @@
+"""In-process task executor, used instead of Celery when no broker is configured.
+
+``TaskExecutor`` is a stand-in for the Celery app: ``register_tasks`` declares the tasks
+on it with the same ``@celery.task(...)`` decorators, and callers (the outbox relay) use
+``send_task``. Tasks run on ``TASK_EXECUTOR_WORKERS`` daemon threads inside the worker
+process, so the work stays off the request thread without running Redis.
+
+Retries follow Celery's semantics: ``self.retry()`` (which raises ``Retry``) and
+``autoretry_for`` reschedule the task with ``self.request.retries`` incremented, after ``retry_backoff`` (exponential,
+capped at ``retry_backoff_max``, full jitter unless ``retry_jitter=False``) or
+``default_retry_delay``, until ``max_retries`` is used up.
+
+At most ``TASK_EXECUTOR_MAX_QUEUE`` tasks may be waiting (queued or scheduled for a retry);
+``send_task`` fails fast with ``ExecutorBusy`` beyond that, which makes the outbox back
+off without counting it as a failed attempt. On shutdown the executor stops accepting tasks and works off the queue for up to
+``TASK_EXECUTOR_DRAIN_TIMEOUT`` seconds; retries not yet due are dropped (and logged).
+
+Tasks from the outbox are acknowledged late: the relay passes ``outbox_id`` and keeps the
+row leased, and the executor settles the row only when the task completed or failed for
+good. A task still queued, scheduled for a retry or running when the process exits is
+therefore not lost; its lease runs out and the relay publishes it again. While the job is
+alive here, a relay that re-claims the row is told it is already in hand, which renews
+the lease. Other ``send_task`` callers get no such guarantee.
+"""
+import atexit
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+import uuid
+from collections import deque
+
+from . import outbox
+
+
+class ExecutorBusy(outbox.Backpressure):
+    pass
+
+
+class MaxRetriesExceededError(Exception):
+    pass
+
+
+class Retry(Exception):
+    """Raised by ``Task.retry``; the executor reschedules the task."""
+
+    def __init__(self, args, kwargs, countdown, exc=None):
+        super().__init__(f'retry in {countdown}s')
+        self.task_args = args
+        self.task_kwargs = kwargs
+        self.countdown = countdown
+        self.exc = exc
+
+
+def backoff_interval(factor, retries, maximum, full_jitter=True):
+    """Celery's ``get_exponential_backoff_interval``."""
+    countdown = min(maximum, factor * (2 ** retries))
+    if full_jitter:
+        countdown = random.randrange(countdown + 1)
+    return max(0, countdown)
+
+
+class Task:
+    def __init__(self, executor, func, name, bind=False, autoretry_for=(), retry_backoff=False,
+                 retry_backoff_max=600, retry_jitter=True, max_retries=3, default_retry_delay=180,
+                 retry_kwargs=None):
+        retry_kwargs = dict(retry_kwargs or {})
+        self.executor = executor
+        self.func = func
+        self.name = name
+        self.bind = bind
+        self.autoretry_for = tuple(autoretry_for)
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+        self.retry_jitter = retry_jitter
+        self.max_retries = retry_kwargs.pop('max_retries', max_retries)
+        self.default_retry_delay = retry_kwargs.pop('countdown', default_retry_delay)
+        self._local = threading.local()
+
+    @property
+    def request(self):
+        return getattr(self._local, 'request', None)
+
+    def __call__(self, *args, **kwargs):
+        return self.func(self, *args, **kwargs) if self.bind else self.func(*args, **kwargs)
+
+    def run(self, job):
+        """Run ``job`` on this thread; raises ``Retry`` when it should run again."""
+        self._local.request = job
+        try:
+            try:
+                return self(*job.args, **job.kwargs)
+            except Retry:
+                raise
+            except self.autoretry_for as exc:
+                countdown = None
+                if self.retry_backoff:
+                    countdown = backoff_interval(int(self.retry_backoff), job.retries,
+                                                 self.retry_backoff_max, self.retry_jitter)
+                self.retry(exc=exc, countdown=countdown)
+        finally:
+            self._local.request = None
+
+    def retry(self, args=None, kwargs=None, countdown=None, exc=None, max_retries=None):
+        job = self.request
+        limit = self.max_retries if max_retries is None else max_retries
+        if limit is not None and job.retries >= limit:
+            if exc is not None:
+                raise exc
+            raise MaxRetriesExceededError(f"Can't retry {self.name}[{job.id}] args:{job.args} kwargs:{job.kwargs}")
+        raise Retry(
+            job.args if args is None else list(args),
+            job.kwargs if kwargs is None else dict(kwargs),
+            self.default_retry_delay if countdown is None else countdown,
+            exc,
+        )
+
+    def delay(self, *args, **kwargs):
+        return self.executor.send_task(self.name, args=args, kwargs=kwargs)
+
+    def apply_async(self, args=None, kwargs=None, countdown=None, **options):
+        return self.executor.send_task(self.name, args=args, kwargs=kwargs, countdown=countdown)
+
+
+class Job:
+    """One execution of a task; also what the task sees as ``self.request``."""
+
+    def __init__(self, name, args, kwargs, retries=0, id=None, outbox_id=None):
+        self.id = id or uuid.uuid4().hex
+        self.name = name
+        self.args = list(args or ())
+        self.kwargs = dict(kwargs or {})
+        self.retries = retries
+        self.outbox_id = outbox_id
+        self.enqueued_at = time.monotonic()
+
+
+class TaskExecutor:
+    acks_outbox = True  # the relay leaves rows leased; ``_finish`` settles them
+
+    def __init__(self, app, workers=2, max_queue=1000, drain_timeout=20.0):
+        self.app = app
+        self.workers = max(1, int(workers))
+        self.max_queue = max(1, int(max_queue))
+        self.drain_timeout = drain_timeout
+        self.tasks = {}
+        self._ready = deque()
+        self._scheduled = []  # heap of (due, seq, job)
+        self._seq = itertools.count()
+        self._inflight = {}  # outbox_id -> job id
+        self._cond = threading.Condition()
+        self._threads = []
+        self._pid = None
+        self._closing = False
+        self.active = 0
+        self.counts = {'submitted': 0, 'completed': 0, 'failed': 0, 'retried': 0, 'rejected': 0}
+
+    def task(self, *args, **options):
+        """``@executor.task`` or ``@executor.task(name=..., bind=..., ...)``, as with Celery."""
+        def decorator(func):
+            task = Task(self, func, options.pop('name', None) or f'{func.__module__}.{func.__name__}', **options)
+            self.tasks[task.name] = task
+            return task
+        if len(args) == 1 and callable(args[0]) and not options:
+            return decorator(args[0])
+        return decorator
+
+    def send_task(self, name, args=None, kwargs=None, countdown=None, outbox_id=None, **options):
+        """Queue task ``name``; returns the job id. Raises ``ExecutorBusy`` when full."""
+        job = Job(name, args, kwargs, outbox_id=outbox_id)
+        with self._cond:
+            if outbox_id is not None and outbox_id in self._inflight:
+                return self._inflight[outbox_id]
+            if self._closing or len(self._ready) + len(self._scheduled) >= self.max_queue:
+                self.counts['rejected'] += 1
+                raise ExecutorBusy(f'task queue full ({self.max_queue}); {name} not accepted')
+            self._ensure_started()
+            self._push(job, countdown)
+            self.counts['submitted'] += 1
+            if outbox_id is not None:
+                self._inflight[outbox_id] = job.id
+        return job.id
+
+    def _push(self, job, countdown):
+        if countdown and countdown > 0:
+            heapq.heappush(self._scheduled, (time.monotonic() + countdown, next(self._seq), job))
+        else:
+            self._ready.append(job)
+        self._cond.notify()
+
+    def _ensure_started(self):
+        # lazily, so each gunicorn worker starts its own threads after the fork
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._threads = [
+            threading.Thread(target=self._work, name=f'task-executor-{i}', daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _next_job(self):
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                while self._scheduled and self._scheduled[0][0] <= now:
+                    self._ready.append(heapq.heappop(self._scheduled)[2])
+                if self._ready:
+                    self.active += 1
+                    return self._ready.popleft()
+                if self._closing:
+                    return None
+                self._cond.wait(self._scheduled[0][0] - now if self._scheduled else None)
+
+    def _work(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            try:
+                self._run(job)
+            finally:
+                with self._cond:
+                    self.active -= 1
+                    self._cond.notify_all()
+
+    def _run(self, job):
+        task = self.tasks.get(job.name)
+        if task is None:
+            self.app.logger.error('received unregistered task %s', job.name)
+            self._finish(job, 'failed', error=f'unregistered task {job.name}', give_up=True)
+            return
+        try:
+            with self.app.app_context():
+                task.run(job)
+        except Retry as retry:
+            if self._closing:
+                # an outbox row stays leased and is published again once the lease runs out
+                self.app.logger.warning('task %s[%s] not retried: shutting down', job.name, job.id)
+                self._finish(job, 'failed', settle=False)
+                return
+            self.app.logger.info('task %s[%s] retry %d in %ss', job.name, job.id, job.retries + 1, retry.countdown)
+            with self._cond:
+                self.counts['retried'] += 1
+                self._push(Job(job.name, retry.task_args, retry.task_kwargs, job.retries + 1, job.id, job.outbox_id),
+                           retry.countdown)
+        except Exception as exc:
+            self.app.logger.exception('task %s[%s] failed after %d retries', job.name, job.id, job.retries)
+            self._finish(job, 'failed', error=exc)
+        else:
+            self._finish(job, 'completed')
+
+    def _finish(self, job, outcome, error=None, give_up=False, settle=True):
+        if job.outbox_id is not None and settle:
+            try:
+                with self.app.app_context():
+                    outbox.settle(job.outbox_id, error=error, failed=give_up)
+            except Exception:
+                # left leased: the relay publishes the task again when the lease runs out
+                self.app.logger.exception('task %s[%s]: could not settle outbox row %d', job.name, job.id, job.outbox_id)
+        with self._cond:
+            self.counts[outcome] += 1
+            self._inflight.pop(job.outbox_id, None)
+
+    def stats(self):
+        """Queue depth and counters, for the admin metrics."""
+        with self._cond:
+            now = time.monotonic()
+            return {
+                'workers': self.workers,
+                'queued': len(self._ready),
+                'scheduled': len(self._scheduled),
+                'active': self.active,
+                'max_queue': self.max_queue,
+                'oldest_queued_seconds': round(now - self._ready[0].enqueued_at, 3) if self._ready else 0,
+                **self.counts,
+            }
+
+    def shutdown(self, timeout=None):
+        """Stop accepting tasks and run the queued ones for up to ``timeout`` seconds."""
+        timeout = self.drain_timeout if timeout is None else timeout
+        with self._cond:
+            self._closing = True
+            dropped = len(self._scheduled)
+            self._scheduled.clear()
+            self._cond.notify_all()
+            threads = self._threads if self._pid == os.getpid() else []
+        if dropped:
+            self.app.logger.warning('task executor: dropping %d scheduled retries at shutdown', dropped)
+        deadline = time.monotonic() + timeout
+        for thread in threads:
+            thread.join(max(0, deadline - time.monotonic()))
+        with self._cond:
+            left = len(self._ready) + self.active
+        if left:
+            self.app.logger.warning('task executor: %d tasks unfinished after %ss drain', left, timeout)
+        return left
+
+
+def init_app(app):
+    executor = TaskExecutor(
+        app,
+        workers=int(app.config.get('TASK_EXECUTOR_WORKERS', 2)),
+        max_queue=int(app.config.get('TASK_EXECUTOR_MAX_QUEUE', 1000)),
+        drain_timeout=float(app.config.get('TASK_EXECUTOR_DRAIN_TIMEOUT', 20)),
+    )
+    atexit.register(executor.shutdown)
+    return executor
@@ -0,0 +1,55 @@
+import hashlib
+from functools import wraps
+
+from flask import current_app, make_response, request
+
+from . import db
+from .content_versions import get_versions
+
+
+def _cache_control(private):
+    if private:
+        return 'private, no-cache'
+    max_age = int(current_app.config.get('HTTP_CACHE_MAX_AGE', 60))
+    return f'public, max-age={max_age}, must-revalidate'
+
+
+def conditional(*namespaces, weak=False, private=False, on_not_modified=None):
+    """Answer ``If-None-Match`` / ``If-Modified-Since`` from content versions.
+
+    The ETag is derived from the current version of ``namespaces`` plus the request
+    path and query string, so a 304 costs one primary-key lookup and the view itself
+    (and its queries) never runs. ``weak`` is for representations that embed values
+    which change without a version bump, such as buffered view counts.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            versions = get_versions(db.session, namespaces)
+            token = '|'.join(f'{ns}:{versions[ns][0]}' for ns in namespaces) + '|' + request.full_path
+            etag = hashlib.sha1(token.encode('utf-8')).hexdigest()
+            stamps = [ts for _, ts in versions.values() if ts is not None]
+            last_modified = max(stamps) if stamps else None
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            elif request.if_modified_since and last_modified is not None:
+                not_modified = last_modified.replace(microsecond=0, tzinfo=None) <= request.if_modified_since.replace(tzinfo=None)
+            else:
+                not_modified = False
+
+            if not_modified:
+                if on_not_modified:
+                    on_not_modified(*args, **kwargs)
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=weak)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.headers['Cache-Control'] = _cache_control(private)
+            return response
+        return wrapper
+    return decorator
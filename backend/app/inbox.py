@@ -0,0 +1,318 @@
+"""Per-user notification feed and unread counters.
+
+``notification_counters`` holds each user's unread personal notifications so the badge
+does not COUNT(*) the user's whole history. It is adjusted on the same connection as the change: an
+``after_flush`` listener covers notifications added, marked read or deleted through
+the ORM, and ``add_many`` covers bulk Core inserts. ``recount`` rebuilds counters from
+the notifications table. Callbacks registered with ``on_created`` see every new
+notification after its transaction commits.
+
+A broadcast (``broadcast()``) is one row with ``user_id`` NULL and an ``audience``:
+``'all'`` or a role. Nothing is written per recipient until a user marks it read, which
+adds a ``notification_receipts`` row. Users see the broadcasts sent since they joined,
+merged into their feed. Broadcasts are not in the counters: the badge adds the
+broadcasts sent to the user's audiences since they joined minus the user's receipts for
+them, counted at read time on the audience index. Broadcasts are rare next to personal
+notifications, so that stays small, and it follows role changes without any fix-up.
+"""
+from collections import Counter
+from datetime import datetime, timezone
+
+from sqlalchemy import DateTime, and_, event, func, inspect, literal, or_
+from sqlalchemy.orm import Session
+
+from . import db
+from .models import Notification, NotificationCounter, NotificationReceipt, User
+from .utils import decode_cursor, encode_cursor
+
+CREATED_KEY = 'created_notifications'
+ALL = 'all'
+_listeners = []
+
+
+def adjust(connection, deltas):
+    """Apply ``{user_id: delta}`` to the unread counters on ``connection``."""
+    table = NotificationCounter.__table__
+    for user_id, delta in deltas.items():
+        if not delta or user_id is None:
+            continue
+        result = connection.execute(
+            table.update().where(table.c.user_id == user_id).values(unread=table.c.unread + delta)
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(user_id=user_id, unread=max(delta, 0)))
+
+
+def created(session):
+    """Notifications created in ``session``'s open transaction, as ``(user_id, payload)``."""
+    return session.info.setdefault(CREATED_KEY, [])
+
+
+def on_created(callback):
+    """Call ``callback(user_id, payload)`` for each notification once its transaction commits."""
+    _listeners.append(callback)
+
+
+@event.listens_for(Session, 'after_flush')
+def _count_after_flush(session, flush_context):
+    deltas = Counter()
+    for obj in session.new:
+        if isinstance(obj, Notification):
+            created(session).append((obj.user_id, serialize(obj)))
+            if not obj.is_read:
+                deltas[obj.user_id] += 1
+    for obj in session.deleted:
+        if isinstance(obj, Notification) and not obj.is_read:
+            deltas[obj.user_id] -= 1
+    for obj in session.dirty:
+        if isinstance(obj, Notification):
+            history = inspect(obj).attrs.is_read.history
+            if history.has_changes():
+                was_read = bool(history.deleted[0]) if history.deleted else False
+                if was_read != bool(obj.is_read):
+                    deltas[obj.user_id] += -1 if obj.is_read else 1
+    if any(deltas.values()):
+        adjust(session.connection(), deltas)
+
+
+_RETURNED = ('notification_id', 'user_id', 'title', 'message', 'type', 'is_read', 'created_at', 'audience')
+# rows per multi-VALUES statement, well under PostgreSQL's bind parameter limit
+ADD_MANY_CHUNK = 500
+
+
+def add_many(rows):
+    """Insert notification dicts in bulk and bump the counters. Does not commit.
+
+    The new ids are read back (RETURNING where the dialect has it, otherwise one INSERT per
+    row) so the pushed payloads carry them and ``Last-Event-ID`` can resume past them.
+    """
+    now = datetime.now(timezone.utc)
+    rows = [dict(r) for r in rows]
+    if not rows:
+        return 0
+    for r in rows:
+        r.setdefault('created_at', now)
+        r.setdefault('is_read', False)
+    table = Notification.__table__
+    connection = db.session.connection()
+    if connection.dialect.full_returning:
+        # a multi-VALUES insert needs the same keys in every row
+        keys = set().union(*rows)
+        rows = [{k: r.get(k) for k in keys} for r in rows]
+        returned = [c for c in table.c if c.key in _RETURNED]
+        inserted = []
+        for start in range(0, len(rows), ADD_MANY_CHUNK):
+            result = connection.execute(table.insert().values(rows[start:start + ADD_MANY_CHUNK]).returning(*returned))
+            inserted.extend(dict(row._mapping) for row in result)
+    else:
+        inserted = []
+        for r in rows:
+            result = connection.execute(table.insert().values(**r))
+            inserted.append(dict(r, notification_id=result.inserted_primary_key[0]))
+    adjust(connection, Counter(r.get('user_id') for r in rows if not r.get('is_read')))
+    created(db.session).extend((r.get('user_id'), {
+        'notification_id': r['notification_id'],
+        'title': r.get('title'),
+        'message': r.get('message'),
+        'type': r.get('type'),
+        'is_read': bool(r.get('is_read')),
+        'created_at': r['created_at'].isoformat(),
+        'audience': r.get('audience'),
+    }) for r in inserted)
+    return len(rows)
+
+
+def broadcast(title, message, type='system', audience=ALL):
+    """Notify everyone in ``audience`` (``'all'`` or a role) with a single row. Does not commit."""
+    note = Notification(user_id=None, audience=audience, title=title, message=message, type=type)
+    db.session.add(note)
+    return note
+
+
+def audiences(role):
+    """The broadcast audiences a user with ``role`` belongs to."""
+    return (ALL, role) if role else (ALL,)
+
+
+def _recipient(user_id):
+    """``(audiences, date_joined)`` of the user, or None if there is no such user."""
+    row = db.session.query(User.role, User.date_joined).filter(User.user_id == user_id).first()
+    if row is None:
+        return None
+    return audiences(row.role), row.date_joined
+
+
+def _broadcasts(user_id, recipient):
+    """Query of ``(Notification, read_at)`` for the broadcasts addressed to the user."""
+    groups, joined = recipient
+    query = db.session.query(Notification, NotificationReceipt.read_at).outerjoin(
+        NotificationReceipt,
+        and_(NotificationReceipt.notification_id == Notification.notification_id,
+             NotificationReceipt.user_id == user_id),
+    ).filter(Notification.user_id.is_(None), Notification.audience.in_(groups))
+    if joined is not None:
+        query = query.filter(Notification.created_at >= joined)
+    return query
+
+
+def unread_count(user_id):
+    """The user's personal counter plus the broadcasts addressed to them without a receipt."""
+    count = db.session.query(NotificationCounter.unread).filter(NotificationCounter.user_id == user_id).scalar()
+    count = max(count or 0, 0)
+    recipient = _recipient(user_id)
+    if recipient is not None:
+        sent, read = _broadcasts(user_id, recipient).with_entities(
+            func.count(Notification.notification_id), func.count(NotificationReceipt.user_id),
+        ).order_by(None).one()
+        count += sent - read
+    return count
+
+
+def recount(user_ids=None):
+    """Rebuild the personal counters from the notifications table (all users, or
+    ``user_ids``). Commits."""
+    query = db.session.query(Notification.user_id, func.count()).filter(
+        Notification.user_id.isnot(None), or_(Notification.is_read.is_(False), Notification.is_read.is_(None))
+    )
+    table = NotificationCounter.__table__
+    delete = table.delete()
+    if user_ids is not None:
+        query = query.filter(Notification.user_id.in_(list(user_ids)))
+        delete = delete.where(table.c.user_id.in_(list(user_ids)))
+    counts = dict(query.group_by(Notification.user_id).all())
+    db.session.execute(delete)
+    if counts:
+        db.session.execute(table.insert(), [{'user_id': u, 'unread': n} for u, n in counts.items()])
+    db.session.commit()
+    return len(counts)
+
+
+@event.listens_for(Session, 'after_commit')
+def _notify_after_commit(session):
+    for user_id, payload in session.info.pop(CREATED_KEY, ()):
+        for callback in _listeners:
+            callback(user_id, payload)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_after_rollback(session):
+    session.info.pop(CREATED_KEY, None)
+
+
+def mark_read(user_id, ids=None, before=None):
+    """Mark the user's unread notifications read; returns how many flipped.
+
+    ``ids`` limits it to those notifications, ``before`` (a ``(created_at, id)`` pair) to
+    that position in the feed and everything older; an id of None takes every
+    notification created at or before ``created_at``. Personal notifications are flipped
+    with one UPDATE and the counter is decremented by its rowcount; unread broadcasts get
+    receipts with one INSERT ... SELECT. Does not commit.
+    """
+    if ids is not None:
+        if not ids:
+            return 0
+        ids = list(ids)
+    scope = []
+    if ids is not None:
+        scope.append(Notification.notification_id.in_(ids))
+    if before is not None:
+        created_at, last_id = before
+        if last_id is None:
+            scope.append(Notification.created_at <= created_at)
+        else:
+            scope.append(or_(
+                Notification.created_at < created_at,
+                and_(Notification.created_at == created_at, Notification.notification_id <= last_id),
+            ))
+
+    table = Notification.__table__
+    stmt = table.update().where(
+        table.c.user_id == user_id,
+        or_(table.c.is_read.is_(False), table.c.is_read.is_(None)),
+        *scope,
+    )
+    connection = db.session.connection()
+    flipped = connection.execute(stmt.values(is_read=True)).rowcount
+    adjust(connection, {user_id: -flipped})
+
+    recipient = _recipient(user_id)
+    if recipient is not None:
+        unread = _broadcasts(user_id, recipient).filter(NotificationReceipt.user_id.is_(None), *scope)
+        now = literal(datetime.now(timezone.utc), DateTime(timezone=True))
+        rows = unread.with_entities(literal(user_id), Notification.notification_id, now)
+        flipped += connection.execute(NotificationReceipt.__table__.insert().from_select(
+            ['user_id', 'notification_id', 'read_at'], rows.statement,
+        )).rowcount
+    return flipped
+
+
+def serialize(n, is_read=None):
+    """``is_read`` overrides the row's flag; broadcasts take it from the user's receipt."""
+    return {
+        'notification_id': n.notification_id,
+        'title': n.title,
+        'message': n.message,
+        'type': n.type,
+        'is_read': bool(n.is_read if is_read is None else is_read),
+        'created_at': n.created_at.isoformat() if n.created_at else None,
+        'audience': n.audience,
+    }
+
+
+def feed_cursor(n):
+    return encode_cursor(n.created_at.isoformat(), n.notification_id)
+
+
+def parse_feed_cursor(cursor, allow_timestamp=False):
+    """``(created_at, notification_id)`` from a feed cursor. Raises ValueError.
+
+    With ``allow_timestamp`` an ISO 8601 timestamp is accepted too and covers every
+    notification created up to that instant.
+    """
+    if allow_timestamp:
+        try:
+            ts = datetime.fromisoformat(str(cursor).replace('Z', '+00:00'))
+            return ts, None
+        except ValueError:
+            pass
+    try:
+        created_at, last_id = decode_cursor(cursor)
+        return datetime.fromisoformat(created_at), int(last_id)
+    except (TypeError, ValueError):
+        raise ValueError('invalid cursor')
+
+
+def _position(n):
+    # SQLite hands back naive datetimes, rows still in the identity map may be aware
+    created_at = n.created_at
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return created_at, n.notification_id
+
+
+def feed(user_id, limit=20, cursor=None):
+    """A page of the user's notifications, newest first: ``(items, next_cursor)``.
+
+    Personal notifications and broadcasts are read by two keyset queries of at most
+    ``limit + 1`` rows, each on its own index, and merged.
+    """
+    after = []
+    if cursor:
+        created_at, last_id = parse_feed_cursor(cursor)
+        after.append(or_(
+            Notification.created_at < created_at,
+            and_(Notification.created_at == created_at, Notification.notification_id < last_id),
+        ))
+    order = (Notification.created_at.desc(), Notification.notification_id.desc())
+    personal = Notification.query.filter(Notification.user_id == user_id, *after)
+    rows = [(n, None) for n in personal.order_by(*order).limit(limit + 1)]
+    recipient = _recipient(user_id)
+    if recipient is not None:
+        broadcasts = _broadcasts(user_id, recipient).filter(*after).order_by(*order).limit(limit + 1)
+        rows += [(n, read_at is not None) for n, read_at in broadcasts]
+        rows.sort(key=lambda row: _position(row[0]), reverse=True)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = feed_cursor(rows[-1][0])
+    return [serialize(n, is_read) for n, is_read in rows], next_cursor
@@ -0,0 +1,157 @@
+"""Sending many emails over one SMTP connection.
+
+``send_bulk`` renders each email (through the cached templates) and sends the batch over
+a single Flask-Mail connection, so it pays for one connect, STARTTLS and login instead
+of one per email. Failures are tracked per recipient: 5xx replies and unrenderable
+emails are permanent, anything else (4xx replies, a dropped connection) is handed back
+for a retry of just those emails. A connection dropped mid-batch is reopened once.
+
+Request handlers call ``queue_email``; everything queued while handling a request goes
+into one ``app.tasks.send_email_bulk`` task, written to the task outbox by the request's
+next commit. Emails queued after the last commit are written after the response, in a
+transaction of their own, so whatever the handler left in its session is not committed.
+"""
+import smtplib
+
+from flask import current_app, g, has_request_context
+from flask_mail import BadHeaderError, Message
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .email_templates import render_email_template
+
+BULK_TASK = 'app.tasks.send_email_bulk'
+
+
+def email(to, subject=None, body=None, template_name=None, template_context=None):
+    """A queued email as a plain (serialisable) dict."""
+    return {
+        'to': to,
+        'subject': subject,
+        'body': body,
+        'template_name': template_name,
+        'template_context': template_context,
+    }
+
+
+def build_message(item):
+    subject, body, html = item.get('subject'), item.get('body'), None
+    template_name = item.get('template_name')
+    if template_name:
+        rendered = render_email_template(template_name.replace('.txt', '').replace('.html', ''),
+                                         item.get('template_context') or {})
+        subject = subject or rendered.get('subject')
+        body = body or rendered.get('text', '')
+        html = rendered.get('html')
+    msg = Message(subject=subject or '(no-subject)', recipients=[item['to']], body=body or '')
+    if html:
+        msg.html = html
+    return msg
+
+
+def is_permanent(exc):
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return all(500 <= code < 600 for code, _ in exc.recipients.values())
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 500 <= exc.smtp_code < 600
+    return isinstance(exc, (BadHeaderError, AssertionError))
+
+
+def send_bulk(items, mail=None):
+    """Send ``items`` over one connection.
+
+    Returns ``{'sent': count, 'failed': [(item, error)], 'retry': [item]}`` where
+    ``failed`` are permanent failures and ``retry`` the emails worth another attempt.
+    """
+    mail = mail or current_app.extensions.get('mail')
+    result = {'sent': 0, 'failed': [], 'retry': []}
+    items = list(items)
+    if mail is None:
+        current_app.logger.debug('mail not configured; dropping %d emails', len(items))
+        return result
+    try:
+        connection = mail.connect().__enter__()
+    except (OSError, smtplib.SMTPException):
+        current_app.logger.warning('SMTP connection failed; %d emails left for retry', len(items), exc_info=True)
+        result['retry'] = items
+        return result
+
+    reconnected = False
+    try:
+        for index, item in enumerate(items):
+            try:
+                msg = build_message(item)
+            except Exception as exc:
+                result['failed'].append((item, f'render failed: {exc}'))
+                continue
+            while True:
+                try:
+                    connection.send(msg)
+                    result['sent'] += 1
+                except smtplib.SMTPServerDisconnected:
+                    if reconnected:
+                        raise
+                    reconnected = True
+                    connection.host = connection.configure_host()
+                    continue
+                except Exception as exc:
+                    if is_permanent(exc):
+                        result['failed'].append((item, str(exc)))
+                    else:
+                        result['retry'].append(item)
+                break
+    except (OSError, smtplib.SMTPException):
+        current_app.logger.warning('SMTP connection lost again; leaving the rest of the batch for retry', exc_info=True)
+        result['retry'].extend(items[index:])
+        connection.host = None
+    finally:
+        try:
+            connection.__exit__(None, None, None)
+        except (OSError, smtplib.SMTPException):
+            pass
+    return result
+
+
+def enqueue(items, session=None):
+    """Add one send_email_bulk task for ``items`` to the outbox. Does not commit."""
+    from . import outbox
+    outbox.enqueue(BULK_TASK, args=[list(items)], session=session)
+
+
+def queue_email(to, subject=None, body=None, template_name=None, template_context=None):
+    """Send an email in the background, batched with the others queued during this request.
+
+    Outside a request the task is added to the outbox directly; the caller commits.
+    """
+    item = email(to, subject, body, template_name, template_context)
+    if has_request_context():
+        g.setdefault('queued_emails', []).append(item)
+    else:
+        enqueue([item])
+
+
+@event.listens_for(Session, 'before_commit')
+def _write_queued(session):
+    # the emails ride in the transaction of the change that caused them
+    from . import db
+    if has_request_context() and g.get('queued_emails') and session is db.session():
+        enqueue(g.pop('queued_emails'))
+
+
+def _flush_queued(response):
+    from . import db
+    items = g.pop('queued_emails', None)
+    if items and response.status_code < 500:
+        # never commit the request's session here: it may hold changes the handler dropped
+        with Session(bind=db.engine) as session:
+            try:
+                enqueue(items, session)
+                session.commit()
+            except Exception:
+                session.rollback()
+                current_app.logger.exception('failed to enqueue %d emails', len(items))
+    return response
+
+
+def init_app(app):
+    app.after_request(_flush_queued)
@@ -0,0 +1,185 @@
+"""In-process, versioned cache of the public mentor directory.
+
+The directory is built from one ``mentors LEFT JOIN users`` query and serialized once.
+It is tagged with the ``mentors`` content version (see app.content_versions): a read
+compares that version with the database and, when it moved, either patches just the
+mentors this worker changed itself or reloads everything if another worker changed it.
+The expertise search index (app.mentor_search) is maintained alongside the entries.
+
+A mentor's load (active sessions) only feeds the search ranking and is not part of the
+listed profile, so bookings do not bump the version; the index re-reads the loads with
+one grouped query at most every ``MENTOR_LOAD_TTL`` seconds instead.
+"""
+import json
+import threading
+import time
+
+from flask import current_app, has_app_context
+from sqlalchemy import func
+
+from . import db
+from .content_versions import get_version, on_change
+from .mentor_search import MentorSearchIndex
+from .models import Mentor, MentorshipSession, User
+
+# sessions that count towards a mentor's current load
+ACTIVE_SESSION_STATUSES = ('pending', 'confirmed')
+
+
+def _load_query():
+    return (
+        db.session.query(MentorshipSession.mentor_id, func.count().label('load'))
+        .filter(MentorshipSession.status.in_(ACTIVE_SESSION_STATUSES))
+        .group_by(MentorshipSession.mentor_id)
+    )
+
+
+def _query():
+    load = _load_query().subquery()
+    return db.session.query(
+        Mentor.mentor_id, Mentor.expertise_areas, Mentor.availability_status,
+        Mentor.rating, Mentor.sessions_completed,
+        User.name, User.email, User.profile_photo_url, User.bio, User.region,
+        func.coalesce(load.c.load, 0).label('load'),
+    ).outerjoin(User, User.user_id == Mentor.mentor_id).outerjoin(load, load.c.mentor_id == Mentor.mentor_id)
+
+
+def serialize(row):
+    return {
+        'mentor_id': row.mentor_id,
+        'name': row.name,
+        'email': row.email,
+        'profile_photo_url': row.profile_photo_url,
+        'bio': row.bio,
+        'region': row.region,
+        'rating': row.rating or 0.0,
+        'sessions_completed': row.sessions_completed or 0,
+        'expertise_areas': (row.expertise_areas.split(',') if row.expertise_areas else []),
+        'availability_status': row.availability_status,
+    }
+
+
+class MentorDirectory:
+    def __init__(self, load_ttl=60.0):
+        self.version = None
+        self.load_ttl = load_ttl
+        self._entries = {}
+        self._loads = {}  # mentor_id -> load the search index was built with
+        self._loads_at = time.monotonic()
+        self._views = {}  # availability filter -> (entries ordered by mentor_id, encoded JSON)
+        self._pending = {}  # version -> mentor ids changed by this worker's own commits
+        self._search = MentorSearchIndex()
+        self._lock = threading.Lock()
+
+    def _index(self, index, row):
+        index.put(row.mentor_id, row.expertise_areas, row.region, row.availability_status,
+                  row.rating, row.sessions_completed, row.load)
+        self._loads[row.mentor_id] = row.load
+
+    def _replace(self, entries, version):
+        self._entries = entries
+        self._views = {}
+        self.version = version
+        self._pending = {v: keys for v, keys in self._pending.items() if v > version}
+
+    def reload(self, version):
+        entries = {}
+        index = MentorSearchIndex()
+        self._loads_at = time.monotonic()
+        for row in _query():
+            entries[row.mentor_id] = serialize(row)
+            self._index(index, row)
+        with self._lock:
+            self._search = index
+            self._replace(entries, version)
+
+    def _patch(self, keys, version):
+        rows = {row.mentor_id: row for row in _query().filter(Mentor.mentor_id.in_(list(keys)))}
+        with self._lock:
+            entries = dict(self._entries)
+            for mentor_id in keys:
+                if mentor_id in rows:
+                    entries[mentor_id] = serialize(rows[mentor_id])
+                    self._index(self._search, rows[mentor_id])
+                else:
+                    entries.pop(mentor_id, None)
+                    self._search.remove(mentor_id)
+            self._replace(entries, version)
+
+    def mark_changed(self, version, keys):
+        """after_commit hook: remember which mentors our own commit touched."""
+        with self._lock:
+            if self.version is not None:
+                self._pending[version] = set(keys)
+
+    def refresh(self):
+        version = get_version(db.session, 'mentors')
+        if version == self.version:
+            return
+        with self._lock:
+            current = self.version
+            chain = range(current + 1, version + 1) if current is not None else ()
+            known = current is not None and all(v in self._pending for v in chain)
+            keys = set().union(*(self._pending[v] for v in chain)) if known else None
+        if known and keys:
+            self._patch(keys, version)
+        else:
+            self.reload(version)
+
+    def entries(self, availability=None):
+        """Mentor dicts ordered by id, optionally filtered by availability_status."""
+        self.refresh()
+        return self._view(availability)[0]
+
+    def encoded(self, availability=None):
+        """The full (filtered) list, already JSON-encoded."""
+        self.refresh()
+        return self._view(availability)[1]
+
+    def refresh_loads(self):
+        """Re-rank mentors whose load changed, if the loads are older than ``load_ttl``."""
+        now = time.monotonic()
+        if now - self._loads_at < self.load_ttl:
+            return
+        loads = dict(_load_query().all())
+        with self._lock:
+            self._loads_at = now
+            for mentor_id, entry in self._entries.items():
+                load = loads.get(mentor_id, 0)
+                if self._loads.get(mentor_id, 0) != load:
+                    self._loads[mentor_id] = load
+                    self._search.put(mentor_id, ','.join(entry['expertise_areas']), entry['region'],
+                                     entry['availability_status'], entry['rating'], entry['sessions_completed'], load)
+
+    def search(self, expertise=None, region=None, availability=None, limit=20):
+        """Ranked mentor dicts matching the filters (see MentorSearchIndex.search)."""
+        self.refresh()
+        self.refresh_loads()
+        with self._lock:
+            ranked = self._search.search(expertise, region, availability, limit)
+            return [dict(self._entries[mentor_id], score=round(score, 4), matched_terms=matched)
+                    for mentor_id, matched, score in ranked]
+
+    def _view(self, availability):
+        with self._lock:
+            view = self._views.get(availability)
+            if view is None:
+                items = [self._entries[k] for k in sorted(self._entries)]
+                if availability:
+                    items = [m for m in items if m['availability_status'] == availability]
+                view = (items, json.dumps(items))
+                self._views[availability] = view
+            return view
+
+
+def _on_mentors_changed(version, keys):
+    if has_app_context() and hasattr(current_app, 'mentor_directory'):
+        current_app.mentor_directory.mark_changed(version, keys)
+
+
+on_change('mentors', _on_mentors_changed)
+
+
+def init_app(app):
+    app.mentor_directory = MentorDirectory(load_ttl=float(app.config.get('MENTOR_LOAD_TTL', 60)))
+    return app.mentor_directory
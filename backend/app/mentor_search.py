@@ -0,0 +1,110 @@
+"""Inverted index over mentor expertise areas, owned by the mentor directory cache.
+
+``Mentor.expertise_areas`` is comma-separated free text. Each area is normalized and
+indexed both as a whole ("data science") and word by word ("data", "science"), so a
+query term matches either. Results are ordered by the number of query terms matched,
+then by a blend of rating, completed sessions and current load.
+"""
+import heapq
+import math
+import re
+
+_SPACES = re.compile(r'\s+')
+_WORD = re.compile(r'[^\W_]+', re.UNICODE)
+
+RATING_WEIGHT = 0.6
+EXPERIENCE_WEIGHT = 0.3
+LOAD_WEIGHT = 0.1
+EXPERIENCED_SESSIONS = 100  # sessions_completed at which the experience term saturates
+
+
+def normalize(term):
+    return _SPACES.sub(' ', term or '').strip().lower()
+
+
+def expertise_terms(expertise_areas):
+    terms = set()
+    for area in (expertise_areas or '').split(','):
+        area = normalize(area)
+        if area:
+            terms.add(area)
+            terms.update(_WORD.findall(area))
+    return terms
+
+
+def query_terms(expertise):
+    return {normalize(t) for t in re.split(r'[,\s]+', expertise or '') if normalize(t)}
+
+
+def blend(rating, sessions_completed, load):
+    experience = min(1.0, math.log1p(sessions_completed or 0) / math.log1p(EXPERIENCED_SESSIONS))
+    return (
+        RATING_WEIGHT * min(max(rating or 0.0, 0.0), 5.0) / 5.0
+        + EXPERIENCE_WEIGHT * experience
+        + LOAD_WEIGHT / (1.0 + (load or 0))
+    )
+
+
+class MentorSearchIndex:
+    """Not thread-safe on its own; the mentor directory serializes access."""
+
+    def __init__(self):
+        self._postings = {}  # term -> set(mentor_id)
+        self._regions = {}   # normalized region -> set(mentor_id)
+        self._statuses = {}  # availability_status -> set(mentor_id)
+        self._records = {}   # mentor_id -> (terms, region, availability_status, score)
+
+    def __len__(self):
+        return len(self._records)
+
+    @staticmethod
+    def _discard(postings, key, mentor_id):
+        ids = postings.get(key)
+        if ids is not None:
+            ids.discard(mentor_id)
+            if not ids:
+                del postings[key]
+
+    def remove(self, mentor_id):
+        record = self._records.pop(mentor_id, None)
+        if record is None:
+            return
+        terms, region, status, _ = record
+        for term in terms:
+            self._discard(self._postings, term, mentor_id)
+        self._discard(self._regions, region, mentor_id)
+        self._discard(self._statuses, status, mentor_id)
+
+    def put(self, mentor_id, expertise_areas, region, availability_status, rating, sessions_completed, load):
+        self.remove(mentor_id)
+        terms = expertise_terms(expertise_areas)
+        region = normalize(region)
+        self._records[mentor_id] = (terms, region, availability_status, blend(rating, sessions_completed, load))
+        for term in terms:
+            self._postings.setdefault(term, set()).add(mentor_id)
+        self._regions.setdefault(region, set()).add(mentor_id)
+        self._statuses.setdefault(availability_status, set()).add(mentor_id)
+
+    def search(self, expertise=None, region=None, availability=None, limit=20):
+        """Return ``[(mentor_id, matched_terms, score), ...]``, best first."""
+        filters = []
+        if region:
+            filters.append(self._regions.get(normalize(region), set()))
+        if availability:
+            filters.append(self._statuses.get(availability, set()))
+        allowed = set.intersection(*sorted(filters, key=len)) if filters else None
+
+        terms = query_terms(expertise)
+        if terms:
+            matches = {}
+            for term in terms:
+                ids = self._postings.get(term, ())
+                if allowed is not None:
+                    ids = allowed.intersection(ids)
+                for mentor_id in ids:
+                    matches[mentor_id] = matches.get(mentor_id, 0) + 1
+        else:
+            matches = dict.fromkeys(self._records if allowed is None else allowed, 0)
+        records = self._records
+        candidates = ((mentor_id, matched, records[mentor_id][3]) for mentor_id, matched in matches.items())
+        return heapq.nlargest(limit, candidates, key=lambda c: (c[1], c[2], -c[0]))
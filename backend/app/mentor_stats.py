@@ -0,0 +1,151 @@
+"""Incrementally maintained mentor statistics.
+
+``Mentor.sessions_completed``, ``total_mentees`` and ``rating`` are updated in place when a
+session completes or is reviewed, with ``rating`` derived from the running
+``rating_sum``/``rating_count`` rather than an average over all sessions. ``reconcile()``
+recomputes everything from ``mentorship_sessions`` in bulk and reports the drift.
+"""
+from datetime import datetime, timezone
+
+from sqlalchemy import case, distinct, func
+
+from . import db
+from .booking import lock_mentor
+from .content_versions import touch
+from .models import Mentor, MentorshipSession
+
+FIELDS = ('sessions_completed', 'total_mentees', 'rating_sum', 'rating_count', 'rating')
+
+
+class StatsError(Exception):
+    pass
+
+
+def complete_session(session):
+    """Mark ``session`` completed and bump the mentor's counters. Does not commit."""
+    if session.status == 'completed':
+        return False
+    if session.status not in ('pending', 'confirmed'):
+        raise StatsError(f'cannot complete a {session.status} session')
+    # serialize with other completions for this mentor so the first-mentee check is exact
+    lock_mentor(session.mentor_id)
+    now = datetime.now(timezone.utc)
+    sessions = MentorshipSession.__table__
+    # only the caller whose UPDATE moved the status counts the completion
+    claimed = db.session.execute(
+        sessions.update()
+        .where(sessions.c.session_id == session.session_id, sessions.c.status.in_(('pending', 'confirmed')))
+        .values(status='completed', completed_at=now)
+    ).rowcount
+    if claimed != 1:
+        db.session.refresh(session, ['status'])
+        if session.status == 'completed':
+            return False
+        raise StatsError(f'cannot complete a {session.status} session')
+    seen_before = db.session.query(
+        MentorshipSession.query.filter(
+            MentorshipSession.mentor_id == session.mentor_id,
+            MentorshipSession.mentee_id == session.mentee_id,
+            MentorshipSession.status == 'completed',
+            MentorshipSession.session_id != session.session_id,
+        ).exists()
+    ).scalar()
+    # keep the instance in step
+    session.status = 'completed'
+    session.completed_at = now
+    table = Mentor.__table__
+    db.session.execute(
+        table.update().where(table.c.mentor_id == session.mentor_id).values(
+            sessions_completed=func.coalesce(table.c.sessions_completed, 0) + 1,
+            total_mentees=func.coalesce(table.c.total_mentees, 0) + (0 if seen_before else 1),
+        )
+    )
+    touch(db.session, 'mentors', [session.mentor_id])
+    return True
+
+
+def review_session(session, rating, review=None):
+    """Record a 1-5 rating for a completed session and fold it into the mentor's average."""
+    if session.status != 'completed':
+        raise StatsError('only completed sessions can be reviewed')
+    if session.rating is not None:
+        raise StatsError('session already reviewed')
+    if not isinstance(rating, int) or isinstance(rating, bool) or not 1 <= rating <= 5:
+        raise StatsError('rating must be an integer from 1 to 5')
+    sessions = MentorshipSession.__table__
+    claimed = db.session.execute(
+        sessions.update()
+        .where(sessions.c.session_id == session.session_id, sessions.c.status == 'completed',
+               sessions.c.rating.is_(None))
+        .values(rating=rating, review=review)
+    ).rowcount
+    if claimed != 1:
+        raise StatsError('session already reviewed')
+    session.rating = rating
+    session.review = review
+    table = Mentor.__table__
+    rating_sum = func.coalesce(table.c.rating_sum, 0.0)
+    rating_count = func.coalesce(table.c.rating_count, 0)
+    # `rating` is assigned first so it reads the old totals on every backend
+    # (MySQL evaluates SET clauses left to right, Postgres/SQLite against the old row)
+    db.session.execute(
+        table.update().where(table.c.mentor_id == session.mentor_id).ordered_values(
+            (table.c.rating, (rating_sum + rating) / (rating_count + 1)),
+            (table.c.rating_sum, rating_sum + rating),
+            (table.c.rating_count, rating_count + 1),
+        )
+    )
+    touch(db.session, 'mentors', [session.mentor_id])
+
+
+def _actual_stats():
+    completed = MentorshipSession.status == 'completed'
+    rows = (
+        db.session.query(
+            MentorshipSession.mentor_id,
+            func.sum(case((completed, 1), else_=0)).label('sessions_completed'),
+            func.count(distinct(case((completed, MentorshipSession.mentee_id)))).label('total_mentees'),
+            func.sum(case((completed, MentorshipSession.rating))).label('rating_sum'),
+            func.count(case((completed, MentorshipSession.rating))).label('rating_count'),
+        )
+        .group_by(MentorshipSession.mentor_id)
+    )
+    out = {}
+    for r in rows:
+        rating_sum = float(r.rating_sum or 0)
+        rating_count = int(r.rating_count or 0)
+        out[r.mentor_id] = {
+            'sessions_completed': int(r.sessions_completed or 0),
+            'total_mentees': int(r.total_mentees or 0),
+            'rating_sum': rating_sum,
+            'rating_count': rating_count,
+            'rating': rating_sum / rating_count if rating_count else 0.0,
+        }
+    return out
+
+
+def reconcile(fix=False, tolerance=1e-6):
+    """Recompute every mentor's stats in bulk; return a list of drifted fields.
+
+    Each drift entry is ``{'mentor_id', 'field', 'stored', 'actual'}``. With ``fix`` the
+    stored values are overwritten (one UPDATE per drifted mentor) and committed.
+    """
+    actual = _actual_stats()
+    zero = {'sessions_completed': 0, 'total_mentees': 0, 'rating_sum': 0.0, 'rating_count': 0, 'rating': 0.0}
+    drift = []
+    fixes = {}
+    columns = [getattr(Mentor, f) for f in FIELDS]
+    for row in db.session.query(Mentor.mentor_id, *columns):
+        expected = actual.get(row.mentor_id, zero)
+        for field in FIELDS:
+            stored = getattr(row, field) or 0
+            if abs(stored - expected[field]) > tolerance:
+                drift.append({'mentor_id': row.mentor_id, 'field': field, 'stored': stored, 'actual': expected[field]})
+                fixes.setdefault(row.mentor_id, {})[field] = expected[field]
+    if fix and fixes:
+        table = Mentor.__table__
+        for mentor_id, values in fixes.items():
+            db.session.execute(table.update().where(table.c.mentor_id == mentor_id).values(**values))
+        touch(db.session, 'mentors', fixes)
+        db.session.commit()
+    return drift
@@ -9,13 +9,7 @@ class User(db.Model):
     password_hash = db.Column(db.String(255), nullable=False)
     is_active = db.Column(db.Boolean, default=True)
     email_verified = db.Column(db.Boolean, default=False)
-    verification_token = db.Column(db.String(255), nullable=True)
-    verification_expires = db.Column(db.DateTime(timezone=True), nullable=True)
-    reset_token = db.Column(db.String(255), nullable=True)
-    reset_expires = db.Column(db.DateTime(timezone=True), nullable=True)
     token_version = db.Column(db.Integer, default=0)
-    refresh_token = db.Column(db.String(255), nullable=True)
-    refresh_expires = db.Column(db.DateTime(timezone=True), nullable=True)
     role = db.Column(db.String(32), default='student')
     is_premium = db.Column(db.Boolean, default=False)
     profile_photo_url = db.Column(db.String(512))
@@ -24,6 +18,8 @@ class User(db.Model):
     date_joined = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     last_login = db.Column(db.DateTime(timezone=True))
     notifications_enabled = db.Column(db.Boolean, default=True)
+    # 'off' (email each event), 'hourly' or 'daily' (see app.digests)
+    email_digest = db.Column(db.String(16), default='off')
 
     # relationships
     mentor_profile = db.relationship('Mentor', backref='user', uselist=False)
@@ -38,10 +34,17 @@ class Mentor(db.Model):
     rating = db.Column(db.Float, default=0.0)
     sessions_completed = db.Column(db.Integer, default=0)
     total_mentees = db.Column(db.Integer, default=0)
+    # running totals behind `rating`, maintained by app.mentor_stats
+    rating_sum = db.Column(db.Float, default=0.0)
+    rating_count = db.Column(db.Integer, default=0)
 
 
 class MentorApplication(db.Model):
     __tablename__ = 'mentor_applications'
+    __table_args__ = (
+        # admin review queue: WHERE status = ? ORDER BY submitted_at, id
+        db.Index('ix_mentor_applications_status_submitted', 'status', 'submitted_at', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'))
     expertise = db.Column(db.Text)
@@ -78,14 +81,23 @@ class ProgramEnrollment(db.Model):
 
 class MentorshipSession(db.Model):
     __tablename__ = 'mentorship_sessions'
+    __table_args__ = (
+        # conflict detection and availability look up one mentor's sessions by start time
+        db.Index('ix_mentorship_sessions_mentor_start', 'mentor_id', 'start_at'),
+    )
     session_id = db.Column(db.Integer, primary_key=True)
     mentor_id = db.Column(db.Integer, db.ForeignKey('mentors.mentor_id'))
     mentee_id = db.Column(db.Integer, db.ForeignKey('users.user_id'))
     date_booked = db.Column(db.DateTime(timezone=True))
     time_slot = db.Column(db.String(64))
+    start_at = db.Column(db.DateTime(timezone=True))
+    end_at = db.Column(db.DateTime(timezone=True))
     status = db.Column(db.String(32), default='pending')
     chat_enabled = db.Column(db.Boolean, default=False)
     session_notes = db.Column(db.Text)
+    rating = db.Column(db.Integer)
+    review = db.Column(db.Text)
+    completed_at = db.Column(db.DateTime(timezone=True))
     created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
 
@@ -103,6 +115,10 @@ class Payment(db.Model):
 
 class BlogPost(db.Model):
     __tablename__ = 'blog_posts'
+    __table_args__ = (
+        # keyset pagination of the public listing: WHERE status = ? ORDER BY created_at, post_id
+        db.Index('ix_blog_posts_status_created', 'status', 'created_at', 'post_id'),
+    )
     post_id = db.Column(db.Integer, primary_key=True)
     author_id = db.Column(db.Integer, db.ForeignKey('users.user_id'))
     title = db.Column(db.String(255))
@@ -116,8 +132,16 @@ class BlogPost(db.Model):
 
 class Notification(db.Model):
     __tablename__ = 'notifications'
+    __table_args__ = (
+        # per-user feed: WHERE user_id = ? ORDER BY created_at DESC, notification_id DESC
+        db.Index('ix_notifications_user_created', 'user_id', 'created_at', 'notification_id'),
+        # broadcasts: WHERE user_id IS NULL AND audience IN (...) ORDER BY created_at DESC
+        db.Index('ix_notifications_audience_created', 'audience', 'created_at', 'notification_id'),
+    )
     notification_id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'))
+    # set (with user_id NULL) on broadcasts: 'all' or the role it is addressed to
+    audience = db.Column(db.String(32))
     title = db.Column(db.String(255))
     message = db.Column(db.Text)
     type = db.Column(db.String(64))
@@ -141,3 +165,117 @@ class AuditLog(db.Model):
     target = db.Column(db.String(128))
     detail = db.Column(db.Text)
     timestamp = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+
+class SearchDocument(db.Model):
+    """Per-post statistics for the blog full-text index (see app.blog_search)."""
+    __tablename__ = 'search_documents'
+    post_id = db.Column(db.Integer, db.ForeignKey('blog_posts.post_id'), primary_key=True)
+    length = db.Column(db.Integer, nullable=False, default=0)
+
+
+class SearchPosting(db.Model):
+    """Inverted index entry: ``term`` occurs ``tf`` times in ``post_id``."""
+    __tablename__ = 'search_postings'
+    term = db.Column(db.String(64), primary_key=True)
+    post_id = db.Column(db.Integer, db.ForeignKey('blog_posts.post_id'), primary_key=True, index=True)
+    tf = db.Column(db.Integer, nullable=False, default=1)
+
+
+class ContentVersion(db.Model):
+    """Monotonic version per content namespace, bumped in the transaction that changes it."""
+    __tablename__ = 'content_versions'
+    namespace = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+
+class Tag(db.Model):
+    __tablename__ = 'tags'
+    tag_id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(64), unique=True, nullable=False)
+    post_count = db.Column(db.Integer, nullable=False, default=0)  # published posts carrying the tag
+
+
+class BlogPostTag(db.Model):
+    __tablename__ = 'blog_post_tags'
+    __table_args__ = (
+        db.Index('ix_blog_post_tags_tag_post', 'tag_id', 'post_id'),
+    )
+    post_id = db.Column(db.Integer, db.ForeignKey('blog_posts.post_id'), primary_key=True)
+    tag_id = db.Column(db.Integer, db.ForeignKey('tags.tag_id'), primary_key=True)
+
+
+class TrendingScore(db.Model):
+    """Periodic snapshot of the in-memory trending scores (see app.trending)."""
+    __tablename__ = 'trending_scores'
+    post_id = db.Column(db.Integer, db.ForeignKey('blog_posts.post_id'), primary_key=True)
+    score = db.Column(db.Float, nullable=False, default=0.0)  # decayed value as of computed_at
+    computed_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+
+class AuthToken(db.Model):
+    """Refresh, password-reset and email-verification tokens, stored as SHA-256 digests (see app.auth_tokens)."""
+    __tablename__ = 'auth_tokens'
+    __table_args__ = (
+        db.Index('ix_auth_tokens_user_type', 'user_id', 'token_type'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
+    token_type = db.Column(db.String(16), nullable=False)  # 'refresh', 'reset' or 'verify'
+    digest = db.Column(db.String(64), nullable=False, unique=True, index=True)
+    expires_at = db.Column(db.DateTime(timezone=True), nullable=False, index=True)
+    created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+
+class NotificationCounter(db.Model):
+    """Unread notifications per user, kept in step with `notifications` by app.inbox."""
+    __tablename__ = 'notification_counters'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), primary_key=True)
+    unread = db.Column(db.Integer, nullable=False, default=0)
+
+
+class PendingEmail(db.Model):
+    """An email held back for the user's next digest."""
+    __tablename__ = 'pending_emails'
+    __table_args__ = (
+        db.Index('ix_pending_emails_user', 'user_id', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
+    subject = db.Column(db.String(255))
+    body = db.Column(db.Text)
+    template_name = db.Column(db.String(128))
+    template_context = db.Column(db.Text)  # JSON
+    created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), index=True)
+    # lease of the compaction run rendering and sending this event
+    locked_by = db.Column(db.String(32))
+    locked_until = db.Column(db.DateTime(timezone=True))
+
+
+class OutboxMessage(db.Model):
+    """A task to publish, written in the same transaction as the change it belongs to."""
+    __tablename__ = 'task_outbox'
+    __table_args__ = (
+        # relay: WHERE dispatched_at IS NULL ORDER BY id
+        db.Index('ix_task_outbox_pending', 'dispatched_at', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    task_name = db.Column(db.String(128), nullable=False)
+    args = db.Column(db.Text)  # JSON; cleared once dispatched
+    kwargs = db.Column(db.Text)  # JSON; cleared once dispatched
+    created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    locked_by = db.Column(db.String(32))
+    locked_until = db.Column(db.DateTime(timezone=True))
+    dispatched_at = db.Column(db.DateTime(timezone=True))
+    failed_at = db.Column(db.DateTime(timezone=True))  # gave up after OUTBOX_MAX_ATTEMPTS
+
+
+class NotificationReceipt(db.Model):
+    """A user has read a broadcast notification; written lazily, on first read."""
+    __tablename__ = 'notification_receipts'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), primary_key=True)
+    notification_id = db.Column(db.Integer, db.ForeignKey('notifications.notification_id'), primary_key=True)
+    read_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
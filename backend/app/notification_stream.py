@@ -0,0 +1,214 @@
+"""Push new notifications to connected clients over Server-Sent Events.
+
+Each open ``/notifications/stream`` response holds a ``Subscription``: a small queue
+filled by the worker's broker. Every notification is handed to the broker after its
+transaction commits (``inbox.on_created``). ``LocalBroker`` delivers within the
+worker. With ``NOTIFICATION_STREAM_REDIS_URL`` set, ``RedisBroker`` publishes to Redis
+pub/sub instead, and each worker's listener thread delivers what it receives to its own
+subscribers, so a notification created in one worker reaches streams held by another.
+Broadcasts go to every subscription whose audiences include the notification's.
+
+Streams block on queue reads only, so under gunicorn's gevent worker (which
+monkey-patches threading and queue) an idle connection costs a greenlet, not a worker.
+That is how the ``gisave-stream`` service in render.yaml serves them, fed through Redis.
+Under a threaded worker each open stream holds a thread for up to
+``NOTIFICATION_STREAM_MAX_SECONDS``, so a worker accepts at most
+``NOTIFICATION_STREAM_MAX_CONNECTIONS`` streams and answers 503 beyond that; keep it
+well below gunicorn's ``--threads``.
+"""
+import json
+import queue
+import threading
+import time
+from collections import defaultdict
+
+from flask import current_app, has_app_context
+
+from . import inbox
+
+
+class StreamBusy(Exception):
+    pass
+
+
+class Subscription:
+    def __init__(self, broker, user_id, maxsize, audiences=()):
+        self.broker = broker
+        self.user_id = user_id
+        self.audiences = frozenset(audiences)
+        self.queue = queue.Queue(maxsize)
+        self.overflowed = False
+
+    def get(self, timeout):
+        """Next event, or None after ``timeout`` seconds."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    def __init__(self, max_queue=100, max_connections=None):
+        self.max_queue = max_queue
+        self.max_connections = max_connections
+        self._subscriptions = defaultdict(set)
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id, audiences=()):
+        """Open a subscription; raises ``StreamBusy`` at ``max_connections``."""
+        subscription = Subscription(self, user_id, self.max_queue, audiences)
+        with self._lock:
+            if self.max_connections is not None and self._count >= self.max_connections:
+                raise StreamBusy()
+            self._subscriptions[user_id].add(subscription)
+            self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subs = self._subscriptions.get(subscription.user_id)
+            if subs is not None and subscription in subs:
+                subs.discard(subscription)
+                self._count -= 1
+                if not subs:
+                    del self._subscriptions[subscription.user_id]
+
+    def connections(self):
+        with self._lock:
+            return self._count
+
+    def deliver(self, user_id, event):
+        """Queue ``event`` for the user's streams; a ``user_id`` of None means a broadcast."""
+        with self._lock:
+            if user_id is None:
+                audience = event.get('audience')
+                subs = [s for group in self._subscriptions.values() for s in group if audience in s.audiences]
+            else:
+                subs = list(self._subscriptions.get(user_id, ()))
+        for subscription in subs:
+            try:
+                subscription.queue.put_nowait(event)
+            except queue.Full:
+                # a stalled client: its stream ends and it catches up via Last-Event-ID
+                subscription.overflowed = True
+
+    def publish(self, user_id, event):
+        self.deliver(user_id, event)
+
+    def close(self):
+        pass
+
+
+class RedisBroker(LocalBroker):
+    """Fan-out through Redis pub/sub (any client with ``publish`` and ``pubsub``)."""
+
+    BROADCAST = 'broadcast'
+
+    def __init__(self, client, prefix='notifications:', max_queue=100, logger=None, max_connections=None):
+        super().__init__(max_queue, max_connections)
+        self.client = client
+        self.prefix = prefix
+        self.logger = logger
+        self._stop = threading.Event()
+        self._thread = None
+        self._ready = threading.Event()
+
+    def subscribe(self, user_id, audiences=()):
+        self._start()
+        return super().subscribe(user_id, audiences)
+
+    def publish(self, user_id, event):
+        target = self.BROADCAST if user_id is None else user_id
+        self.client.publish(f'{self.prefix}{target}', json.dumps(event))
+
+    def _start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._listen, name='notification-stream', daemon=True)
+            self._thread.start()
+        self._ready.wait(5)
+
+    def _listen(self):
+        backoff = 0.5
+        while not self._stop.is_set():
+            try:
+                pubsub = self.client.pubsub()
+                pubsub.psubscribe(f'{self.prefix}*')
+                self._ready.set()
+                backoff = 0.5
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if not message or message.get('type') != 'pmessage':
+                        continue
+                    channel = message['channel']
+                    if isinstance(channel, bytes):
+                        channel = channel.decode('utf-8')
+                    target = channel[len(self.prefix):]
+                    user_id = None if target == self.BROADCAST else int(target)
+                    self.deliver(user_id, json.loads(message['data']))
+            except Exception:
+                if self.logger:
+                    self.logger.warning('notification stream listener failed, retrying', exc_info=True)
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30)
+
+    def close(self):
+        self._stop.set()
+
+
+def format_event(payload, event='notification'):
+    lines = []
+    if payload.get('notification_id') is not None:
+        lines.append(f"id: {payload['notification_id']}")
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(payload)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def stream(subscription, backlog=(), keepalive=15.0, max_seconds=300.0, clock=time.monotonic):
+    """Generator of SSE chunks for one subscription; always unsubscribes when it ends."""
+    deadline = clock() + max_seconds
+    try:
+        yield 'retry: 3000\n\n'
+        for payload in backlog:
+            yield format_event(payload)
+        while not subscription.overflowed:
+            remaining = deadline - clock()
+            if remaining <= 0:
+                break
+            payload = subscription.get(min(keepalive, remaining))
+            yield format_event(payload) if payload is not None else ': keep-alive\n\n'
+    finally:
+        subscription.close()
+
+
+def _publish_created(user_id, payload):
+    if has_app_context() and hasattr(current_app, 'notification_broker'):
+        try:
+            current_app.notification_broker.publish(user_id, payload)
+        except Exception:
+            current_app.logger.exception('failed to publish notification %s', payload.get('notification_id'))
+
+
+inbox.on_created(_publish_created)
+
+
+def init_app(app):
+    max_queue = int(app.config.get('NOTIFICATION_STREAM_QUEUE', 100))
+    max_connections = int(app.config.get('NOTIFICATION_STREAM_MAX_CONNECTIONS', 4)) or None
+    url = app.config.get('NOTIFICATION_STREAM_REDIS_URL')
+    broker = None
+    if url:
+        try:
+            import redis
+            broker = RedisBroker(redis.Redis.from_url(url), max_queue=max_queue, logger=app.logger,
+                                 max_connections=max_connections)
+        except Exception:
+            app.logger.exception('Redis notification broker unavailable, using in-process fan-out')
+    app.notification_broker = broker or LocalBroker(max_queue, max_connections)
+    return app.notification_broker
@@ -0,0 +1,191 @@
+"""Transactional outbox for Celery tasks.
+
+``enqueue`` adds a ``task_outbox`` row to the caller's transaction instead of talking to
+the broker, so the task exists if and only if the change it belongs to commits, and the
+request never waits on the broker. A relay (a background task, woken on every commit that
+wrote to the outbox and otherwise run every ``OUTBOX_RELAY_INTERVAL`` seconds) claims
+pending rows in batches under a lease, publishes them over one producer and marks them
+dispatched. A relay that dies mid-batch leaves its rows to be claimed again when the
+lease runs out, so delivery is at-least-once: tasks must tolerate duplicates.
+
+Dispatched rows keep their bookkeeping but lose their payload (which may carry one-time
+tokens) and are purged after ``OUTBOX_RETENTION`` seconds. With the in-process executor
+(no broker) being handed a task is not the same as running it, so there the relay leaves
+the row leased and the executor calls ``settle`` once the task finished; a task lost with
+its process is published again when the lease runs out. A row that failed to publish
+``OUTBOX_MAX_ATTEMPTS`` times (an unknown task, an unserialisable payload) is marked
+``failed_at``, logged once and left for inspection; the relay no longer picks it up.
+A publisher that is merely full raises ``Backpressure``: the relay then stops the batch
+and releases the rest for ``BUSY_BACKOFF`` seconds without counting an attempt.
+"""
+import json
+import uuid
+from contextlib import nullcontext
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app, has_app_context
+from sqlalchemy import and_, event, or_
+from sqlalchemy.orm import Session
+
+from . import db
+from .background import schedule
+from .models import OutboxMessage
+
+RELAY_TASK = 'outbox-relay'
+WRITTEN_KEY = 'outbox_written'
+BUSY_BACKOFF = 5.0
+
+
+class Backpressure(Exception):
+    """Raised by ``send_task`` when the publisher is full for now; not a failed attempt."""
+
+
+def enqueue(task_name, args=(), kwargs=None, session=None):
+    """Publish ``task_name`` once the current transaction (of ``session``, by default the
+    request's) commits. Does not commit."""
+    session = session or db.session
+    session.add(OutboxMessage(
+        task_name=task_name,
+        args=json.dumps(list(args), default=str),
+        kwargs=json.dumps(kwargs, default=str) if kwargs else None,
+    ))
+    session.info[WRITTEN_KEY] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _wake_relay(session):
+    if session.info.pop(WRITTEN_KEY, None) and has_app_context():
+        relay = current_app.extensions.get('background_tasks', {}).get(RELAY_TASK)
+        if relay is not None:
+            relay.wake()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_after_rollback(session):
+    session.info.pop(WRITTEN_KEY, None)
+
+
+def _claim(batch_size, lease, now):
+    """Lease up to ``batch_size`` pending rows to this relay and commit the claim."""
+    token = uuid.uuid4().hex
+    claimable = and_(
+        OutboxMessage.dispatched_at.is_(None),
+        OutboxMessage.failed_at.is_(None),
+        or_(OutboxMessage.locked_until.is_(None), OutboxMessage.locked_until < now),
+    )
+    ids = [i for (i,) in (
+        db.session.query(OutboxMessage.id).filter(claimable)
+        .order_by(OutboxMessage.id).limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )]
+    if not ids:
+        db.session.commit()
+        return []
+    table = OutboxMessage.__table__
+    db.session.execute(
+        table.update().where(table.c.id.in_(ids), claimable)
+        .values(locked_by=token, locked_until=now + lease)
+    )
+    db.session.commit()
+    return OutboxMessage.query.filter(OutboxMessage.locked_by == token).order_by(OutboxMessage.id).all()
+
+
+def relay_once(batch_size=100, lease=60.0, now=None, max_attempts=10):
+    """Publish one batch of pending tasks; returns how many were dispatched."""
+    now = now or datetime.now(timezone.utc)
+    rows = _claim(batch_size, timedelta(seconds=lease), now)
+    if not rows:
+        return 0
+    celery = current_app.celery
+    acks = getattr(celery, 'acks_outbox', False)
+    acquire = getattr(celery, 'producer_or_acquire', None)
+    done, failed, deferred = [], [], []
+    with (acquire() if acquire else nullcontext()) as producer:
+        options = {'producer': producer} if producer is not None else {}
+        for i, row in enumerate(rows):
+            if acks:
+                options['outbox_id'] = row.id
+            try:
+                celery.send_task(row.task_name, args=json.loads(row.args or '[]'),
+                                 kwargs=json.loads(row.kwargs) if row.kwargs else None, **options)
+                done.append(row.id)
+            except Backpressure:
+                deferred = [r.id for r in rows[i:]]
+                break
+            except Exception as exc:
+                failed.append((row, exc))
+    table = OutboxMessage.__table__
+    if deferred:
+        db.session.execute(
+            table.update().where(table.c.id.in_(deferred))
+            .values(locked_by=None, locked_until=now + timedelta(seconds=BUSY_BACKOFF))
+        )
+    if done and not acks:  # otherwise the lease holds them until ``settle``
+        db.session.execute(
+            table.update().where(table.c.id.in_(done))
+            .values(dispatched_at=datetime.now(timezone.utc), args=None, kwargs=None, locked_by=None, locked_until=None)
+        )
+    given_up = []
+    for row, exc in failed:
+        values = {'attempts': table.c.attempts + 1, 'last_error': str(exc)[:500], 'locked_by': None}
+        if row.attempts + 1 >= max_attempts:
+            values.update(failed_at=now, locked_until=None)
+            given_up.append((row, exc))
+        else:
+            # back off before the next attempt; the lease keeps other relays away meanwhile
+            values['locked_until'] = now + timedelta(seconds=min(300, 2 ** row.attempts))
+        db.session.execute(table.update().where(table.c.id == row.id).values(**values))
+    db.session.commit()
+    if len(failed) > len(given_up):
+        current_app.logger.warning('outbox: %d of %d tasks failed to publish', len(failed) - len(given_up), len(rows))
+    for row, exc in given_up:
+        current_app.logger.error('outbox: giving up on task %s (row %d) after %d attempts: %s',
+                                 row.task_name, row.id, max_attempts, exc)
+    if deferred:
+        current_app.logger.info('outbox: publisher busy, %d tasks deferred', len(deferred))
+    return len(done)
+
+
+def settle(outbox_id, error=None, failed=False):
+    """Mark row ``outbox_id`` done (or ``failed``) once its task finished; commits on its own
+    session, as the caller is an executor thread whose task may have left its session dirty."""
+    table = OutboxMessage.__table__
+    now = datetime.now(timezone.utc)
+    values = {'locked_by': None, 'locked_until': None, 'args': None, 'kwargs': None}
+    values.update({'failed_at': now} if failed else {'dispatched_at': now})
+    if error is not None:
+        values['last_error'] = str(error)[:500]
+    with Session(bind=db.engine) as session:
+        session.execute(table.update().where(table.c.id == outbox_id, table.c.dispatched_at.is_(None)).values(**values))
+        session.commit()
+
+
+def purge(retention, now=None):
+    """Delete rows dispatched more than ``retention`` seconds ago. Commits."""
+    now = now or datetime.now(timezone.utc)
+    table = OutboxMessage.__table__
+    deleted = db.session.execute(
+        table.delete().where(table.c.dispatched_at < now - timedelta(seconds=retention))
+    ).rowcount
+    db.session.commit()
+    return deleted
+
+
+def drain(batch_size=100, max_batches=100, max_attempts=10):
+    """Relay until the outbox is empty (or ``max_batches`` ran); returns how many were dispatched."""
+    total = 0
+    for _ in range(max_batches):
+        dispatched = relay_once(batch_size, max_attempts=max_attempts)
+        total += dispatched
+        if dispatched < batch_size:
+            break
+    return total
+
+
+def init_app(app):
+    batch_size = int(app.config.get('OUTBOX_BATCH_SIZE', 100))
+    retention = float(app.config.get('OUTBOX_RETENTION', 86400))
+    max_attempts = int(app.config.get('OUTBOX_MAX_ATTEMPTS', 10))
+    schedule(app, RELAY_TASK, app.config.get('OUTBOX_RELAY_INTERVAL', 1.0),
+             lambda: drain(batch_size, max_attempts=max_attempts))
+    schedule(app, 'outbox-purge', app.config.get('OUTBOX_PURGE_INTERVAL', 3600), lambda: purge(retention))
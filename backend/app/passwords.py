@@ -0,0 +1,137 @@
+"""bcrypt password hashing in a bounded process pool.
+
+bcrypt is slow on purpose, so hashing inline lets a burst of logins hold every request
+thread of a worker. Hashes run in a small per-worker process pool instead. At most
+``PASSWORD_HASH_MAX_PENDING`` calls may be queued or running at once; any further call
+fails fast with ``PasswordHasherBusy``, which is served as a 503 with ``Retry-After``.
+Keep the limit below gunicorn's ``--threads`` so the remaining threads stay free for
+other endpoints during a login storm. Testing apps, and ``PASSWORD_HASH_WORKERS=0``, hash inline.
+
+``BCRYPT_ROUNDS`` is the work factor for new hashes. ``needs_rehash`` tells whether a
+stored hash was made with a different cost, so login can upgrade it transparently.
+"""
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+from flask import current_app, jsonify
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+def _hashpw(password, rounds):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _checkpw(password, hashed):
+    return bcrypt.checkpw(password, hashed)
+
+
+def hash_cost(hashed):
+    """Work factor of a ``$2b$12$...`` hash, or None if it is not a bcrypt hash."""
+    try:
+        return int(hashed.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    def __init__(self, rounds=12, workers=1, max_pending=4, timeout=10.0):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pending = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _pool(self):
+        if self._executor is None:
+            # spawn, not fork: the worker process is multi-threaded by now
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+
+    def _release(self, _future=None):
+        with self._lock:
+            self.pending -= 1
+
+    def run(self, func, *args, inline=False):
+        if inline or self.workers <= 0:
+            return func(*args)
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHasherBusy()
+            self.pending += 1
+            try:
+                future = self._pool().submit(func, *args)
+            except BrokenProcessPool:
+                self._executor = None
+                self.pending -= 1
+                raise PasswordHasherBusy()
+            except Exception:
+                self.pending -= 1
+                raise
+        # the slot is held until the hash really finishes, even if we stop waiting
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise PasswordHasherBusy()
+        except BrokenProcessPool:
+            with self._lock:
+                self._executor = None
+            raise PasswordHasherBusy()
+
+    def hash(self, password, inline=False):
+        return self.run(_hashpw, password.encode('utf-8'), self.rounds, inline=inline).decode('utf-8')
+
+    def check(self, password, hashed, inline=False):
+        return self.run(_checkpw, password.encode('utf-8'), hashed.encode('utf-8'), inline=inline)
+
+    def needs_rehash(self, hashed):
+        return hash_cost(hashed) != self.rounds
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def hash_password(password):
+    return current_app.password_hasher.hash(password, inline=current_app.testing)
+
+
+def check_password(password, hashed):
+    return current_app.password_hasher.check(password, hashed, inline=current_app.testing)
+
+
+def needs_rehash(hashed):
+    return current_app.password_hasher.needs_rehash(hashed)
+
+
+def init_app(app):
+    app.password_hasher = PasswordHasher(
+        rounds=int(app.config.get('BCRYPT_ROUNDS', 12)),
+        workers=int(app.config.get('PASSWORD_HASH_WORKERS', 1)),
+        max_pending=int(app.config.get('PASSWORD_HASH_MAX_PENDING', 4)),
+        timeout=float(app.config.get('PASSWORD_HASH_TIMEOUT', 10)),
+    )
+
+    @app.errorhandler(PasswordHasherBusy)
+    def _busy(_e):
+        resp = jsonify({'error': 'server busy, try again shortly'})
+        resp.status_code = 503
+        resp.headers['Retry-After'] = '1'
+        return resp
+
+    atexit.register(app.password_hasher.shutdown)
+    return app.password_hasher
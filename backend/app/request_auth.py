@@ -0,0 +1,124 @@
+"""Per-request bearer token decoding with a cache of verified tokens.
+
+A before_request hook decodes the ``Authorization: Bearer`` token once and stores the
+claims on ``g`` (``g.jwt_claims``, or None with the reason in ``g.jwt_error``); every
+auth decorator and helper reads them from there. Verified tokens are kept in a bounded
+LRU keyed by the token's SHA-256 digest, each entry expiring at the token's ``exp``, so
+a client sending the same token on every request pays for signature verification once.
+Revocation (``tv`` against the user's token_version, see app.token_revocation) is
+checked on every decode, cached or not.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+from flask import current_app, g, request
+
+MISSING = 'missing token'
+REVOKED = 'token revoked'
+
+
+class TokenCache:
+    """LRU of ``digest -> (claims, exp)``; tokens without a numeric ``exp`` are not cached."""
+
+    def __init__(self, maxsize=4096, clock=time.time):
+        self.maxsize = maxsize
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(token):
+        return hashlib.sha256(token.encode('utf-8')).digest()
+
+    def get(self, token):
+        key = self.key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            claims, exp = entry
+            if exp <= self.clock():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return claims
+
+    def put(self, token, claims):
+        exp = claims.get('exp')
+        if not isinstance(exp, (int, float)) or self.maxsize <= 0:
+            return
+        key = self.key(token)
+        with self._lock:
+            self._entries[key] = (claims, exp)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def decode_token(token):
+    """Return ``(claims, error)`` for ``token``; claims is a fresh dict the caller may modify."""
+    if not token:
+        return None, MISSING
+    cache = current_app.token_cache
+    claims = cache.get(token)
+    if claims is None:
+        secret = current_app.config.get('JWT_SECRET') or current_app.config.get('SECRET_KEY')
+        try:
+            claims = jwt.decode(token, secret, algorithms=['HS256'])
+        except Exception as e:
+            return None, str(e) or 'invalid token'
+        cache.put(token, claims)
+    if current_app.token_versions.is_revoked(claims):
+        return None, REVOKED
+    return dict(claims), None
+
+
+def bearer_token():
+    auth = request.headers.get('Authorization', '')
+    if auth.startswith('Bearer '):
+        return auth.split(' ', 1)[1]
+    return None
+
+
+def load_request_auth():
+    token = bearer_token()
+    g.jwt_token = token
+    g.jwt_claims, g.jwt_error = decode_token(token)
+
+
+def current_claims(cookie=None):
+    """Claims of the current request's bearer token (or of ``cookie`` when there is none)."""
+    token = bearer_token()
+    if 'jwt_claims' not in g or g.get('jwt_token') != token:
+        # outside the hook (e.g. a test_request_context) or g outlived its request
+        load_request_auth()
+    if g.jwt_claims is None and token is None and cookie:
+        return decode_token(request.cookies.get(cookie))[0]
+    return g.jwt_claims
+
+
+def auth_error():
+    """Why ``current_claims()`` is None: ``MISSING`` or the decode error."""
+    current_claims()
+    return g.jwt_error
+
+
+def init_app(app):
+    app.token_cache = TokenCache(maxsize=int(app.config.get('JWT_CACHE_SIZE', 4096)))
+    app.before_request(load_request_auth)
+    return app.token_cache
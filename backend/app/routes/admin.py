@@ -2,6 +2,11 @@
 from flask import Blueprint, request, jsonify, current_app, make_response
 from ..models import User, BlogPost
 from .. import db
+from ..request_auth import decode_token
+from ..utils import require_roles, get_jwt_payload
+from ..token_revocation import bump_token_version
+from .. import auth_tokens
+from ..models import AuditLog
 import datetime
 
 admin_bp = Blueprint('admin_routes', __name__)
@@ -26,17 +31,22 @@ def admin_metrics():
     }
 
 
+@admin_bp.route('/tasks', methods=['GET'])
+@require_roles('admin')
+def task_metrics():
+    """Queue depth of the in-process task executor (empty when Celery runs the tasks)."""
+    stats = getattr(current_app.celery, 'stats', None)
+    return jsonify({'executor': 'in-process', **stats()} if stats else {'executor': 'celery'})
+
+
 @admin_bp.route('/login', methods=['POST'])
 def admin_login():
     data = request.get_json() or {}
     email = data.get('email')
     token = data.get('token')
     # token is expected to be a valid JWT token already; we just validate role and set a cookie
-    import jwt
-    secret = current_app.config.get('JWT_SECRET') or current_app.config.get('SECRET_KEY')
-    try:
-        payload = jwt.decode(token, secret, algorithms=['HS256'])
-    except Exception:
+    payload, _ = decode_token(token)
+    if payload is None:
         return jsonify({'error': 'invalid token'}), 401
     if payload.get('role') != 'admin':
         return jsonify({'error': 'forbidden'}), 403
@@ -55,3 +65,16 @@ def moderation_queue():
     for p in posts:
         out.append({'post_id': p.post_id, 'title': p.title, 'author_id': p.author_id, 'created_at': p.created_at})
     return jsonify(out)
+
+
+@admin_bp.route('/users/<int:user_id>/revoke-tokens', methods=['POST'])
+@require_roles('admin')
+def revoke_user_tokens(user_id):
+    """Sign a user out everywhere: invalidate access tokens and delete refresh sessions."""
+    user = User.query.get_or_404(user_id)
+    version = bump_token_version(user)
+    auth_tokens.revoke(user.user_id, auth_tokens.REFRESH)
+    payload = get_jwt_payload() or {}
+    db.session.add(AuditLog(actor_id=payload.get('sub'), action='revoke_tokens', target=str(user.user_id)))
+    db.session.commit()
+    return jsonify({'message': 'tokens revoked', 'token_version': version}), 200
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from .. import db
 from ..models import AnalyticsLog
+from .. import trending
 
 analytics_bp = Blueprint('analytics', __name__)
 
@@ -11,6 +12,9 @@ def log_event():
     log = AnalyticsLog(user_id=data.get('user_id'), action=data.get('action'), metadata_json=data.get('metadata'))
     db.session.add(log)
     db.session.commit()
+    metadata = data.get('metadata')
+    if isinstance(metadata, dict) and isinstance(metadata.get('post_id'), int):
+        trending.record_event(metadata['post_id'], data.get('action'))
     return jsonify({'message': 'logged'})
 
 
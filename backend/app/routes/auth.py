@@ -1,33 +1,15 @@
 from flask import Blueprint, request, jsonify, current_app
 from .. import db
 from ..models import User
-import bcrypt
+from ..passwords import PasswordHasherBusy, hash_password, check_password, needs_rehash
+from .. import auth_tokens, outbox
+from ..token_revocation import bump_token_version
 import jwt
-import secrets
 from datetime import datetime, timedelta, timezone
-import secrets
 
 auth_bp = Blueprint('auth', __name__)
 
 
-def _ensure_aware(dt: "datetime | None"):
-    """Return a timezone-aware datetime in UTC. If dt is None, return None.
-    If dt has no tzinfo, assume UTC and attach timezone.utc.
-    """
-    if dt is None:
-        return None
-    if dt.tzinfo is None:
-        return dt.replace(tzinfo=timezone.utc)
-    return dt
-
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-
-
-def check_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
-
-
 @auth_bp.route('/register', methods=['POST'])
 def register():
     data = request.get_json() or {}
@@ -51,12 +33,11 @@ def register():
 
     # create verification token
     try:
-        token = secrets.token_urlsafe(32)
-        user.verification_token = token
-        user.verification_expires = datetime.now(timezone.utc) + timedelta(days=2)
+        token = auth_tokens.issue(user.user_id, auth_tokens.VERIFY)
+        outbox.enqueue('app.tasks.send_email', args=[user.email, 'Verify your email', f"Use this token to verify: {token}"])
         db.session.commit()
-        current_app.celery.send_task('app.tasks.send_email', args=[user.email, 'Verify your email', f"Use this token to verify: {token}"])
     except Exception:
+        db.session.rollback()
         current_app.logger.exception('failed to enqueue verification email')
 
     return jsonify({'message': 'registered'}), 201
@@ -72,6 +53,13 @@ def login():
     if not user or not check_password(password, user.password_hash):
         return jsonify({'error': 'invalid credentials'}), 401
 
+    # upgrade hashes made with a different BCRYPT_ROUNDS; the login itself must not fail on it
+    if needs_rehash(user.password_hash):
+        try:
+            user.password_hash = hash_password(password)
+        except PasswordHasherBusy:
+            pass
+
     payload = {
         'sub': user.user_id,
         'role': user.role,
@@ -87,11 +75,8 @@ def login():
     access_payload['exp'] = datetime.now(timezone.utc) + timedelta(minutes=15)
     access_token = jwt.encode(access_payload, secret, algorithm='HS256')
 
-    # create rotating refresh token stored server-side
-    refresh = secrets.token_urlsafe(48)
-    user.refresh_token = refresh
-    user.refresh_expires = datetime.now(timezone.utc) + timedelta(days=30)
-    db.session.commit()
+    # create rotating refresh token stored server-side (one per signed-in device)
+    refresh = auth_tokens.issue(user.user_id, auth_tokens.REFRESH, nbytes=48)
     user.last_login = datetime.now(timezone.utc)
     db.session.commit()
 
@@ -109,17 +94,11 @@ def forgot_password():
         # don't reveal user existence
         return jsonify({'message': 'if the email exists, a reset link was sent'}), 200
 
-    token = secrets.token_urlsafe(32)
-    user.reset_token = token
-    user.reset_expires = datetime.now(timezone.utc) + timedelta(hours=2)
+    # the token and its email commit together
+    token = auth_tokens.issue(user.user_id, auth_tokens.RESET)
+    outbox.enqueue('app.tasks.send_email', args=[user.email, 'Password reset', f"Use this token to reset: {token}"])
     db.session.commit()
 
-    # enqueue email (best-effort)
-    try:
-        current_app.celery.send_task('app.tasks.send_email', args=[user.email, 'Password reset', f"Use this token to reset: {token}"])
-    except Exception:
-        current_app.logger.exception('failed to enqueue reset email')
-
     return jsonify({'message': 'if the email exists, a reset link was sent'}), 200
 
 
@@ -130,15 +109,16 @@ def reset_password():
     password = data.get('password')
     if not token or not password:
         return jsonify({'error': 'token and password required'}), 400
-    user = User.query.filter_by(reset_token=token).first()
-    if not user or not user.reset_expires or _ensure_aware(user.reset_expires) < datetime.now(timezone.utc):
+    user_id = auth_tokens.consume(token, auth_tokens.RESET)
+    user = User.query.get(user_id) if user_id else None
+    if not user:
+        db.session.rollback()
         return jsonify({'error': 'invalid or expired token'}), 400
 
     user.password_hash = hash_password(password)
-    user.reset_token = None
-    user.reset_expires = None
-    # bump token_version to invalidate existing refresh tokens
-    user.token_version = (user.token_version or 0) + 1
+    # bump token_version and drop every refresh session to sign out other devices
+    bump_token_version(user)
+    auth_tokens.revoke(user.user_id, auth_tokens.REFRESH)
     db.session.commit()
 
     return jsonify({'message': 'password updated'}), 200
@@ -150,12 +130,12 @@ def verify_email():
     token = data.get('token')
     if not token:
         return jsonify({'error': 'token required'}), 400
-    user = User.query.filter_by(verification_token=token).first()
-    if not user or not user.verification_expires or _ensure_aware(user.verification_expires) < datetime.now(timezone.utc):
+    user_id = auth_tokens.consume(token, auth_tokens.VERIFY)
+    user = User.query.get(user_id) if user_id else None
+    if not user:
+        db.session.rollback()
         return jsonify({'error': 'invalid or expired token'}), 400
     user.email_verified = True
-    user.verification_token = None
-    user.verification_expires = None
     db.session.commit()
     return jsonify({'message': 'email verified'}), 200
 
@@ -166,14 +146,14 @@ def refresh_token():
     refresh = data.get('refresh_token')
     if not refresh:
         return jsonify({'error': 'refresh_token required'}), 400
-    user = User.query.filter_by(refresh_token=refresh).first()
-    if not user or not user.refresh_expires or _ensure_aware(user.refresh_expires) < datetime.now(timezone.utc):
+    user_id = auth_tokens.consume(refresh, auth_tokens.REFRESH)
+    user = User.query.get(user_id) if user_id else None
+    if not user:
+        db.session.rollback()
         return jsonify({'error': 'invalid or expired refresh token'}), 401
 
     # rotate refresh token
-    new_refresh = secrets.token_urlsafe(48)
-    user.refresh_token = new_refresh
-    user.refresh_expires = datetime.now(timezone.utc) + timedelta(days=30)
+    new_refresh = auth_tokens.issue(user.user_id, auth_tokens.REFRESH, nbytes=48)
     db.session.commit()
 
     secret = (
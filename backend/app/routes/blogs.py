@@ -1,37 +1,155 @@
 from flask import Blueprint, request, jsonify, current_app
 from .. import db
-from ..models import BlogPost
+from ..models import BlogPost, BlogPostTag, Tag
 from ..models import Notification, User
 from datetime import datetime, timezone
+from sqlalchemy import and_, or_
 from ..email_templates import render_email_template
+from ..digests import notify_email
+from .. import blog_search, blog_tags, trending
+from ..http_cache import conditional
+from ..utils import encode_cursor, decode_cursor, parse_limit
 
 blogs_bp = Blueprint('blogs', __name__)
 
 
 @blogs_bp.route('/', methods=['GET'])
+@conditional('blogs', weak=True)
 def list_blogs():
-    posts = BlogPost.query.filter_by(status='published').all()
-    data = []
-    for p in posts:
-        data.append({
-            'post_id': p.post_id,
-            'title': p.title,
-            'author_id': p.author_id,
-            'views': p.views_count,
-        })
-    return jsonify(data)
+    """Published posts, newest first, paginated by a (created_at, post_id) keyset cursor.
+
+    Only the listed columns are selected so the large ``content`` column is never loaded.
+    ``?tag=`` restricts the list to one tag; ``?legacy=1`` returns the old unpaginated
+    list while clients migrate.
+    """
+    query = db.session.query(
+        BlogPost.post_id, BlogPost.title, BlogPost.author_id, BlogPost.views_count, BlogPost.created_at,
+    ).filter(BlogPost.status == 'published')
+    tag = request.args.get('tag')
+    if tag:
+        names = blog_tags.normalize_tags([tag])
+        query = (
+            query.join(BlogPostTag, BlogPostTag.post_id == BlogPost.post_id)
+            .join(Tag, Tag.tag_id == BlogPostTag.tag_id)
+            .filter(Tag.name == (names[0] if names else ''))
+        )
+    counter = current_app.view_counter
+
+    def serialize(row):
+        return {
+            'post_id': row.post_id,
+            'title': row.title,
+            'author_id': row.author_id,
+            'views': (row.views_count or 0) + counter.pending(row.post_id),
+        }
+
+    if request.args.get('legacy') == '1':
+        return jsonify([serialize(r) for r in query.all()])
+
+    try:
+        limit = parse_limit()
+    except ValueError:
+        return jsonify({'error': 'invalid limit'}), 400
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            created_at, last_id = decode_cursor(cursor)
+            created_at = datetime.fromisoformat(created_at)
+        except (ValueError, TypeError):
+            return jsonify({'error': 'invalid cursor'}), 400
+        query = query.filter(or_(
+            BlogPost.created_at < created_at,
+            and_(BlogPost.created_at == created_at, BlogPost.post_id < last_id),
+        ))
+    rows = query.order_by(BlogPost.created_at.desc(), BlogPost.post_id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at.isoformat(), last.post_id)
+    items = []
+    for r in rows:
+        item = serialize(r)
+        item['created_at'] = r.created_at.isoformat() if r.created_at else None
+        items.append(item)
+    return jsonify({'items': items, 'next_cursor': next_cursor})
+
+
+@blogs_bp.route('/tags', methods=['GET'])
+@conditional('blogs')
+def list_tags():
+    try:
+        limit = parse_limit(default=100, maximum=500)
+    except ValueError:
+        return jsonify({'error': 'invalid limit'}), 400
+    return jsonify(blog_tags.tag_cloud(limit=limit))
+
+
+@blogs_bp.route('/trending', methods=['GET'])
+def trending_blogs():
+    try:
+        limit = parse_limit(default=10, maximum=50)
+    except ValueError:
+        return jsonify({'error': 'invalid limit'}), 400
+    # over-fetch a little: posts unpublished since their views are skipped below
+    ranked = trending.get_tracker().top(limit * 2)
+    rows = {}
+    if ranked:
+        rows = {
+            r.post_id: r for r in db.session.query(BlogPost.post_id, BlogPost.title, BlogPost.author_id)
+            .filter(BlogPost.post_id.in_([post_id for post_id, _ in ranked]), BlogPost.status == 'published')
+        }
+    items = [
+        {'post_id': post_id, 'title': rows[post_id].title, 'author_id': rows[post_id].author_id, 'score': round(score, 4)}
+        for post_id, score in ranked if post_id in rows
+    ]
+    return jsonify(items[:limit])
+
+
+@blogs_bp.route('/search', methods=['GET'])
+@conditional('blogs', weak=True)
+def search_blogs():
+    q = (request.args.get('q') or '').strip()
+    if not q:
+        return jsonify({'error': 'q required'}), 400
+    try:
+        limit = parse_limit(maximum=50)
+    except ValueError:
+        return jsonify({'error': 'invalid limit'}), 400
+    ranked = blog_search.search(q, limit=limit)
+    rows = {}
+    if ranked:
+        rows = {
+            r.post_id: r for r in db.session.query(BlogPost.post_id, BlogPost.title, BlogPost.author_id)
+            .filter(BlogPost.post_id.in_([post_id for post_id, _ in ranked]), BlogPost.status == 'published')
+        }
+    items = []
+    for post_id, score in ranked:
+        r = rows.get(post_id)
+        if r is None:
+            continue
+        items.append({'post_id': r.post_id, 'title': r.title, 'author_id': r.author_id, 'score': round(score, 4)})
+    return jsonify({'query': q, 'items': items})
+
+
+def _count_view(post_id):
+    current_app.view_counter.incr(post_id)
+    trending.record_event(post_id, 'blog_view')
 
 
 @blogs_bp.route('/<int:post_id>', methods=['GET'])
+@conditional('blogs', weak=True, on_not_modified=_count_view)
 def get_blog(post_id):
     p = BlogPost.query.get_or_404(post_id)
-    p.views_count = p.views_count + 1
-    db.session.commit()
+    # views are buffered in memory and written out in batches (see app.view_counter)
+    counter = current_app.view_counter
+    _count_view(p.post_id)
     return jsonify({
         'post_id': p.post_id,
         'title': p.title,
         'content': p.content,
-        'views': p.views_count,
+        'views': (p.views_count or 0) + counter.pending(p.post_id),
     })
 
 
@@ -42,42 +160,46 @@ def create_blog():
         author_id=data.get('author_id'),
         title=data.get('title'),
         content=data.get('content'),
-        tags=data.get('tags'),
         status='pending',
         cover_image_url=data.get('cover_image_url'),
     )
     db.session.add(post)
+    db.session.flush()
+    blog_tags.set_post_tags(post, data.get('tags'))
     db.session.commit()
     return jsonify({'message': 'created', 'post_id': post.post_id}), 201
 
 
 
+def _set_status(p, status):
+    """Change a post's status and keep the search index and tag counts in the same transaction."""
+    old_status = p.status
+    p.status = status
+    blog_search.index_post(p)
+    blog_tags.status_changed(p, old_status)
+
+
 @blogs_bp.route('/<int:post_id>/publish', methods=['POST'])
 def publish_blog(post_id):
     p = BlogPost.query.get_or_404(post_id)
     # only publish if currently draft or pending
     if p.status == 'published':
         return jsonify({'message': 'already published'}), 200
-    p.status = 'published'
+    _set_status(p, 'published')
     p.updated_at = datetime.now(timezone.utc)
     db.session.commit()
 
     # create a notification for the author
     notif = Notification(user_id=p.author_id, title='Your post was published', message=f'Your post "{p.title}" is now live.', type='email')
     db.session.add(notif)
-    db.session.commit()
 
-    # enqueue templated email if mail configured
-    # try to get author email
+    # templated email, sent with this request's batch or held for the author's digest
     author = User.query.get(p.author_id)
     if author and author.email:
-        celery_inst = getattr(current_app, 'celery', None)
-        if celery_inst:
-            celery_inst.send_task('app.tasks.send_email', kwargs={
-                'to_email': author.email,
-                'template_name': 'blog_published.txt',
-                'template_context': {'name': author.name or author.email, 'title': p.title, 'published_at': p.updated_at or p.created_at}
-            })
+        notify_email(author, template_name='blog_published.txt', template_context={
+            'name': author.name or author.email, 'title': p.title, 'published_at': p.updated_at or p.created_at,
+        })
+    db.session.commit()
     return jsonify({'message': 'published', 'post_id': p.post_id})
 
 
@@ -88,9 +210,9 @@ def moderate_post(post_id):
     note = data.get('note')
     p = BlogPost.query.get_or_404(post_id)
     if action == 'approve':
-        p.status = 'published'
+        _set_status(p, 'published')
     elif action == 'reject':
-        p.status = 'rejected'
+        _set_status(p, 'rejected')
     else:
         return jsonify({'error': 'invalid action'}), 400
     db.session.commit()
@@ -100,13 +222,9 @@ def moderate_post(post_id):
     if author:
         notif = Notification(user_id=author.user_id, title='Post moderation update', message=f'Your post "{p.title}" was {p.status}.', type='system')
         db.session.add(notif)
+        # decision email, sent now or held for the author's digest
+        notify_email(author, template_name='blog_moderation.txt', template_context={
+            'name': author.name or author.email, 'title': p.title, 'decision': p.status, 'note': note,
+        })
         db.session.commit()
-        # enqueue decision email
-        celery_inst = getattr(current_app, 'celery', None)
-        if celery_inst and author.email:
-            celery_inst.send_task('app.tasks.send_email', kwargs={
-                'to_email': author.email,
-                'template_name': 'blog_moderation.txt',
-                'template_context': {'name': author.name or author.email, 'title': p.title, 'decision': p.status, 'note': note}
-            })
     return jsonify({'message': 'moderated', 'post_id': p.post_id, 'status': p.status})
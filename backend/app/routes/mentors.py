@@ -1,13 +1,20 @@
 from flask import Blueprint, request, jsonify, current_app
-from .. import db
+from .. import db, inbox, outbox
 from ..models import MentorApplication, User, Mentor, AuditLog
-from ..utils import require_roles, get_jwt_payload
+from ..utils import require_roles, require_jwt, get_jwt_payload, parse_limit, encode_cursor, decode_cursor
+from ..http_cache import conditional
+from ..request_auth import MISSING, auth_error
+from ..digests import notify_email
+from sqlalchemy import and_, or_
+from datetime import datetime
 import json
 from ..storage import save_upload, get_public_url_for_local
 from flask import current_app
 
 mentors_bp = Blueprint('mentors', __name__)
 
+MAX_BULK_DECISIONS = 500
+
 
 @mentors_bp.route('/apply', methods=['POST'])
 def apply():
@@ -27,24 +34,20 @@ def apply():
     db.session.add(apprec)
     db.session.commit()
 
-    # create in-app notification for admins (simple approach: notify user as well)
+    # in-app notification for admins (one broadcast row) and for the applicant
     try:
         from ..models import Notification
-        admin_note = Notification(user_id=None, title='New mentor application', message=f'User {user.email} applied', type='mentor_application')
-        db.session.add(admin_note)
+        inbox.broadcast('New mentor application', f'User {user.email} applied', type='mentor_application', audience='admin')
         # notify user too
         user_note = Notification(user_id=user.user_id, title='Application received', message='Your mentor application was received', type='mentor_application')
         db.session.add(user_note)
+        # and the admins by email, published from the outbox once this commits
+        outbox.enqueue('app.tasks.send_email', args=['admin@example.com', 'New mentor application', f'User {user.email} applied'])
         db.session.commit()
     except Exception:
+        db.session.rollback()
         current_app.logger.exception('failed to create notifications')
 
-    # notify admins via email (best-effort)
-    try:
-        current_app.celery.send_task('app.tasks.send_email', args=['admin@example.com', 'New mentor application', f'User {user.email} applied'])
-    except Exception:
-        current_app.logger.exception('failed to enqueue admin notification')
-
     return jsonify({'message': 'application submitted', 'application_id': apprec.id}), 201
 
 
@@ -66,11 +69,102 @@ def upload_document():
 @mentors_bp.route('/applications', methods=['GET'])
 @require_roles('admin')
 def list_applications():
-    apps = MentorApplication.query.order_by(MentorApplication.submitted_at.desc()).all()
-    out = []
-    for a in apps:
-        out.append({'id': a.id, 'user_id': a.user_id, 'expertise': a.expertise, 'documents': json.loads(a.documents or '[]'), 'status': a.status, 'admin_note': a.admin_note})
-    return jsonify(out)
+    """Review queue: applications with one ``?status=`` (default pending), oldest first.
+
+    Paginated by a (submitted_at, id) keyset cursor over the composite status index, with
+    the applicant's name and email joined in. ``documents`` is left out of the list; fetch
+    a single application for it.
+    """
+    status = request.args.get('status') or 'pending'
+    try:
+        limit = parse_limit(default=50, maximum=200)
+    except ValueError:
+        return jsonify({'error': 'invalid limit'}), 400
+    query = db.session.query(
+        MentorApplication.id, MentorApplication.user_id, MentorApplication.expertise,
+        MentorApplication.status, MentorApplication.admin_note, MentorApplication.submitted_at,
+        User.name, User.email,
+    ).outerjoin(User, User.user_id == MentorApplication.user_id).filter(MentorApplication.status == status)
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            submitted_at, last_id = decode_cursor(cursor)
+            submitted_at = datetime.fromisoformat(submitted_at)
+        except (ValueError, TypeError):
+            return jsonify({'error': 'invalid cursor'}), 400
+        query = query.filter(or_(
+            MentorApplication.submitted_at > submitted_at,
+            and_(MentorApplication.submitted_at == submitted_at, MentorApplication.id > last_id),
+        ))
+    rows = query.order_by(MentorApplication.submitted_at, MentorApplication.id).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].submitted_at.isoformat(), rows[-1].id)
+    items = [{
+        'id': r.id,
+        'user_id': r.user_id,
+        'name': r.name,
+        'email': r.email,
+        'expertise': r.expertise,
+        'status': r.status,
+        'admin_note': r.admin_note,
+        'submitted_at': r.submitted_at.isoformat() if r.submitted_at else None,
+    } for r in rows]
+    return jsonify({'items': items, 'next_cursor': next_cursor})
+
+
+@mentors_bp.route('/applications/<int:app_id>', methods=['GET'])
+@require_roles('admin')
+def get_application(app_id):
+    a = MentorApplication.query.get_or_404(app_id)
+    return jsonify({'id': a.id, 'user_id': a.user_id, 'expertise': a.expertise, 'documents': json.loads(a.documents or '[]'),
+                    'status': a.status, 'admin_note': a.admin_note,
+                    'submitted_at': a.submitted_at.isoformat() if a.submitted_at else None})
+
+
+def _actor_id():
+    try:
+        payload = get_jwt_payload()
+        return payload.get('sub') if payload else None
+    except Exception:
+        return None
+
+
+def _decide(apps, action, note, actor_id):
+    """Apply one decision to ``apps`` in the current transaction (the caller commits).
+
+    Approval creates the Mentor profiles that do not exist yet; every applicant gets a
+    notification and every decision an audit row, inserted with one statement each.
+    Applicants are emailed in one batch (or through their digest).
+    """
+    status = 'approved' if action == 'approve' else 'rejected'
+    if not apps:
+        return status
+    table = MentorApplication.__table__
+    db.session.execute(
+        table.update().where(table.c.id.in_([a.id for a in apps])).values(status=status, admin_note=note)
+    )
+    user_ids = {a.user_id for a in apps}
+    if action == 'approve':
+        existing = {m for (m,) in db.session.query(Mentor.mentor_id).filter(Mentor.mentor_id.in_(user_ids))}
+        # ORM inserts so the mentors content version (and directory cache) see the new profiles
+        db.session.add_all([Mentor(mentor_id=uid) for uid in sorted(user_ids - existing)])
+    inbox.add_many(
+        {'user_id': uid, 'title': f'Application {status}', 'message': f'Your application was {status}',
+         'type': 'mentor_application'}
+        for uid in sorted(user_ids)
+    )
+    db.session.execute(AuditLog.__table__.insert(), [
+        {'actor_id': actor_id, 'action': f'mentor_application_{status}', 'target': str(a.user_id), 'detail': note}
+        for a in apps
+    ])
+    for user in User.query.filter(User.user_id.in_(user_ids)):
+        notify_email(user, template_name='application_decision.txt', template_context={
+            'name': user.name or user.email, 'title': 'Mentor application', 'decision': status, 'note': note,
+        })
+    return status
 
 
 @mentors_bp.route('/applications/<int:app_id>/decide', methods=['POST'])
@@ -86,88 +180,105 @@ def decide_application(app_id):
     if action not in ('approve', 'reject'):
         return jsonify({'error': 'invalid action'}), 400
 
-    apprec.status = 'approved' if action == 'approve' else 'rejected'
-    apprec.admin_note = note
+    status = _decide([apprec], action, note, _actor_id())
     db.session.commit()
+    return jsonify({'message': f'application {status}'}), 200
 
-    # if approved, create Mentor profile
-    if action == 'approve':
-        m = Mentor(mentor_id=apprec.user_id)
-        db.session.add(m)
-        db.session.commit()
 
-    # create in-app notification for the user
-    try:
-        from ..models import Notification
-        notif = Notification(user_id=apprec.user_id, title=f'Application {apprec.status}', message=f'Your application was {apprec.status}', type='mentor_application')
-        db.session.add(notif)
-        db.session.commit()
-    except Exception:
-        current_app.logger.exception('failed to create notification for applicant')
+@mentors_bp.route('/applications/decide', methods=['POST'])
+@require_roles('admin')
+def decide_applications():
+    """Approve or reject many pending applications in one transaction.
 
-    # audit log
+    Body: ``{"ids": [...], "action": "approve"|"reject", "note": ...}``. Ids that are
+    unknown or no longer pending are returned in ``skipped``.
+    """
+    data = request.get_json() or {}
+    action = data.get('action')
+    ids = data.get('ids')
+    if action not in ('approve', 'reject'):
+        return jsonify({'error': 'invalid action'}), 400
+    if not isinstance(ids, list) or not ids or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        return jsonify({'error': 'ids must be a non-empty list of integers'}), 400
+    if len(ids) > MAX_BULK_DECISIONS:
+        return jsonify({'error': f'at most {MAX_BULK_DECISIONS} ids per request'}), 400
+
+    ids = sorted(set(ids))
+    apps = (
+        MentorApplication.query
+        .filter(MentorApplication.id.in_(ids), MentorApplication.status == 'pending')
+        .with_for_update()
+        .all()
+    )
     try:
-        payload = get_jwt_payload()
-        actor_id = payload.get('sub') if payload else None
+        status = _decide(apps, action, data.get('note'), _actor_id())
+        db.session.commit()
     except Exception:
-        actor_id = None
-    al = AuditLog(actor_id=actor_id, action=f'mentor_application_{apprec.status}', target=str(apprec.user_id), detail=note)
-    db.session.add(al)
-    db.session.commit()
-
-    return jsonify({'message': f'application {apprec.status}'}), 200
+        db.session.rollback()
+        current_app.logger.exception('bulk application decision failed')
+        return jsonify({'error': 'decision failed'}), 500
+    decided = sorted(a.id for a in apps)
+    return jsonify({'status': status, 'decided': decided, 'skipped': sorted(set(ids) - set(decided))}), 200
 
 
 @mentors_bp.route('/list', methods=['GET'])
+@require_jwt
+@conditional('mentors', private=True)
 def list_mentors_public():
-    """Return mentor profiles only to requests with a valid backend JWT in Authorization header."""
-    auth = request.headers.get('Authorization')
-    if not auth or not auth.startswith('Bearer '):
-        return jsonify({'error': 'missing token'}), 401
-    token = auth.split(' ', 1)[1]
-    secret = current_app.config.get('JWT_SECRET') or current_app.config.get('SECRET_KEY')
-    try:
-        import jwt
-        payload = jwt.decode(token, secret, algorithms=['HS256'])
-    except Exception as e:
-        current_app.logger.info('invalid token for mentors list: %s', e)
-        return jsonify({'error': 'invalid token'}), 401
+    """Return mentor profiles only to requests with a valid backend JWT in Authorization header.
 
+    Served from the in-process mentor directory cache. ``?availability=`` filters on
+    availability_status; passing ``limit`` (and optionally ``offset``) returns a page as
+    ``{items, total, next_offset}`` instead of the plain list.
+    """
     # optional: enforce role if needed
     # if payload.get('role') not in ('student', 'mentor', 'admin'):
     #     return jsonify({'error': 'forbidden'}), 403
 
-    mentors = Mentor.query.all()
-    out = []
-    for m in mentors:
-        user = User.query.filter_by(user_id=m.mentor_id).first()
-        out.append({
-            'mentor_id': m.mentor_id,
-            'name': user.name if user else None,
-            'email': user.email if user else None,
-            'profile_photo_url': user.profile_photo_url if user else None,
-            'bio': user.bio if user else None,
-            'expertise_areas': (m.expertise_areas.split(',') if m.expertise_areas else []),
-            'availability_status': m.availability_status,
-        })
-    return jsonify(out)
+    directory = current_app.mentor_directory
+    availability = request.args.get('availability') or None
+    if 'limit' not in request.args:
+        return current_app.response_class(directory.encoded(availability), mimetype='application/json')
+
+    try:
+        limit = parse_limit()
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError:
+        return jsonify({'error': 'invalid limit or offset'}), 400
+    entries = directory.entries(availability)
+    items = entries[offset:offset + limit]
+    next_offset = offset + limit if offset + limit < len(entries) else None
+    return jsonify({'items': items, 'total': len(entries), 'next_offset': next_offset})
+
+
+@mentors_bp.route('/search', methods=['GET'])
+@require_jwt
+def search_mentors():
+    """Search mentors by ``expertise`` (comma or space separated), ``region`` and ``availability``."""
+    try:
+        limit = parse_limit(maximum=50)
+    except ValueError:
+        return jsonify({'error': 'invalid limit'}), 400
+    items = current_app.mentor_directory.search(
+        expertise=request.args.get('expertise'),
+        region=request.args.get('region'),
+        availability=request.args.get('availability') or None,
+        limit=limit,
+    )
+    return jsonify({'items': items})
 
 
 @mentors_bp.route('/dev/become-mentor', methods=['POST'])
 def dev_become_mentor():
     """Dev endpoint: Convert logged-in user to a mentor (requires valid JWT)."""
-    auth = request.headers.get('Authorization')
-    if not auth or not auth.startswith('Bearer '):
-        return jsonify({'error': 'missing token'}), 401
-    token = auth.split(' ', 1)[1]
-    secret = current_app.config.get('JWT_SECRET') or current_app.config.get('SECRET_KEY')
-    try:
-        import jwt
-        payload = jwt.decode(token, secret, algorithms=['HS256'])
-        user_id = payload.get('sub')
-    except Exception as e:
-        current_app.logger.warning('dev_become_mentor: token decode failed: %s', e)
+    payload = get_jwt_payload()
+    if payload is None:
+        error = auth_error()
+        if error == MISSING:
+            return jsonify({'error': 'missing token'}), 401
+        current_app.logger.warning('dev_become_mentor: token decode failed: %s', error)
         return jsonify({'error': 'invalid token'}), 401
+    user_id = payload.get('sub')
 
     user = User.query.get(user_id)
     if not user:
@@ -1,30 +1,178 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request, current_app
+from sqlalchemy import and_, or_
 from .. import db
-from ..models import Notification
+from .. import inbox
+from ..models import AuditLog, Notification
+from ..notification_stream import StreamBusy, stream
+from ..request_auth import decode_token
+from ..utils import parse_limit, get_jwt_payload, require_jwt, require_roles
 
 notifications_bp = Blueprint('notifications', __name__)
 
 
 @notifications_bp.route('/user/<int:user_id>', methods=['GET'])
+@require_jwt
 def get_notifications(user_id):
-    items = Notification.query.filter_by(user_id=user_id).order_by(
-        Notification.created_at.desc()
-    ).all()
-    out = []
-    for n in items:
-        out.append({
-            'notification_id': n.notification_id,
-            'title': n.title,
-            'message': n.message,
-            'is_read': n.is_read,
-            'created_at': n.created_at.isoformat(),
-        })
-    return jsonify(out)
+    """The user's notifications, newest first, paginated by a (created_at, id) keyset cursor.
+
+    Only the user themselves and admins may read a feed. ``?legacy=1`` returns the old
+    unpaginated list while clients migrate.
+    """
+    if _reader_id({'user_id': user_id}) is None:
+        return jsonify({'error': 'forbidden'}), 403
+    if request.args.get('legacy') == '1':
+        items = Notification.query.filter_by(user_id=user_id).order_by(
+            Notification.created_at.desc()
+        ).all()
+        out = []
+        for n in items:
+            out.append({
+                'notification_id': n.notification_id,
+                'title': n.title,
+                'message': n.message,
+                'is_read': n.is_read,
+                'created_at': n.created_at.isoformat(),
+            })
+        return jsonify(out)
+
+    try:
+        limit = parse_limit()
+        items, next_cursor = inbox.feed(user_id, limit, request.args.get('cursor'))
+    except ValueError:
+        return jsonify({'error': 'invalid limit or cursor'}), 400
+    return jsonify({'items': items, 'next_cursor': next_cursor})
+
+
+@notifications_bp.route('/user/<int:user_id>/unread-count', methods=['GET'])
+@require_jwt
+def unread_count(user_id):
+    if _reader_id({'user_id': user_id}) is None:
+        return jsonify({'error': 'forbidden'}), 403
+    return jsonify({'user_id': user_id, 'unread': inbox.unread_count(user_id)})
+
+
+@notifications_bp.route('/stream', methods=['GET'])
+def notification_stream():
+    """Server-Sent Events feed of the caller's new notifications.
+
+    EventSource cannot set headers, so the token may also come as ``?token=``. On
+    reconnect, notifications newer than ``Last-Event-ID`` are replayed first.
+    """
+    payload = get_jwt_payload()
+    if payload is None and request.args.get('token'):
+        payload, _ = decode_token(request.args['token'])
+    if payload is None or payload.get('sub') is None:
+        return jsonify({'error': 'missing or invalid auth'}), 401
+    user_id = payload['sub']
+    groups = inbox.audiences(payload.get('role'))
+
+    # subscribe before reading the backlog so nothing falls between the two
+    try:
+        subscription = current_app.notification_broker.subscribe(user_id, groups)
+    except StreamBusy:
+        # every open stream holds a thread here; leave the rest for other requests
+        resp = jsonify({'error': 'too many open streams, retry later'})
+        resp.headers['Retry-After'] = '30'
+        return resp, 503
+    backlog = []
+    last_id = request.headers.get('Last-Event-ID', '')
+    if last_id.isdigit():
+        rows = (
+            Notification.query
+            .filter(
+                or_(Notification.user_id == user_id,
+                    and_(Notification.user_id.is_(None), Notification.audience.in_(groups))),
+                Notification.notification_id > int(last_id),
+            )
+            .order_by(Notification.notification_id)
+            .limit(100)
+        )
+        backlog = [inbox.serialize(n) for n in rows]
+
+    # the body runs after the app context (and its database session) is torn down
+    config = current_app.config
+    body = stream(subscription, backlog,
+                  keepalive=float(config.get('NOTIFICATION_STREAM_KEEPALIVE', 15)),
+                  max_seconds=float(config.get('NOTIFICATION_STREAM_MAX_SECONDS', 300)))
+    return current_app.response_class(body, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+
+def _reader_id(data):
+    """The token's subject; only admins may act on another user's inbox via ``user_id``."""
+    payload = get_jwt_payload() or {}
+    user_id = data.get('user_id')
+    if user_id is None or user_id == payload.get('sub'):
+        return payload.get('sub')
+    if payload.get('role') != 'admin':
+        return None
+    return user_id
+
+
+@notifications_bp.route('/read', methods=['POST'])
+@require_jwt
+def mark_many_read():
+    """Mark the caller's notifications read in one UPDATE.
+
+    Body: ``{"ids": [...]}`` or ``{"all_before": cursor}`` where the cursor is a feed
+    cursor (that item and everything older) or an ISO 8601 timestamp. Admins may pass
+    ``user_id`` to act on someone else's inbox.
+    """
+    data = request.get_json() or {}
+    user_id = _reader_id(data)
+    if user_id is None:
+        return jsonify({'error': 'forbidden'}), 403
+    if not isinstance(user_id, int):
+        return jsonify({'error': 'user_id required'}), 400
+    ids = data.get('ids')
+    before = data.get('all_before')
+    if (ids is None) == (before is None):
+        return jsonify({'error': 'pass either ids or all_before'}), 400
+    if ids is not None and (not isinstance(ids, list) or not all(isinstance(i, int) for i in ids)):
+        return jsonify({'error': 'ids must be a list of integers'}), 400
+    try:
+        before = inbox.parse_feed_cursor(before, allow_timestamp=True) if before is not None else None
+    except ValueError:
+        return jsonify({'error': 'invalid cursor'}), 400
+    marked = inbox.mark_read(user_id, ids=ids, before=before)
+    db.session.commit()
+    return jsonify({'marked': marked, 'unread': inbox.unread_count(user_id)})
 
 
 @notifications_bp.route('/<int:notification_id>/read', methods=['POST'])
 def mark_read(notification_id):
     n = Notification.query.get_or_404(notification_id)
-    n.is_read = True
+    if n.user_id is None:
+        # a broadcast is read per user, through a receipt
+        if not get_jwt_payload():
+            return jsonify({'error': 'missing or invalid auth'}), 401
+        user_id = _reader_id(request.get_json(silent=True) or {})
+        if user_id is None:
+            return jsonify({'error': 'forbidden'}), 403
+        if not isinstance(user_id, int):
+            return jsonify({'error': 'user_id required'}), 400
+        inbox.mark_read(user_id, ids=[notification_id])
+    else:
+        n.is_read = True
     db.session.commit()
     return jsonify({'message': 'marked'})
+
+
+@notifications_bp.route('/broadcast', methods=['POST'])
+@require_roles('admin')
+def create_broadcast():
+    """Announce to everyone (``audience`` 'all', the default) or to one role; stored once."""
+    data = request.get_json() or {}
+    title = (data.get('title') or '').strip()
+    if not title:
+        return jsonify({'error': 'title required'}), 400
+    audience = data.get('audience') or inbox.ALL
+    note = inbox.broadcast(title, data.get('message', ''), type=data.get('type') or 'system', audience=audience)
+    db.session.flush()
+    payload = get_jwt_payload() or {}
+    db.session.add(AuditLog(actor_id=payload.get('sub'), action='broadcast_notification',
+                            target=str(note.notification_id), detail=audience))
+    db.session.commit()
+    return jsonify(inbox.serialize(note)), 201
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from .. import db
 from ..models import Payment, User, Notification
+from ..digests import notify_email
 from flask import current_app
 import os
 
@@ -15,20 +16,16 @@ def send_payment_notification(user, payment):
         type='payment',
     )
     db.session.add(note)
-    db.session.commit()
-    # enqueue email via celery (if configured)
+    # sent with this request's batch, or held for the user's digest
     try:
-        current_app.celery.send_task(
-            'app.tasks.send_email',
-            args=[
-                user.email,
-                'Payment received',
-                f'Thank you, your payment {payment.transaction_reference} was received.',
-            ],
+        notify_email(
+            user,
+            'Payment received',
+            f'Thank you, your payment {payment.transaction_reference} was received.',
         )
     except Exception:
-        # celery may not be configured in this environment; ignore
-        pass
+        current_app.logger.exception('failed to queue payment email')
+    db.session.commit()
 
 
 payments_bp = Blueprint('payments', __name__)
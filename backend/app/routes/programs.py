@@ -1,17 +1,20 @@
 from flask import Blueprint, request, jsonify
 from .. import db
 from ..models import Program, ProgramEnrollment
+from ..http_cache import conditional
 
 programs_bp = Blueprint('programs', __name__)
 
 
 @programs_bp.route('/', methods=['GET'])
+@conditional('programs')
 def list_programs():
     progs = Program.query.filter_by(status='active').all()
     return jsonify([{'program_id': p.program_id, 'title': p.title, 'category': p.category} for p in progs])
 
 
 @programs_bp.route('/<int:program_id>', methods=['GET'])
+@conditional('programs')
 def get_program(program_id):
     p = Program.query.get_or_404(program_id)
     return jsonify({'program_id': p.program_id, 'title': p.title, 'description': p.description, 'category': p.category})
@@ -0,0 +1,115 @@
+from flask import Blueprint, request, jsonify
+from datetime import timedelta
+from .. import db
+from ..models import MentorshipSession
+from ..utils import require_roles, get_jwt_payload
+from ..booking import BookingConflict, BookingError, as_utc, available_slots, book_session, cancel, parse_datetime
+from ..mentor_stats import StatsError, complete_session, review_session
+
+sessions_bp = Blueprint('sessions', __name__)
+
+MAX_AVAILABILITY_RANGE = timedelta(days=31)
+
+
+def _serialize(s):
+    return {
+        'session_id': s.session_id,
+        'mentor_id': s.mentor_id,
+        'mentee_id': s.mentee_id,
+        'start': as_utc(s.start_at).isoformat() if s.start_at else None,
+        'end': as_utc(s.end_at).isoformat() if s.end_at else None,
+        'status': s.status,
+        'rating': s.rating,
+    }
+
+
+@sessions_bp.route('/', methods=['POST'])
+@require_roles('student', 'mentor', 'admin')
+def create_session():
+    payload = get_jwt_payload()
+    data = request.get_json() or {}
+    mentor_id = data.get('mentor_id')
+    if not mentor_id:
+        return jsonify({'error': 'mentor_id required'}), 400
+    try:
+        start = parse_datetime(data.get('start'))
+        end = parse_datetime(data.get('end'))
+    except ValueError:
+        return jsonify({'error': 'start and end must be ISO 8601 datetimes'}), 400
+    try:
+        session = book_session(mentor_id, payload.get('sub'), start, end, notes=data.get('notes'))
+    except BookingConflict as e:
+        return jsonify({'error': 'slot unavailable', 'conflict': _serialize(e.session)}), 409
+    except BookingError as e:
+        status = 404 if str(e) == 'mentor not found' else 400
+        return jsonify({'error': str(e)}), status
+    return jsonify(_serialize(session)), 201
+
+
+@sessions_bp.route('/availability/<int:mentor_id>', methods=['GET'])
+def mentor_availability(mentor_id):
+    """Free windows for a mentor between ``from`` and ``to`` (ISO 8601).
+
+    With ``slot_minutes`` the windows are cut into bookable slots of that length.
+    """
+    try:
+        range_start = parse_datetime(request.args.get('from'))
+        range_end = parse_datetime(request.args.get('to'))
+        slot_minutes = int(request.args.get('slot_minutes', 0))
+    except ValueError:
+        return jsonify({'error': 'from and to must be ISO 8601 datetimes'}), 400
+    if range_end <= range_start or range_end - range_start > MAX_AVAILABILITY_RANGE:
+        return jsonify({'error': 'invalid range (max 31 days)'}), 400
+    slot_length = timedelta(minutes=slot_minutes) if slot_minutes > 0 else None
+    windows = available_slots(mentor_id, range_start, range_end, slot_length)
+    return jsonify({
+        'mentor_id': mentor_id,
+        'free': [{'start': s.isoformat(), 'end': e.isoformat()} for s, e in windows],
+    })
+
+
+@sessions_bp.route('/<int:session_id>/cancel', methods=['POST'])
+@require_roles('student', 'mentor', 'admin')
+def cancel_session(session_id):
+    payload = get_jwt_payload()
+    s = MentorshipSession.query.get_or_404(session_id)
+    if payload.get('role') != 'admin' and payload.get('sub') not in (s.mentee_id, s.mentor_id):
+        return jsonify({'error': 'forbidden'}), 403
+    if not cancel(s):
+        db.session.rollback()
+        return jsonify({'error': f'cannot cancel a {s.status} session'}), 409
+    db.session.commit()
+    return jsonify(_serialize(s))
+
+
+@sessions_bp.route('/<int:session_id>/complete', methods=['POST'])
+@require_roles('mentor', 'admin')
+def complete(session_id):
+    payload = get_jwt_payload()
+    s = MentorshipSession.query.get_or_404(session_id)
+    if payload.get('role') != 'admin' and payload.get('sub') != s.mentor_id:
+        return jsonify({'error': 'forbidden'}), 403
+    try:
+        complete_session(s)
+    except StatsError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    db.session.commit()
+    return jsonify(_serialize(s))
+
+
+@sessions_bp.route('/<int:session_id>/review', methods=['POST'])
+@require_roles('student', 'mentor', 'admin')
+def review(session_id):
+    payload = get_jwt_payload()
+    s = MentorshipSession.query.get_or_404(session_id)
+    if payload.get('sub') != s.mentee_id:
+        return jsonify({'error': 'forbidden'}), 403
+    data = request.get_json() or {}
+    try:
+        review_session(s, data.get('rating'), data.get('review'))
+    except StatsError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    db.session.commit()
+    return jsonify(_serialize(s))
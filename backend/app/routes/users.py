@@ -2,6 +2,8 @@ from flask import Blueprint, request, jsonify, current_app
 from .. import db
 from ..models import User, AuditLog
 from ..utils import require_roles, get_jwt_payload
+from ..request_auth import MISSING, auth_error
+from ..digests import CADENCES, OFF
 import jwt
 from datetime import datetime, timezone, timedelta
 from flask import current_app
@@ -21,6 +23,7 @@ def get_user(user_id):
         'bio': user.bio,
         'region': user.region,
         'profile_photo_url': user.profile_photo_url,
+        'email_digest': user.email_digest or OFF,
     })
 
 
@@ -121,7 +124,7 @@ def sync_token():
             current_app.logger.info(f'sync_token: created user {user.user_id} for {email}')
 
         secret = current_app.config.get('JWT_SECRET') or current_app.config.get('SECRET_KEY')
-        payload = {'sub': user.user_id, 'role': user.role or 'student', 'exp': datetime.now(timezone.utc) + timedelta(days=7)}
+        payload = {'sub': user.user_id, 'role': user.role or 'student', 'exp': datetime.now(timezone.utc) + timedelta(days=7), 'tv': user.token_version or 0}
         token = jwt.encode(payload, secret, algorithm='HS256')
         current_app.logger.info(f'sync_token: issued token for user {user.user_id}')
         return jsonify({'access_token': token, 'user_id': user.user_id}), 200
@@ -132,19 +135,14 @@ def sync_token():
 
 @users_bp.route('/me', methods=['PUT'])
 def update_profile():
-    # uses require_auth decorator logic manually (we can't import decorator easily here)
-    auth = request.headers.get('Authorization')
-    if not auth or not auth.startswith('Bearer '):
-        current_app.logger.warning('update_profile: missing Authorization header')
-        return jsonify({'error': 'missing token'}), 401
-    token = auth.split(' ', 1)[1]
-    secret = current_app.config.get('JWT_SECRET') or current_app.config.get('SECRET_KEY')
-    try:
-        payload = jwt.decode(token, secret, algorithms=['HS256'])
-        current_app.logger.info(f'update_profile: token decoded for user {payload.get("sub")}')
-    except Exception as e:
-        current_app.logger.warning(f'update_profile: token decode failed: {e}')
-        return jsonify({'error': 'invalid token', 'details': str(e)}), 401
+    payload = get_jwt_payload()
+    if payload is None:
+        error = auth_error()
+        if error == MISSING:
+            current_app.logger.warning('update_profile: missing Authorization header')
+            return jsonify({'error': 'missing token'}), 401
+        current_app.logger.warning(f'update_profile: token decode failed: {error}')
+        return jsonify({'error': 'invalid token', 'details': error}), 401
     user_id = payload.get('sub')
     user = User.query.get_or_404(user_id)
     data = request.get_json() or {}
@@ -152,6 +150,10 @@ def update_profile():
     user.bio = data.get('bio', user.bio)
     user.region = data.get('region', user.region)
     user.profile_photo_url = data.get('profile_photo_url', user.profile_photo_url)
+    if 'email_digest' in data:
+        if data['email_digest'] != OFF and data['email_digest'] not in CADENCES:
+            return jsonify({'error': f"email_digest must be one of {', '.join([OFF, *CADENCES])}"}), 400
+        user.email_digest = data['email_digest']
     db.session.commit()
     current_app.logger.info(f'update_profile: user {user_id} profile updated')
     return jsonify({'message': 'updated', 'user_id': user.user_id}), 200
@@ -0,0 +1,204 @@
+"""Outgoing SMS through a pluggable provider.
+
+A provider turns one message into one HTTP request (``TwilioProvider``; ``NullProvider``
+when ``SMS_PROVIDER`` is unset only logs). ``SMSDispatcher`` sends through a pool of
+keep-alive ``requests`` sessions, so connections and TLS sessions are reused across
+messages and tasks, and ``send_bulk`` fans a batch out over ``SMS_CONCURRENCY`` threads
+under a token-bucket limit of ``SMS_RATE_LIMIT`` messages per second (0 for none).
+Failures are tracked per message: 4xx replies other than 429 are permanent, everything
+else is returned for retry.
+
+Register another provider with ``PROVIDERS['name'] = factory(config)``.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class SMSError(Exception):
+    def __init__(self, message, permanent=False):
+        super().__init__(message)
+        self.permanent = permanent
+
+
+class NullProvider:
+    name = 'none'
+
+    def __init__(self, logger=None):
+        self.logger = logger
+
+    def send(self, session, to, body, timeout):
+        if self.logger:
+            self.logger.debug('no SMS provider configured; skipping send to %s', to)
+        return None
+
+
+class TwilioProvider:
+    name = 'twilio'
+
+    def __init__(self, account_sid, auth_token, from_number, base_url='https://api.twilio.com'):
+        self.auth = (account_sid, auth_token)
+        self.from_number = from_number
+        self.url = f'{base_url.rstrip("/")}/2010-04-01/Accounts/{account_sid}/Messages.json'
+
+    @classmethod
+    def from_config(cls, config):
+        sid, token, from_number, base_url = (
+            config.get(key) or os.environ.get(key)
+            for key in ('TWILIO_ACCOUNT_SID', 'TWILIO_AUTH_TOKEN', 'TWILIO_FROM', 'TWILIO_BASE_URL')
+        )
+        if not sid or not token or not from_number:
+            raise ValueError('twilio configured but credentials missing')
+        return cls(sid, token, from_number, base_url or 'https://api.twilio.com')
+
+    def send(self, session, to, body, timeout):
+        try:
+            resp = session.post(self.url, data={'To': to, 'From': self.from_number, 'Body': body},
+                                auth=self.auth, timeout=timeout)
+        except requests.RequestException as exc:
+            raise SMSError(str(exc))
+        if resp.status_code >= 400:
+            # 429 and 5xx are worth retrying, any other client error is not
+            permanent = resp.status_code < 500 and resp.status_code != 429
+            raise SMSError(f'{resp.status_code} {resp.text[:200]}', permanent=permanent)
+        try:
+            return resp.json().get('sid')
+        except (ValueError, AttributeError):
+            # accepted all the same; resending would deliver the message twice
+            return None
+
+
+PROVIDERS = {
+    'twilio': TwilioProvider.from_config,
+}
+
+
+class RateLimiter:
+    """Token bucket: ``rate`` permits a second, at most ``burst`` at once."""
+
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.burst = float(burst or max(1.0, self.rate))
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = self.burst
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = self.clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self.sleep(wait)
+
+
+class SessionPool:
+    """Keep-alive sessions handed out one per concurrent sender."""
+
+    def __init__(self, size):
+        self._sessions = queue.LifoQueue()
+        for _ in range(size):
+            session = requests.Session()
+            session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+            session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+            self._sessions.put(session)
+
+    def acquire(self):
+        return self._sessions.get()
+
+    def release(self, session):
+        self._sessions.put(session)
+
+    def close(self):
+        while True:
+            try:
+                self._sessions.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class SMSDispatcher:
+    def __init__(self, provider, concurrency=8, rate=0, timeout=10, logger=None):
+        self.provider = provider
+        self.concurrency = max(1, int(concurrency))
+        self.limiter = RateLimiter(rate) if rate else None
+        self.timeout = timeout
+        self.logger = logger
+        self.sessions = SessionPool(self.concurrency)
+
+    def send(self, to, body):
+        """Send one message; returns the provider's message id. Raises SMSError."""
+        if self.limiter:
+            self.limiter.acquire()
+        session = self.sessions.acquire()
+        try:
+            return self.provider.send(session, to, body, self.timeout)
+        finally:
+            self.sessions.release(session)
+
+    def _attempt(self, message):
+        try:
+            return self.send(message['to'], message['body']), None
+        except SMSError as exc:
+            return None, exc
+        except Exception as exc:
+            # one provider bug must not abort the batch and lose the results of the rest
+            if self.logger:
+                self.logger.exception('sms to %s failed unexpectedly', message.get('to'))
+            return None, SMSError(str(exc))
+
+    def send_bulk(self, messages):
+        """Send ``[{'to', 'body'}]`` concurrently.
+
+        Returns ``{'sent': count, 'failed': [(message, error)], 'retry': [message]}``.
+        """
+        messages = list(messages)
+        result = {'sent': 0, 'failed': [], 'retry': []}
+        workers = min(self.concurrency, len(messages)) or 1
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sms') as pool:
+            for message, (_, error) in zip(messages, pool.map(self._attempt, messages)):
+                if error is None:
+                    result['sent'] += 1
+                elif error.permanent:
+                    result['failed'].append((message, str(error)))
+                else:
+                    result['retry'].append(message)
+        if self.logger and (result['failed'] or result['retry']):
+            self.logger.warning('sms batch: %d sent, %d failed, %d to retry',
+                                result['sent'], len(result['failed']), len(result['retry']))
+        return result
+
+    def close(self):
+        self.sessions.close()
+
+
+def init_app(app):
+    name = app.config.get('SMS_PROVIDER')
+    provider = NullProvider(app.logger)
+    if name:
+        factory = PROVIDERS.get(name)
+        try:
+            if factory is None:
+                raise ValueError(f'unknown SMS provider: {name}')
+            provider = factory(app.config)
+        except ValueError:
+            app.logger.exception('SMS provider %s unavailable; messages will be dropped', name)
+    app.sms = SMSDispatcher(
+        provider,
+        concurrency=int(app.config.get('SMS_CONCURRENCY', 8)),
+        rate=float(app.config.get('SMS_RATE_LIMIT', 0) or 0),
+        timeout=float(app.config.get('SMS_TIMEOUT', 10)),
+        logger=app.logger,
+    )
+    return app.sms
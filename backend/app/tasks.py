@@ -2,6 +2,8 @@ from flask_mail import Message
 import time
 from celery.utils.log import get_task_logger
 from .email_templates import render_email_template
+from .mailer import send_bulk
+from .sms import SMSError
 
 
 # Register celery tasks by passing the celery instance and the Flask app.
@@ -32,39 +34,52 @@ def register_tasks(celery, app):
             if mail_ext:
                 mail_ext.send(msg)
 
-    @celery.task(name='app.tasks.send_sms', bind=True, autoretry_for=(Exception,), retry_backoff=True, retry_backoff_max=600, retry_kwargs={'max_retries': 5})
-    def _send_sms(self, phone_number, body):
-        """Simple SMS sending task. If a provider is configured, this will attempt to call it.
+    @celery.task(name='app.tasks.send_email_bulk', bind=True, max_retries=5)
+    def _send_email_bulk(self, messages):
+        """Send many emails (dicts from app.mailer.email) over one SMTP connection.
 
-        In test/dev environments where no provider is configured, this is a noop that logs.
+        Emails that failed permanently are logged and dropped; only the ones that failed
+        transiently are retried, with the same backoff as send_email.
         """
+        with app.app_context():
+            result = send_bulk(messages, app.extensions.get('mail'))
+            for item, error in result['failed']:
+                logger.warning('email to %s failed permanently: %s', item.get('to'), error)
+            if result['retry']:
+                logger.info('%d of %d emails will be retried', len(result['retry']), len(messages))
+                raise self.retry(args=[result['retry']], countdown=min(600, 2 ** self.request.retries))
+            return {'sent': result['sent'], 'failed': len(result['failed'])}
+
+    @celery.task(name='app.tasks.send_digests')
+    def _send_digests():
+        """Send the email digests that are due (triggered by beat, or the timer in app.digests)."""
+        from . import digests
+        with app.app_context():
+            return digests.run(app)
+
+    @celery.task(name='app.tasks.send_sms', bind=True, autoretry_for=(SMSError,), retry_backoff=True, retry_backoff_max=600, retry_kwargs={'max_retries': 5})
+    def _send_sms(self, phone_number, body):
+        """Send one SMS through the app's provider (a noop that logs when none is configured)."""
         with app.app_context():
             logger.info('send_sms called for %s', phone_number)
-            # provider not configured -> noop
-            provider = app.config.get('SMS_PROVIDER')
-            if not provider:
-                app.logger.debug('no SMS provider configured; skipping send')
-                return True
-            # If Twilio configured, attempt to POST to Twilio API (minimal, no external dependency here)
-            if provider == 'twilio':
-                # Expect TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN and TWILIO_FROM
-                import os, requests
-                sid = app.config.get('TWILIO_ACCOUNT_SID') or os.environ.get('TWILIO_ACCOUNT_SID')
-                token = app.config.get('TWILIO_AUTH_TOKEN') or os.environ.get('TWILIO_AUTH_TOKEN')
-                from_number = app.config.get('TWILIO_FROM') or os.environ.get('TWILIO_FROM')
-                if not sid or not token or not from_number:
-                    app.logger.warning('twilio configured but credentials missing')
+            try:
+                app.sms.send(phone_number, body)
+            except SMSError as exc:
+                if exc.permanent:
+                    app.logger.warning('sms to %s rejected: %s', phone_number, exc)
                     return False
-                url = f'https://api.twilio.com/2010-04-01/Accounts/{sid}/Messages.json'
-                try:
-                    resp = requests.post(url, data={'To': phone_number, 'From': from_number, 'Body': body}, auth=(sid, token), timeout=10)
-                    resp.raise_for_status()
-                except Exception:
-                    app.logger.exception('failed to send sms')
-                    raise
-                return True
-            # unknown provider
-            app.logger.warning('unknown SMS provider: %s', provider)
-            return False
+                raise
+            return True
+
+    @celery.task(name='app.tasks.send_sms_bulk', bind=True, max_retries=5)
+    def _send_sms_bulk(self, messages):
+        """Send ``[{'to', 'body'}]`` concurrently over pooled connections; retry only transient failures."""
+        with app.app_context():
+            result = app.sms.send_bulk(messages)
+            for message, error in result['failed']:
+                logger.warning('sms to %s failed permanently: %s', message.get('to'), error)
+            if result['retry']:
+                raise self.retry(args=[result['retry']], countdown=min(600, 2 ** self.request.retries))
+            return {'sent': result['sent'], 'failed': len(result['failed'])}
 
     return celery
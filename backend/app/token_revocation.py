@@ -0,0 +1,149 @@
+"""Revocation of access tokens through ``User.token_version``.
+
+Access tokens carry the user's ``token_version`` as ``tv``; bumping the version
+revokes every token issued before. Checking it on each request would cost a users
+lookup, so versions are cached per worker for ``TOKEN_VERSION_TTL`` seconds and,
+when ``TOKEN_VERSION_REDIS_URL`` is set, in Redis shared by all workers.
+
+``bump_token_version(user)`` increments the version in the caller's transaction; the
+new version is published to the caches only after that transaction commits. The
+worker that commits sees the revocation at once; other workers see it within
+``SHARED_LOCAL_TTL`` with Redis, or within ``TOKEN_VERSION_TTL`` without it.
+"""
+import threading
+import time
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from . import db
+from .models import User
+
+UNKNOWN_USER = -1
+# with a shared cache the local one only absorbs bursts from the same client
+SHARED_LOCAL_TTL = 1.0
+
+
+class LocalVersionCache:
+    def __init__(self, ttl=30.0, clock=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        entry = self._entries.get(user_id)
+        if entry is None or entry[1] <= self.clock():
+            return None
+        return entry[0]
+
+    def set(self, user_id, version, only_newer=False):
+        with self._lock:
+            current = self.get(user_id)
+            if only_newer and current is not None and current > version:
+                return
+            self._entries[user_id] = (version, self.clock() + self.ttl)
+
+
+class RedisVersionCache:
+    """Versions in Redis (or anything speaking its GET/SET protocol)."""
+
+    def __init__(self, client, ttl=86400, prefix='tv:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, user_id):
+        value = self.client.get(f'{self.prefix}{user_id}')
+        return int(value) if value is not None else None
+
+    def set(self, user_id, version, only_newer=False):
+        # a value loaded from the database must not overwrite a version published meanwhile
+        self.client.set(f'{self.prefix}{user_id}', version, ex=self.ttl, nx=only_newer)
+
+
+class TokenVersions:
+    def __init__(self, local, shared=None, loader=None, logger=None):
+        self.local = local
+        self.shared = shared
+        self.loader = loader or _load_version
+        self.logger = logger
+
+    def _shared(self, method, *args, **kwargs):
+        try:
+            return getattr(self.shared, method)(*args, **kwargs)
+        except Exception:
+            if self.logger:
+                self.logger.warning('token version cache unavailable', exc_info=True)
+            return None
+
+    def current(self, user_id):
+        version = self.local.get(user_id)
+        if version is not None:
+            return version
+        if self.shared is not None:
+            version = self._shared('get', user_id)
+        if version is None:
+            version = self.loader(user_id)
+            if self.shared is not None:
+                self._shared('set', user_id, version, only_newer=True)
+        self.local.set(user_id, version, only_newer=True)
+        return version
+
+    def publish(self, user_id, version):
+        self.local.set(user_id, version)
+        if self.shared is not None:
+            self._shared('set', user_id, version)
+
+    def is_revoked(self, claims):
+        user_id = claims.get('sub')
+        if user_id is None:
+            return False
+        current = self.current(user_id)
+        return current == UNKNOWN_USER or (claims.get('tv') or 0) < current
+
+
+def _load_version(user_id):
+    row = db.session.query(User.token_version).filter(User.user_id == user_id).first()
+    if row is None:
+        return UNKNOWN_USER
+    return row.token_version or 0
+
+
+def bump_token_version(user):
+    """Revoke the user's outstanding access tokens once the current transaction commits."""
+    user.token_version = (user.token_version or 0) + 1
+    db.session.info.setdefault('token_versions', {})[user.user_id] = user.token_version
+    return user.token_version
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_after_commit(session):
+    pending = session.info.pop('token_versions', None)
+    if pending and has_app_context() and hasattr(current_app, 'token_versions'):
+        for user_id, version in pending.items():
+            current_app.token_versions.publish(user_id, version)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_after_rollback(session):
+    session.info.pop('token_versions', None)
+
+
+def init_app(app):
+    shared = None
+    url = app.config.get('TOKEN_VERSION_REDIS_URL')
+    if url:
+        try:
+            import redis
+            shared = RedisVersionCache(redis.Redis.from_url(url))
+        except Exception:
+            app.logger.exception('token version Redis cache disabled')
+    ttl = float(app.config.get('TOKEN_VERSION_TTL', 30))
+    app.token_versions = TokenVersions(
+        LocalVersionCache(ttl=ttl if shared is None else min(ttl, SHARED_LOCAL_TTL)),
+        shared=shared,
+        logger=app.logger,
+    )
+    return app.token_versions
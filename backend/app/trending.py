@@ -0,0 +1,264 @@
+"""Time-decayed "trending" ranking of blog posts.
+
+Scores use forward decay: an event of weight ``w`` at time ``t`` adds
+``w * exp(rate * (t - t0))`` to the post, so nothing ever has to be decayed in place and
+relative order is stable between events. The current decayed score is the stored value
+times ``exp(-rate * (now - t0))``. Because stored values only grow, a bounded
+leaderboard of the ``capacity`` best posts stays exact: a post can only enter it when
+one of its own events lifts it above the current minimum.
+
+Every gunicorn worker sees only its own events, so ``snapshot`` does not write the
+worker's scores but the decayed increments since its previous snapshot, merged into
+``trending_scores`` as ``score * decay + delta`` under row locks; the table ends up
+holding the events of all workers. After each snapshot the worker re-seeds itself from the
+merged table (plus its own events not yet written), so every worker ranks by all events,
+at most one snapshot interval behind. The re-seed drops posts that decayed below
+``MIN_SCORE``, in memory and in the table, which keeps both bounded by recent activity.
+"""
+import math
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import current_app
+from sqlalchemy.dialects import postgresql, sqlite
+
+from . import db
+from .background import schedule
+from .models import TrendingScore
+
+# AnalyticsLog actions that carry a post_id in their metadata, and how much they count
+EVENT_WEIGHTS = {
+    'blog_view': 1.0,
+    'blog_read_complete': 2.0,
+    'blog_like': 3.0,
+    'blog_comment': 4.0,
+    'blog_share': 5.0,
+}
+# rescale stored values before exp() gets anywhere near float overflow
+MAX_EXPONENT = 500.0
+MIN_SCORE = 1e-3
+# dialects with INSERT .. ON CONFLICT, so two workers adding the same new post cannot race
+_UPSERT = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+class TrendingTracker:
+    def __init__(self, half_life=6 * 3600, capacity=256, clock=time.time):
+        self.rate = math.log(2) / half_life
+        self.capacity = capacity
+        self.clock = clock
+        self.loaded = False
+        self._lock = threading.Lock()
+        self._t0 = clock()
+        self._scores = {}
+        self._board = {}
+        self._board_min = None  # (post_id, value) of the smallest leaderboard entry
+        self._deltas = {}  # post_id -> stored value added since the last snapshot
+
+    def _recompute_min(self):
+        if self._board:
+            post_id = min(self._board, key=self._board.get)
+            self._board_min = (post_id, self._board[post_id])
+        else:
+            self._board_min = None
+
+    def _offer(self, post_id, value):
+        board = self._board
+        if post_id in board:
+            board[post_id] = value
+            if self._board_min and self._board_min[0] == post_id:
+                self._recompute_min()
+        elif len(board) < self.capacity:
+            board[post_id] = value
+            if self._board_min is None or value < self._board_min[1]:
+                self._board_min = (post_id, value)
+        elif value > self._board_min[1]:
+            del board[self._board_min[0]]
+            board[post_id] = value
+            self._recompute_min()
+
+    def _rescale(self, now):
+        factor = math.exp(-self.rate * (now - self._t0))
+        self._t0 = now
+        self._scores = {p: v * factor for p, v in self._scores.items() if v * factor >= MIN_SCORE}
+        self._deltas = {p: v * factor for p, v in self._deltas.items()}
+        self._board = {}
+        self._board_min = None
+        for post_id, value in self._scores.items():
+            self._offer(post_id, value)
+
+    def _set_raw(self, post_id, value):
+        self._scores[post_id] = value
+        self._offer(post_id, value)
+
+    def record(self, post_id, weight=1.0, at=None):
+        """Add an event for ``post_id``. O(1) apart from leaderboard churn bounded by ``capacity``."""
+        now = self.clock() if at is None else at
+        with self._lock:
+            exponent = self.rate * (now - self._t0)
+            if exponent > MAX_EXPONENT:
+                self._rescale(now)
+                exponent = 0.0
+            value = weight * math.exp(exponent)
+            self._set_raw(post_id, self._scores.get(post_id, 0.0) + value)
+            self._deltas[post_id] = self._deltas.get(post_id, 0.0) + value
+
+    def _decay(self, now):
+        return math.exp(-self.rate * (now - self._t0))
+
+    def score(self, post_id, at=None):
+        now = self.clock() if at is None else at
+        with self._lock:
+            return self._scores.get(post_id, 0.0) * self._decay(now)
+
+    def top(self, k=10, at=None):
+        """Return ``[(post_id, score), ...]`` for the ``k`` (<= capacity) hottest posts."""
+        now = self.clock() if at is None else at
+        with self._lock:
+            factor = self._decay(now)
+            best = sorted(self._board.items(), key=lambda kv: (-kv[1], kv[0]))[:k]
+        return [(post_id, value * factor) for post_id, value in best]
+
+    def reseed(self, stored, at=None):
+        """Replace the scores with ``{post_id: (score, computed_at)}`` read from the merged
+        table, keeping the events recorded since the last ``take_deltas``. Returns the posts
+        that decayed below ``MIN_SCORE`` and were left out."""
+        now = self.clock() if at is None else at
+        with self._lock:
+            factor = self._decay(now)
+            self._t0 = now
+            self._deltas = {p: v * factor for p, v in self._deltas.items()}
+            scores, stale = dict(self._deltas), []
+            for post_id, (score, computed_at) in stored.items():
+                value = score * math.exp(-self.rate * max(0.0, now - computed_at))
+                if value < MIN_SCORE:
+                    stale.append(post_id)
+                else:
+                    scores[post_id] = scores.get(post_id, 0.0) + value
+            self._scores = scores
+            self._board = {}
+            self._board_min = None
+            for post_id, value in scores.items():
+                self._offer(post_id, value)
+            self.loaded = True
+        return stale
+
+    def take_deltas(self, at=None):
+        """Return ``{post_id: decayed score added since the last call}``."""
+        now = self.clock() if at is None else at
+        with self._lock:
+            deltas, self._deltas = self._deltas, {}
+            factor = self._decay(now)
+            return {p: v * factor for p, v in deltas.items()}
+
+    def put_back(self, deltas, at):
+        """Return deltas taken at ``at`` whose snapshot failed."""
+        with self._lock:
+            growth = math.exp(self.rate * (at - self._t0))
+            for post_id, delta in deltas.items():
+                self._deltas[post_id] = self._deltas.get(post_id, 0.0) + delta * growth
+
+    def __len__(self):
+        return len(self._scores)
+
+
+def _epoch(dt):
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def load_snapshot(tracker):
+    """Seed ``tracker`` from ``trending_scores``; returns ``{post_id: computed_at}`` of rows
+    that decayed below ``MIN_SCORE``."""
+    rows = [
+        row for row in db.session.query(TrendingScore.post_id, TrendingScore.score, TrendingScore.computed_at)
+        if row.computed_at is not None
+    ]
+    stale = tracker.reseed({row.post_id: (row.score, _epoch(row.computed_at)) for row in rows})
+    computed = {row.post_id: row.computed_at for row in rows}
+    return {post_id: computed[post_id] for post_id in stale}
+
+
+def _prune(stale):
+    """Delete rows that decayed away, unless another worker added to them since they were read."""
+    table = TrendingScore.__table__
+    for post_id, computed_at in stale.items():
+        db.session.execute(table.delete().where(table.c.post_id == post_id, table.c.computed_at == computed_at))
+
+
+def _merge(rate, deltas, now):
+    """Add ``deltas`` (decayed to ``now``) to the stored scores. Does not commit."""
+    table = TrendingScore.__table__
+    computed_at = datetime.fromtimestamp(now, timezone.utc)
+
+    def locked(ids):
+        rows = db.session.execute(table.select().where(table.c.post_id.in_(ids)).with_for_update())
+        return {row.post_id: row for row in rows}
+
+    existing = locked(list(deltas))
+    insert = _UPSERT.get(db.session.connection().dialect.name)
+    for post_id, delta in deltas.items():
+        row = existing.get(post_id)
+        if row is None:
+            values = {'post_id': post_id, 'score': delta, 'computed_at': computed_at}
+            if insert is None:
+                db.session.execute(table.insert().values(**values))
+                continue
+            inserted = db.session.execute(
+                insert(table).values(**values).on_conflict_do_nothing(index_elements=[table.c.post_id])
+            ).rowcount
+            if inserted:
+                continue
+            # another worker created the row in the meantime
+            row = locked([post_id])[post_id]
+        age = max(0.0, now - _epoch(row.computed_at)) if row.computed_at is not None else 0.0
+        db.session.execute(
+            table.update().where(table.c.post_id == post_id)
+            .values(score=row.score * math.exp(-rate * age) + delta, computed_at=computed_at)
+        )
+
+
+def snapshot(tracker=None):
+    """Add this worker's events since the previous snapshot to the stored scores, then
+    re-seed the worker from the merged result. Returns how many posts it added to."""
+    tracker = tracker or get_tracker()
+    now = tracker.clock()
+    deltas = tracker.take_deltas(at=now)
+    if deltas:
+        try:
+            _merge(tracker.rate, deltas, now)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            tracker.put_back(deltas, now)
+            raise
+    stale = load_snapshot(tracker)
+    if stale:
+        _prune(stale)
+    db.session.commit()
+    return len(deltas)
+
+
+def get_tracker():
+    tracker = current_app.trending
+    if not tracker.loaded:
+        # re-seeding is idempotent, so a concurrent double load is harmless
+        load_snapshot(tracker)
+    return tracker
+
+
+def record_event(post_id, action='blog_view'):
+    weight = EVENT_WEIGHTS.get(action)
+    if weight and post_id:
+        get_tracker().record(post_id, weight)
+
+
+def init_app(app):
+    app.trending = TrendingTracker(
+        half_life=float(app.config.get('TRENDING_HALF_LIFE_HOURS', 6)) * 3600,
+        capacity=int(app.config.get('TRENDING_CAPACITY', 256)),
+    )
+    schedule(app, 'trending-snapshot', app.config.get('TRENDING_SNAPSHOT_INTERVAL', 60),
+             lambda: snapshot(app.trending), run_at_exit=True)
+    return app.trending
@@ -1,19 +1,14 @@
 from functools import wraps
-from flask import request, jsonify, current_app
-import jwt
+from flask import request, jsonify
+import base64
+import json
+
+from .request_auth import MISSING, auth_error, current_claims
 
 
 def get_jwt_payload():
-    auth = request.headers.get('Authorization', '')
-    if not auth.startswith('Bearer '):
-        return None
-    token = auth.split(' ', 1)[1]
-    secret = current_app.config.get('JWT_SECRET') or current_app.config.get('SECRET_KEY')
-    try:
-        payload = jwt.decode(token, secret, algorithms=['HS256'])
-        return payload
-    except Exception:
-        return None
+    """Claims of the request's bearer token, decoded once per request (see app.request_auth)."""
+    return current_claims()
 
 
 def require_roles(*roles):
@@ -24,7 +19,6 @@ def require_roles(*roles):
             if not payload:
                 return jsonify({'error': 'missing or invalid auth'}), 401
             user_role = payload.get('role')
-            user_id = payload.get('sub')
             # admin bypass
             if 'admin' in roles and user_role == 'admin':
                 return f(*args, **kwargs)
@@ -33,29 +27,59 @@ def require_roles(*roles):
             return f(*args, **kwargs)
         return wrapper
     return decorator
-from functools import wraps
-from flask import request, jsonify
-import jwt
-import os
-
-JWT_SECRET = os.environ.get('JWT_SECRET', os.environ.get('SECRET_KEY'))
 
 
 def require_auth(roles=None):
     def decorator(f):
         @wraps(f)
         def wrapped(*args, **kwargs):
-            auth = request.headers.get('Authorization')
-            if not auth:
-                return jsonify({'error': 'missing token'}), 401
-            try:
-                scheme, token = auth.split(' ')
-                payload = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
-                if roles and payload.get('role') not in roles:
-                    return jsonify({'error': 'forbidden'}), 403
-                request.user = payload
-            except Exception as e:
-                return jsonify({'error': 'invalid token', 'details': str(e)}), 401
+            payload = get_jwt_payload()
+            if payload is None:
+                error = auth_error()
+                if error == MISSING:
+                    return jsonify({'error': 'missing token'}), 401
+                return jsonify({'error': 'invalid token', 'details': error}), 401
+            if roles and payload.get('role') not in roles:
+                return jsonify({'error': 'forbidden'}), 403
+            request.user = payload
             return f(*args, **kwargs)
         return wrapped
     return decorator
+
+
+def require_jwt(f):
+    """Require a valid bearer token regardless of role."""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        if not get_jwt_payload():
+            if auth_error() == MISSING:
+                return jsonify({'error': 'missing token'}), 401
+            return jsonify({'error': 'invalid token'}), 401
+        return f(*args, **kwargs)
+    return wrapper
+
+
+def encode_cursor(*values):
+    """Encode keyset pagination values into an opaque, URL-safe cursor string."""
+    raw = json.dumps(values, separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor. Raises ValueError for malformed cursors."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError('invalid cursor')
+    if not isinstance(values, list):
+        raise ValueError('invalid cursor')
+    return values
+
+
+def parse_limit(default=20, maximum=100):
+    """Read ``?limit=`` from the query string, clamped to [1, maximum]. Raises ValueError."""
+    value = request.args.get('limit')
+    if value is None or value == '':
+        return default
+    return min(max(int(value), 1), maximum)
@@ -0,0 +1,63 @@
+import threading
+from collections import defaultdict
+
+from sqlalchemy import bindparam, func, update
+
+from . import db
+from .background import schedule
+
+
+class ViewCounter:
+    """Write-behind counter for ``BlogPost.views_count``.
+
+    Page views are accumulated in process memory and written out by ``flush()`` as a
+    single batched ``UPDATE ... SET views_count = views_count + n`` per post, so reads
+    of a post never open a write transaction.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = defaultdict(int)
+
+    def incr(self, post_id, n=1):
+        with self._lock:
+            self._pending[post_id] += n
+
+    def pending(self, post_id):
+        with self._lock:
+            return self._pending.get(post_id, 0)
+
+    def flush(self):
+        """Write buffered increments to the database. Returns the number of posts updated."""
+        with self._lock:
+            batch, self._pending = self._pending, defaultdict(int)
+        if not batch:
+            return 0
+
+        from .models import BlogPost
+        table = BlogPost.__table__
+        stmt = (
+            update(table)
+            .where(table.c.post_id == bindparam('b_post_id'))
+            # keep updated_at as is; a view is not an edit (the column has an onupdate default)
+            .values(views_count=func.coalesce(table.c.views_count, 0) + bindparam('b_n'), updated_at=table.c.updated_at)
+        )
+        params = [{'b_post_id': post_id, 'b_n': n} for post_id, n in sorted(batch.items())]
+        try:
+            db.session.execute(stmt, params)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            # put the increments back so the next flush retries them
+            with self._lock:
+                for post_id, n in batch.items():
+                    self._pending[post_id] += n
+            raise
+        return len(batch)
+
+
+def init_app(app):
+    app.view_counter = ViewCounter()
+    interval = app.config.get('VIEW_COUNT_FLUSH_INTERVAL', 10)
+    schedule(app, 'view-counter', interval, app.view_counter.flush, run_at_exit=True)
+    return app.view_counter
@@ -0,0 +1,22 @@
+"""blog_posts: composite index for keyset pagination of the public listing
+
+Revision ID: a1c4e2f9b731
+Revises: add_mentor_applications_table
+Create Date: 2026-10-17 09:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a1c4e2f9b731'
+down_revision = 'add_mentor_applications_table'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_blog_posts_status_created', 'blog_posts', ['status', 'created_at', 'post_id'])
+
+
+def downgrade():
+    op.drop_index('ix_blog_posts_status_created', table_name='blog_posts')
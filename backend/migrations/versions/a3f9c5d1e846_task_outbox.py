@@ -0,0 +1,36 @@
+"""task_outbox: Celery tasks written in the transaction of the change they belong to
+
+Revision ID: a3f9c5d1e846
+Revises: f7d2b6e0c824
+Create Date: 2026-10-17 22:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a3f9c5d1e846'
+down_revision = 'f7d2b6e0c824'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'task_outbox',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('task_name', sa.String(length=128), nullable=False),
+        sa.Column('args', sa.Text(), nullable=True),
+        sa.Column('kwargs', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('locked_by', sa.String(length=32), nullable=True),
+        sa.Column('locked_until', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('dispatched_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index('ix_task_outbox_pending', 'task_outbox', ['dispatched_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_task_outbox_pending', table_name='task_outbox')
+    op.drop_table('task_outbox')
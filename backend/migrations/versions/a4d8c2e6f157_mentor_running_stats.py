@@ -0,0 +1,34 @@
+"""mentor running rating totals; session rating, review and completion time
+
+Revision ID: a4d8c2e6f157
+Revises: f2c6a8e0b349
+Create Date: 2026-10-17 15:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a4d8c2e6f157'
+down_revision = 'f2c6a8e0b349'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('mentors', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rating_sum', sa.Float(), nullable=True, server_default='0'))
+        batch_op.add_column(sa.Column('rating_count', sa.Integer(), nullable=True, server_default='0'))
+    with op.batch_alter_table('mentorship_sessions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rating', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('review', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('mentorship_sessions', schema=None) as batch_op:
+        batch_op.drop_column('completed_at')
+        batch_op.drop_column('review')
+        batch_op.drop_column('rating')
+    with op.batch_alter_table('mentors', schema=None) as batch_op:
+        batch_op.drop_column('rating_count')
+        batch_op.drop_column('rating_sum')
@@ -0,0 +1,33 @@
+"""notification_counters: include unread broadcasts
+
+Revision ID: b5e1d7a3c962
+Revises: a3f9c5d1e846
+Create Date: 2026-10-18 09:00:00.000000
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'b5e1d7a3c962'
+down_revision = 'a3f9c5d1e846'
+branch_labels = None
+depends_on = None
+
+UNREAD_BROADCASTS = (
+    '(SELECT COUNT(*) FROM notifications n JOIN users u ON u.user_id = notification_counters.user_id '
+    "WHERE n.user_id IS NULL AND (n.audience = 'all' OR n.audience = u.role) "
+    'AND (u.date_joined IS NULL OR n.created_at >= u.date_joined) '
+    'AND NOT EXISTS (SELECT 1 FROM notification_receipts r '
+    'WHERE r.notification_id = n.notification_id AND r.user_id = u.user_id))'
+)
+
+
+def upgrade():
+    op.execute(
+        'INSERT INTO notification_counters (user_id, unread) SELECT user_id, 0 FROM users '
+        'WHERE NOT EXISTS (SELECT 1 FROM notification_counters c WHERE c.user_id = users.user_id)'
+    )
+    op.execute(f'UPDATE notification_counters SET unread = unread + {UNREAD_BROADCASTS}')
+
+
+def downgrade():
+    op.execute(f'UPDATE notification_counters SET unread = unread - {UNREAD_BROADCASTS}')
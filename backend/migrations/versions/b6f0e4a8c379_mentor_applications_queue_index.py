@@ -0,0 +1,22 @@
+"""mentor_applications: composite index for the status-filtered review queue
+
+Revision ID: b6f0e4a8c379
+Revises: a4d8c2e6f157
+Create Date: 2026-10-17 16:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b6f0e4a8c379'
+down_revision = 'a4d8c2e6f157'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_mentor_applications_status_submitted', 'mentor_applications', ['status', 'submitted_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_mentor_applications_status_submitted', table_name='mentor_applications')
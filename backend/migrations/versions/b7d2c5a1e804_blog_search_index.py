@@ -0,0 +1,35 @@
+"""blog full-text search index tables
+
+Revision ID: b7d2c5a1e804
+Revises: a1c4e2f9b731
+Create Date: 2026-10-17 10:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2c5a1e804'
+down_revision = 'a1c4e2f9b731'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'search_documents',
+        sa.Column('post_id', sa.Integer(), sa.ForeignKey('blog_posts.post_id'), primary_key=True),
+        sa.Column('length', sa.Integer(), nullable=False),
+    )
+    op.create_table(
+        'search_postings',
+        sa.Column('term', sa.String(length=64), primary_key=True),
+        sa.Column('post_id', sa.Integer(), sa.ForeignKey('blog_posts.post_id'), primary_key=True),
+        sa.Column('tf', sa.Integer(), nullable=False),
+    )
+    op.create_index('ix_search_postings_post_id', 'search_postings', ['post_id'])
+
+
+def downgrade():
+    op.drop_index('ix_search_postings_post_id', table_name='search_postings')
+    op.drop_table('search_postings')
+    op.drop_table('search_documents')
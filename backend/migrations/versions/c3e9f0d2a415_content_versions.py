@@ -0,0 +1,27 @@
+"""content_versions table for HTTP validators and cache invalidation
+
+Revision ID: c3e9f0d2a415
+Revises: b7d2c5a1e804
+Create Date: 2026-10-17 11:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c3e9f0d2a415'
+down_revision = 'b7d2c5a1e804'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'content_versions',
+        sa.Column('namespace', sa.String(length=64), primary_key=True),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table('content_versions')
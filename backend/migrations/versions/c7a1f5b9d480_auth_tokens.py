@@ -0,0 +1,74 @@
+"""auth_tokens: hashed refresh/reset/verification tokens moved out of users
+
+Revision ID: c7a1f5b9d480
+Revises: b6f0e4a8c379
+Create Date: 2026-10-17 17:00:00.000000
+"""
+import hashlib
+from datetime import datetime, timedelta, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c7a1f5b9d480'
+down_revision = 'b6f0e4a8c379'
+branch_labels = None
+depends_on = None
+
+# users column prefix -> token_type
+TOKEN_COLUMNS = {'refresh': 'refresh', 'reset': 'reset', 'verification': 'verify'}
+
+
+def upgrade():
+    auth_tokens = op.create_table(
+        'auth_tokens',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.user_id'), nullable=False),
+        sa.Column('token_type', sa.String(length=16), nullable=False),
+        sa.Column('digest', sa.String(length=64), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index('ix_auth_tokens_digest', 'auth_tokens', ['digest'], unique=True)
+    op.create_index('ix_auth_tokens_expires_at', 'auth_tokens', ['expires_at'])
+    op.create_index('ix_auth_tokens_user_type', 'auth_tokens', ['user_id', 'token_type'])
+
+    # carry over live tokens so nobody is signed out or loses a pending reset link
+    bind = op.get_bind()
+    now = datetime.now(timezone.utc)
+    rows = []
+    for prefix, token_type in TOKEN_COLUMNS.items():
+        result = bind.execute(sa.text(
+            f'SELECT user_id, {prefix}_token, {prefix}_expires FROM users WHERE {prefix}_token IS NOT NULL'
+        ))
+        for user_id, token, expires in result:
+            if expires is None:
+                continue
+            if isinstance(expires, str):
+                expires = datetime.fromisoformat(expires)
+            if expires.tzinfo is None:
+                expires = expires.replace(tzinfo=timezone.utc)
+            if expires > now:
+                rows.append({'user_id': user_id, 'token_type': token_type,
+                             'digest': hashlib.sha256(token.encode('utf-8')).hexdigest(),
+                             'expires_at': expires, 'created_at': now})
+    if rows:
+        op.bulk_insert(auth_tokens, rows)
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        for prefix in TOKEN_COLUMNS:
+            batch_op.drop_column(f'{prefix}_token')
+            batch_op.drop_column(f'{prefix}_expires')
+
+
+def downgrade():
+    # digests cannot be turned back into tokens: outstanding tokens are dropped
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        for prefix in TOKEN_COLUMNS:
+            batch_op.add_column(sa.Column(f'{prefix}_token', sa.String(length=255), nullable=True))
+            batch_op.add_column(sa.Column(f'{prefix}_expires', sa.DateTime(timezone=True), nullable=True))
+    op.drop_index('ix_auth_tokens_user_type', table_name='auth_tokens')
+    op.drop_index('ix_auth_tokens_expires_at', table_name='auth_tokens')
+    op.drop_index('ix_auth_tokens_digest', table_name='auth_tokens')
+    op.drop_table('auth_tokens')
@@ -0,0 +1,24 @@
+"""pending_emails: lease columns so overlapping digest runs cannot send twice
+
+Revision ID: c8f2a4e6b195
+Revises: b5e1d7a3c962
+Create Date: 2026-10-18 10:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c8f2a4e6b195'
+down_revision = 'b5e1d7a3c962'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('pending_emails', sa.Column('locked_by', sa.String(length=32), nullable=True))
+    op.add_column('pending_emails', sa.Column('locked_until', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade():
+    op.drop_column('pending_emails', 'locked_until')
+    op.drop_column('pending_emails', 'locked_by')
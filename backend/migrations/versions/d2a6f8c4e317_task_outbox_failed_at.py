@@ -0,0 +1,22 @@
+"""task_outbox.failed_at: rows the relay gave up on
+
+Revision ID: d2a6f8c4e317
+Revises: c8f2a4e6b195
+Create Date: 2026-10-18 11:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd2a6f8c4e317'
+down_revision = 'c8f2a4e6b195'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('task_outbox', sa.Column('failed_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade():
+    op.drop_column('task_outbox', 'failed_at')
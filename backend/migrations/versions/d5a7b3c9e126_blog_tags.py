@@ -0,0 +1,37 @@
+"""normalized blog tags: tags and blog_post_tags
+
+Existing comma-separated BlogPost.tags values are migrated by scripts/backfill_tags.py.
+
+Revision ID: d5a7b3c9e126
+Revises: c3e9f0d2a415
+Create Date: 2026-10-17 12:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd5a7b3c9e126'
+down_revision = 'c3e9f0d2a415'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'tags',
+        sa.Column('tag_id', sa.Integer(), primary_key=True),
+        sa.Column('name', sa.String(length=64), nullable=False, unique=True),
+        sa.Column('post_count', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.create_table(
+        'blog_post_tags',
+        sa.Column('post_id', sa.Integer(), sa.ForeignKey('blog_posts.post_id'), primary_key=True),
+        sa.Column('tag_id', sa.Integer(), sa.ForeignKey('tags.tag_id'), primary_key=True),
+    )
+    op.create_index('ix_blog_post_tags_tag_post', 'blog_post_tags', ['tag_id', 'post_id'])
+
+
+def downgrade():
+    op.drop_index('ix_blog_post_tags_tag_post', table_name='blog_post_tags')
+    op.drop_table('blog_post_tags')
+    op.drop_table('tags')
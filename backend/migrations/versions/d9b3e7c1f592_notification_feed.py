@@ -0,0 +1,33 @@
+"""notifications: per-user feed index and maintained unread counters
+
+Revision ID: d9b3e7c1f592
+Revises: c7a1f5b9d480
+Create Date: 2026-10-17 18:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd9b3e7c1f592'
+down_revision = 'c7a1f5b9d480'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_notifications_user_created', 'notifications', ['user_id', 'created_at', 'notification_id'])
+    op.create_table(
+        'notification_counters',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.user_id'), primary_key=True),
+        sa.Column('unread', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.execute(
+        'INSERT INTO notification_counters (user_id, unread) '
+        'SELECT user_id, COUNT(*) FROM notifications '
+        'WHERE user_id IS NOT NULL AND (is_read IS NULL OR is_read = false) GROUP BY user_id'
+    )
+
+
+def downgrade():
+    op.drop_table('notification_counters')
+    op.drop_index('ix_notifications_user_created', table_name='notifications')
@@ -0,0 +1,33 @@
+"""notifications: broadcasts stored once, with lazily written read receipts
+
+Revision ID: e4c8a2f6b713
+Revises: d9b3e7c1f592
+Create Date: 2026-10-17 19:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e4c8a2f6b713'
+down_revision = 'd9b3e7c1f592'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('notifications', sa.Column('audience', sa.String(length=32), nullable=True))
+    op.create_index('ix_notifications_audience_created', 'notifications', ['audience', 'created_at', 'notification_id'])
+    # the only user-less notifications so far are the admins' mentor application alerts
+    op.execute("UPDATE notifications SET audience = 'admin' WHERE user_id IS NULL")
+    op.create_table(
+        'notification_receipts',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.user_id'), primary_key=True),
+        sa.Column('notification_id', sa.Integer(), sa.ForeignKey('notifications.notification_id'), primary_key=True),
+        sa.Column('read_at', sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table('notification_receipts')
+    op.drop_index('ix_notifications_audience_created', table_name='notifications')
+    op.drop_column('notifications', 'audience')
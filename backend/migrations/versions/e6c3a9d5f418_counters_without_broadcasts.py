@@ -0,0 +1,37 @@
+"""notification_counters: count personal notifications only again
+
+Unread broadcasts are counted at read time (see app.inbox); this takes back what
+b5e1d7a3c962 folded into the counters.
+
+Revision ID: e6c3a9d5f418
+Revises: d2a6f8c4e317
+Create Date: 2026-10-19 09:00:00.000000
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'e6c3a9d5f418'
+down_revision = 'd2a6f8c4e317'
+branch_labels = None
+depends_on = None
+
+UNREAD_BROADCASTS = (
+    '(SELECT COUNT(*) FROM notifications n JOIN users u ON u.user_id = notification_counters.user_id '
+    "WHERE n.user_id IS NULL AND (n.audience = 'all' OR n.audience = u.role) "
+    'AND (u.date_joined IS NULL OR n.created_at >= u.date_joined) '
+    'AND NOT EXISTS (SELECT 1 FROM notification_receipts r '
+    'WHERE r.notification_id = n.notification_id AND r.user_id = u.user_id))'
+)
+PERSONAL_UNREAD = (
+    '(SELECT COUNT(*) FROM notifications n WHERE n.user_id = notification_counters.user_id '
+    'AND (n.is_read IS NULL OR n.is_read = false))'
+)
+
+
+def upgrade():
+    # a recount rather than a subtraction: role changes since then made the old sums drift
+    op.execute(f'UPDATE notification_counters SET unread = {PERSONAL_UNREAD}')
+
+
+def downgrade():
+    op.execute(f'UPDATE notification_counters SET unread = unread + {UNREAD_BROADCASTS}')
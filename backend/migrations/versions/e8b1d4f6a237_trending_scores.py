@@ -0,0 +1,27 @@
+"""trending_scores snapshot table
+
+Revision ID: e8b1d4f6a237
+Revises: d5a7b3c9e126
+Create Date: 2026-10-17 13:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e8b1d4f6a237'
+down_revision = 'd5a7b3c9e126'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'trending_scores',
+        sa.Column('post_id', sa.Integer(), sa.ForeignKey('blog_posts.post_id'), primary_key=True),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('computed_at', sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table('trending_scores')
@@ -0,0 +1,28 @@
+"""mentorship_sessions: structured start/end times and per-mentor index
+
+Revision ID: f2c6a8e0b349
+Revises: e8b1d4f6a237
+Create Date: 2026-10-17 14:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'f2c6a8e0b349'
+down_revision = 'e8b1d4f6a237'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('mentorship_sessions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('start_at', sa.DateTime(timezone=True), nullable=True))
+        batch_op.add_column(sa.Column('end_at', sa.DateTime(timezone=True), nullable=True))
+        batch_op.create_index('ix_mentorship_sessions_mentor_start', ['mentor_id', 'start_at'])
+
+
+def downgrade():
+    with op.batch_alter_table('mentorship_sessions', schema=None) as batch_op:
+        batch_op.drop_index('ix_mentorship_sessions_mentor_start')
+        batch_op.drop_column('end_at')
+        batch_op.drop_column('start_at')
@@ -0,0 +1,37 @@
+"""users.email_digest preference and the pending_emails digest buffer
+
+Revision ID: f7d2b6e0c824
+Revises: e4c8a2f6b713
+Create Date: 2026-10-17 20:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'f7d2b6e0c824'
+down_revision = 'e4c8a2f6b713'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('users', sa.Column('email_digest', sa.String(length=16), nullable=True, server_default='off'))
+    op.create_table(
+        'pending_emails',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.user_id'), nullable=False),
+        sa.Column('subject', sa.String(length=255), nullable=True),
+        sa.Column('body', sa.Text(), nullable=True),
+        sa.Column('template_name', sa.String(length=128), nullable=True),
+        sa.Column('template_context', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index('ix_pending_emails_user', 'pending_emails', ['user_id', 'id'])
+    op.create_index('ix_pending_emails_created_at', 'pending_emails', ['created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_pending_emails_created_at', table_name='pending_emails')
+    op.drop_index('ix_pending_emails_user', table_name='pending_emails')
+    op.drop_table('pending_emails')
+    op.drop_column('users', 'email_digest')
@@ -0,0 +1,18 @@
+import os
+import sys
+
+# Ensure backend package (the backend/ directory) is on sys.path so imports work
+THIS_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(THIS_DIR, '..'))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from app import create_app
+from app import blog_tags
+
+app = create_app()
+
+with app.app_context():
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    total = blog_tags.backfill(batch_size=batch_size)
+    print(f'Tag backfill complete: {total} posts processed.')
@@ -0,0 +1,105 @@
+"""Load test for session booking: many threads booking overlapping slots in parallel.
+
+Usage: python scripts/bench_booking.py [attempts] [threads] [mentors]
+
+Uses DATABASE_URL when set (point it at MySQL/Postgres to exercise row locks),
+otherwise a throwaway SQLite file. Afterwards every mentor's sessions are checked
+for overlaps.
+"""
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+THIS_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(THIS_DIR, '..'))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+db_fd = db_path = None
+if not os.environ.get('DATABASE_URL'):
+    db_fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + db_path
+
+from app import create_app, db
+from app.booking import BookingConflict, as_utc, book_session
+from app.models import Mentor, MentorshipSession, User
+
+
+class SQLiteConfig:
+    # let writers queue on the database lock instead of failing after the default 5s
+    SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'timeout': 60}}
+
+
+def main(attempts=5000, n_threads=16, n_mentors=20):
+    app = create_app(SQLiteConfig if os.environ['DATABASE_URL'].startswith('sqlite') else None)
+    with app.app_context():
+        db.create_all()
+        db.session.execute(User.__table__.insert(), [
+            {'name': f'Load {i}', 'email': f'load{i}-{time.time_ns()}@example.com', 'password_hash': 'x'}
+            for i in range(n_mentors + 1)
+        ])
+        db.session.commit()
+        user_ids = [u for (u,) in db.session.query(User.user_id).order_by(User.user_id.desc()).limit(n_mentors + 1)]
+        mentee_id, mentor_ids = user_ids[0], user_ids[1:]
+        db.session.execute(Mentor.__table__.insert(), [{'mentor_id': m} for m in mentor_ids])
+        db.session.commit()
+
+    base = datetime(2031, 1, 1, tzinfo=timezone.utc)
+    counts = {'booked': 0, 'conflict': 0, 'error': 0}
+    lock = threading.Lock()
+    per_thread = attempts // n_threads
+
+    def worker(seed):
+        rng = random.Random(seed)
+        with app.app_context():
+            for _ in range(per_thread):
+                # 30-90 minute sessions on a 15 minute grid over one week: lots of overlap
+                start = base + timedelta(minutes=15 * rng.randrange(7 * 24 * 4))
+                end = start + timedelta(minutes=rng.choice((30, 60, 90)))
+                try:
+                    book_session(rng.choice(mentor_ids), mentee_id, start, end)
+                    outcome = 'booked'
+                except BookingConflict:
+                    outcome = 'conflict'
+                except Exception:
+                    outcome = 'error'
+                with lock:
+                    counts[outcome] += 1
+            db.session.remove()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n_threads)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    overlaps = 0
+    with app.app_context():
+        for mentor_id in mentor_ids:
+            rows = (db.session.query(MentorshipSession.start_at, MentorshipSession.end_at)
+                    .filter(MentorshipSession.mentor_id == mentor_id).order_by(MentorshipSession.start_at).all())
+            for prev, cur in zip(rows, rows[1:]):
+                if as_utc(cur.start_at) < as_utc(prev.end_at):
+                    overlaps += 1
+
+    total = sum(counts.values())
+    print(f'{total} booking attempts, {n_threads} threads, {n_mentors} mentors in {elapsed:.2f}s '
+          f'({total / elapsed:.0f} attempts/s)')
+    print(f"booked={counts['booked']} conflicts={counts['conflict']} errors={counts['error']} overlaps={overlaps}")
+    return overlaps
+
+
+if __name__ == '__main__':
+    try:
+        overlaps = main(*[int(a) for a in sys.argv[1:4]])
+    finally:
+        if db_path:
+            os.close(db_fd)
+            os.remove(db_path)
+    sys.exit(1 if overlaps else 0)
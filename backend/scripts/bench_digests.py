@@ -0,0 +1,117 @@
+"""Email volume over a synthetic week: one email per event vs hourly / daily digests.
+
+Usage: python scripts/bench_digests.py [users] [seed]
+
+Users are light (1 event a day), active (8) or heavy (40). Events are replayed in time
+order against a throwaway SQLite file with the compaction job run every DIGEST_INTERVAL
+(5 minutes) of simulated time; mail is suppressed and counted through Flask-Mail's
+email_dispatched signal.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+THIS_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(THIS_DIR, '..'))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+db_fd = db_path = None
+if not os.environ.get('DATABASE_URL'):
+    db_fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + db_path
+
+from flask_mail import Mail, email_dispatched
+
+from app import create_app, db, digests
+from app.models import PendingEmail, User
+
+WEEK = timedelta(days=7)
+STEP = timedelta(minutes=5)
+PROFILES = [(0.70, 1), (0.25, 8), (0.05, 40)]  # (share of users, events per day)
+
+
+class BenchConfig:
+    RATELIMIT_ENABLED = False
+    BACKGROUND_TASKS_ENABLED = False
+    MAIL_SUPPRESS_SEND = True
+    MAIL_DEFAULT_SENDER = 'noreply@example.com'
+
+
+def synthetic_week(user_ids, start, rng):
+    events = []
+    for user_id in user_ids:
+        roll, per_day = rng.random(), PROFILES[-1][1]
+        for share, rate in PROFILES:
+            if roll < share:
+                per_day = rate
+                break
+            roll -= share
+        for _ in range(rng.randint(per_day * 6, per_day * 8)):
+            events.append((start + WEEK * rng.random(), user_id))
+    return sorted(events)
+
+
+def replay(events, start, cadence, mail):
+    """Feed the week's events through digests.compact; returns (connections, emails, runs)."""
+    PendingEmail.query.delete()
+    User.query.update({User.email_digest: cadence})
+    db.session.commit()
+    sent = []
+    connections = runs = 0
+    pending = iter(events)
+    upcoming = next(pending, None)
+    now = start
+    with email_dispatched.connected_to(lambda message, app: sent.append(message)):
+        while now <= start + WEEK + timedelta(days=1):
+            now += STEP
+            rows = []
+            while upcoming is not None and upcoming[0] <= now:
+                at, user_id = upcoming
+                rows.append({'user_id': user_id, 'subject': 'Post moderation update',
+                             'body': 'Your post was published.', 'created_at': at})
+                upcoming = next(pending, None)
+            if rows:
+                db.session.execute(PendingEmail.__table__.insert(), rows)
+                db.session.commit()
+            stats = digests.compact(now=now, mail=mail)
+            connections += stats['connections']
+            runs += 1 if stats['connections'] else 0
+    return connections, len(sent), runs
+
+
+def main(users=300, seed=7):
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        mail = Mail().init_app(app)
+        db.session.execute(User.__table__.insert(), [
+            {'name': f'user {i}', 'email': f'user{i}@example.com', 'password_hash': 'x'} for i in range(users)
+        ])
+        db.session.commit()
+        user_ids = [u for (u,) in db.session.query(User.user_id)]
+        start = datetime(2026, 10, 5, tzinfo=timezone.utc)
+        events = synthetic_week(user_ids, start, random.Random(seed))
+
+        print(f'{users} users, {len(events)} events in a week')
+        print(f'{"mode":<10} {"tasks":>8} {"SMTP conns":>11} {"emails":>8} {"time":>8}')
+        # without digests every event is its own request, task, connection and email
+        print(f'{"per event":<10} {len(events):>8} {len(events):>11} {len(events):>8} {"-":>8}')
+        for cadence in digests.CADENCES:
+            began = time.perf_counter()
+            connections, emails, runs = replay(events, start, cadence, mail)
+            elapsed = time.perf_counter() - began
+            print(f'{cadence:<10} {runs:>8} {connections:>11} {emails:>8} {elapsed:>7.1f}s'
+                  f'   ({len(events) / max(emails, 1):.1f} events per email)')
+
+
+if __name__ == '__main__':
+    try:
+        main(*(int(a) for a in sys.argv[1:3]))
+    finally:
+        if db_path:
+            os.close(db_fd)
+            os.remove(db_path)
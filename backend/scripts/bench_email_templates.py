@@ -0,0 +1,57 @@
+"""Rendering throughput of email templates: a fresh Jinja environment per email vs the registry.
+
+Usage: python scripts/bench_email_templates.py [count]
+
+Renders ``count`` (default 10000) blog_published emails, text and HTML parts, both ways.
+"""
+import os
+import sys
+import tempfile
+import time
+
+THIS_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(THIS_DIR, '..'))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from app import email_templates
+
+
+def render_uncached(base_name, context):
+    # what render_email_template did before the registry: new environment, reload, recompile
+    env = Environment(loader=FileSystemLoader(str(email_templates.TEMPLATE_DIR)), autoescape=select_autoescape(['html', 'xml']))
+    text = env.get_template(f'{base_name}.txt').render(**context)
+    html = env.get_template(f'{base_name}.html').render(**context)
+    return text, html
+
+
+def run(label, render, count):
+    start = time.perf_counter()
+    for i in range(count):
+        render('blog_published', {'name': f'Reader {i}', 'title': f'Post {i}', 'published_at': '2026-10-17'})
+    elapsed = time.perf_counter() - start
+    print(f'{label:<28} {elapsed:8.2f} s  {count / elapsed:10.0f} emails/s')
+    return elapsed
+
+
+def main(count=10000):
+    cache_dir = tempfile.mkdtemp(prefix='email-bytecode-')
+    uncached = run('new environment per email', render_uncached, count)
+
+    start = time.perf_counter()
+    email_templates.configure(cache_dir=cache_dir)
+    email_templates.preload()
+    print(f'{"preload (cold bytecode)":<28} {(time.perf_counter() - start) * 1000:8.1f} ms')
+    start = time.perf_counter()
+    email_templates.configure(cache_dir=cache_dir)
+    email_templates.preload()
+    print(f'{"preload (warm bytecode)":<28} {(time.perf_counter() - start) * 1000:8.1f} ms')
+
+    cached = run('registry', email_templates.render_email_template, count)
+    print(f'speedup: {uncached / cached:.1f}x')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
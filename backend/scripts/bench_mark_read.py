@@ -0,0 +1,76 @@
+"""Clearing an inbox: one mark-read request per notification vs one bulk request.
+
+Usage: python scripts/bench_mark_read.py [inbox_size] [rounds]
+
+Both variants go through the Flask test client against a throwaway SQLite file (or
+DATABASE_URL), so each per-item call pays a request, an ORM load and a commit.
+"""
+import os
+import sys
+import tempfile
+import time
+
+THIS_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(THIS_DIR, '..'))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+db_fd = db_path = None
+if not os.environ.get('DATABASE_URL'):
+    db_fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + db_path
+
+from app import create_app, db, inbox
+from app.models import Notification, User
+
+
+class BenchConfig:
+    RATELIMIT_ENABLED = False
+    BACKGROUND_TASKS_ENABLED = False
+
+
+def fill(user_id, size):
+    inbox.add_many({'user_id': user_id, 'title': f'n{i}', 'message': 'm', 'type': 'system'} for i in range(size))
+    db.session.commit()
+    return [i for (i,) in db.session.query(Notification.notification_id).filter_by(user_id=user_id, is_read=False)]
+
+
+def main(size=50, rounds=5):
+    app = create_app(BenchConfig)
+    client = app.test_client()
+    with app.app_context():
+        db.create_all()
+        user = User(name='Bench', email=f'bench-{time.time_ns()}@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.user_id
+
+        timings = {'per-item': [], 'bulk': []}
+        for _ in range(rounds):
+            ids = fill(user_id, size)
+            start = time.perf_counter()
+            for notification_id in ids:
+                client.post(f'/notifications/{notification_id}/read')
+            timings['per-item'].append(time.perf_counter() - start)
+            assert inbox.unread_count(user_id) == 0
+
+            ids = fill(user_id, size)
+            start = time.perf_counter()
+            rv = client.post('/notifications/read', json={'user_id': user_id, 'ids': ids})
+            timings['bulk'].append(time.perf_counter() - start)
+            assert rv.get_json()['marked'] == size and inbox.unread_count(user_id) == 0
+
+    for name, values in timings.items():
+        best = min(values)
+        print(f'{name:>9}: {size} notifications in {best * 1000:8.1f} ms (best of {rounds}), '
+              f'{best / size * 1e6:8.1f} us per notification')
+    print(f'bulk is {min(timings["per-item"]) / min(timings["bulk"]):.0f}x faster')
+
+
+if __name__ == '__main__':
+    try:
+        main(*(int(a) for a in sys.argv[1:3]))
+    finally:
+        if db_path:
+            os.close(db_fd)
+            os.remove(db_path)
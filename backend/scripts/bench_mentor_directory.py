@@ -0,0 +1,78 @@
+"""Benchmark the mentor directory at 10k mentors: old N+1 loop vs joined query vs cache.
+
+Usage: python scripts/bench_mentor_directory.py [mentors]
+Runs against a throwaway SQLite database.
+"""
+import os
+import sys
+import tempfile
+import time
+
+THIS_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(THIS_DIR, '..'))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+db_fd, db_path = tempfile.mkstemp(suffix='.db')
+os.environ['DATABASE_URL'] = 'sqlite:///' + db_path
+
+from app import create_app, db
+from app.models import User, Mentor
+from app.mentor_directory import MentorDirectory, _query, serialize
+
+
+def n_plus_one():
+    out = []
+    for m in Mentor.query.all():
+        user = User.query.filter_by(user_id=m.mentor_id).first()
+        out.append({
+            'mentor_id': m.mentor_id,
+            'name': user.name if user else None,
+            'email': user.email if user else None,
+            'profile_photo_url': user.profile_photo_url if user else None,
+            'bio': user.bio if user else None,
+            'expertise_areas': (m.expertise_areas.split(',') if m.expertise_areas else []),
+            'availability_status': m.availability_status,
+        })
+    return out
+
+
+def timed(label, fn, repeat=3):
+    best = None
+    for _ in range(repeat):
+        db.session.expire_all()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f'{label:<28} {best * 1e3:9.2f} ms')
+
+
+def main(n=10_000):
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        users = [{'name': f'Mentor {i}', 'email': f'm{i}@example.com', 'password_hash': 'x', 'bio': 'bio ' * 20}
+                 for i in range(n)]
+        db.session.execute(User.__table__.insert(), users)
+        ids = [u for (u,) in db.session.query(User.user_id)]
+        db.session.execute(Mentor.__table__.insert(), [
+            {'mentor_id': uid, 'expertise_areas': 'python,design,careers', 'availability_status': 'available'}
+            for uid in ids
+        ])
+        db.session.commit()
+
+        directory = MentorDirectory()
+        print(f'{n} mentors')
+        timed('N+1 loop (old)', n_plus_one, repeat=1)
+        timed('single joined query', lambda: [serialize(r) for r in _query()])
+        directory.encoded()
+        timed('cached directory (hit)', directory.encoded, repeat=20)
+
+
+if __name__ == '__main__':
+    try:
+        main(*[int(a) for a in sys.argv[1:2]])
+    finally:
+        os.close(db_fd)
+        os.remove(db_path)
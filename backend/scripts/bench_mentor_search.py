@@ -0,0 +1,56 @@
+"""Benchmark the mentor expertise index: build time, incremental update and query latency.
+
+Usage: python scripts/bench_mentor_search.py [mentors]
+"""
+import os
+import random
+import sys
+import time
+
+THIS_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(THIS_DIR, '..'))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from app.mentor_search import MentorSearchIndex
+
+AREAS = ['python', 'data science', 'web design', 'careers', 'public speaking', 'health', 'agriculture',
+         'finance', 'law', 'nursing', 'mathematics', 'physics', 'entrepreneurship', 'writing', 'art']
+REGIONS = ['Nairobi', 'Mombasa', 'Kisumu', 'Nakuru', 'Eldoret']
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+def main(n=50_000):
+    rng = random.Random(7)
+    index = MentorSearchIndex()
+    start = time.perf_counter()
+    for mentor_id in range(1, n + 1):
+        index.put(mentor_id, ','.join(rng.sample(AREAS, 3)), rng.choice(REGIONS),
+                  rng.choice(['available', 'busy']), rng.uniform(3, 5), rng.randint(0, 200), rng.randint(0, 5))
+    build = time.perf_counter() - start
+
+    updates = []
+    for _ in range(2000):
+        t = time.perf_counter()
+        index.put(rng.randint(1, n), ','.join(rng.sample(AREAS, 3)), rng.choice(REGIONS), 'available',
+                  rng.uniform(3, 5), rng.randint(0, 200), rng.randint(0, 5))
+        updates.append(time.perf_counter() - t)
+
+    queries = []
+    for _ in range(500):
+        t = time.perf_counter()
+        index.search(expertise=rng.choice(AREAS), region=rng.choice(REGIONS), availability='available', limit=20)
+        queries.append(time.perf_counter() - t)
+
+    print(f'{n} mentors, index built in {build * 1e3:.0f} ms')
+    print(f'incremental update p50/p99: {percentile(updates, .5) * 1e6:.1f} us / {percentile(updates, .99) * 1e6:.1f} us')
+    print(f'search (term + region + availability) p50/p99: '
+          f'{percentile(queries, .5) * 1e3:.2f} ms / {percentile(queries, .99) * 1e3:.2f} ms')
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,110 @@
+"""Login storm benchmark: login throughput and latency of an unrelated endpoint.
+
+Usage: python scripts/bench_password_hashing.py [login_clients] [rounds] [seconds]
+
+Each gunicorn worker is simulated in-process by a fixed number of request slots
+(threads) that all requests share. Two setups are compared:
+
+  inline  1 slot per worker (sync worker class), bcrypt on the request thread
+  pool    8 slots per worker (gthread --threads 8), bcrypt in one pool process per
+          worker with at most 4 hashes pending per worker
+
+``login_clients`` clients log in back to back; every 20 ms a request to ``/`` joins
+the same queue. Its p50/p99 latency is what other users see during the storm.
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+THIS_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(THIS_DIR, '..'))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+WORKERS = 2  # gunicorn --workers in render.yaml
+
+
+class BenchConfig:
+    RATELIMIT_ENABLED = False
+    BACKGROUND_TASKS_ENABLED = False
+    SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'timeout': 60}}
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else float('nan')
+
+
+def run(mode, n_clients, rounds, duration):
+    from app import create_app, db
+    from app.models import User
+    from app.passwords import PasswordHasher
+
+    app = create_app(BenchConfig)
+    slots = WORKERS * (1 if mode == 'inline' else 8)
+    app.password_hasher = PasswordHasher(rounds=rounds, workers=0 if mode == 'inline' else WORKERS, max_pending=WORKERS * 4)
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(name='Bench', email='bench@example.com', password_hash=app.password_hasher.hash('secret')))
+        db.session.commit()
+    if mode == 'pool':
+        app.password_hasher.check('warm', app.password_hasher.hash('warm'))  # start the pool processes
+
+    statuses = {}
+    other = []
+    lock = threading.Lock()
+    stop = threading.Event()
+    executor = ThreadPoolExecutor(slots)
+
+    def login():
+        rv = app.test_client().post('/auth/login', json={'email': 'bench@example.com', 'password': 'secret'})
+        with lock:
+            statuses[rv.status_code] = statuses.get(rv.status_code, 0) + 1
+        if rv.status_code == 503:
+            time.sleep(0.05)  # a client honouring Retry-After, scaled down
+
+    def client_loop():
+        while not stop.is_set():
+            executor.submit(login).result()
+
+    def index(queued_at):
+        app.test_client().get('/')
+        with lock:
+            other.append(time.perf_counter() - queued_at)
+
+    clients = [threading.Thread(target=client_loop) for _ in range(n_clients)]
+    for t in clients:
+        t.start()
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        executor.submit(index, time.perf_counter())
+        time.sleep(0.02)
+    stop.set()
+    for t in clients:
+        t.join()
+    executor.shutdown(wait=True)
+    elapsed = time.perf_counter() - start
+    app.password_hasher.shutdown()
+
+    ok = statuses.get(200, 0)
+    print(f'{mode:>6}: {slots} slots, {n_clients} login clients for {elapsed:.1f}s -> {ok / elapsed:.1f} logins/s, '
+          f'statuses {statuses}; "/" p50 {percentile(other, 0.5) * 1000:.1f} ms, '
+          f'p99 {percentile(other, 0.99) * 1000:.1f} ms ({len(other)} requests)')
+
+
+def main(n_clients=32, rounds=12, duration=15):
+    for mode in ('inline', 'pool'):
+        db_fd, db_path = tempfile.mkstemp(suffix='.db')
+        os.environ['DATABASE_URL'] = 'sqlite:///' + db_path
+        try:
+            run(mode, n_clients, rounds, duration)
+        finally:
+            os.close(db_fd)
+            os.remove(db_path)
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:4]))
@@ -0,0 +1,63 @@
+"""SMS throughput against the local stand-in: per-message requests.post vs the pooled dispatcher.
+
+Usage: python scripts/bench_sms.py [messages] [latency_ms] [concurrency]
+
+The stand-in (scripts/sms_standin.py) runs in this process and adds ``latency_ms``
+(default 5) to every request to stand in for the provider's round trip.
+"""
+import os
+import sys
+import time
+
+import requests
+
+THIS_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(THIS_DIR, '..'))
+for path in (BACKEND_DIR, THIS_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from app.sms import SMSDispatcher, TwilioProvider
+from sms_standin import SMSStandIn
+
+SID, TOKEN, FROM = 'AC0bench', 'secret', '+15559990000'
+
+
+def per_message(server, messages):
+    # what _send_sms did: a new connection for every message, one at a time
+    url = f'{server.base_url}/2010-04-01/Accounts/{SID}/Messages.json'
+    for m in messages:
+        requests.post(url, data={'To': m['to'], 'From': FROM, 'Body': m['body']}, auth=(SID, TOKEN), timeout=10).raise_for_status()
+
+
+def run(label, server, send, messages):
+    server.messages.clear()
+    server.connections = 0
+    start = time.perf_counter()
+    send(messages)
+    elapsed = time.perf_counter() - start
+    assert len(server.messages) == len(messages), (label, len(server.messages))
+    print(f'{label:<34} {elapsed:8.2f} s {len(messages) / elapsed:9.0f} msg/s {server.connections:8d} conns')
+
+
+def main(count=10000, latency_ms=5, concurrency=16):
+    server = SMSStandIn(latency=latency_ms / 1000).start()
+    provider = TwilioProvider(SID, TOKEN, FROM, base_url=server.base_url)
+    messages = [{'to': f'+1555{i:07d}', 'body': f'Your session starts in 10 minutes ({i})'} for i in range(count)]
+    print(f'{count} messages, {latency_ms} ms provider latency')
+    try:
+        run('requests.post per message', server, lambda batch: per_message(server, batch), messages)
+        for label, workers, rate in (
+            ('pooled, sequential', 1, 0),
+            (f'pooled, {concurrency} concurrent', concurrency, 0),
+            (f'pooled, {concurrency} concurrent, 250/s cap', concurrency, 250),
+        ):
+            sms = SMSDispatcher(provider, concurrency=workers, rate=rate)
+            run(label, server, lambda batch: sms.send_bulk(batch), messages)
+            sms.close()
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:4]))
@@ -0,0 +1,48 @@
+"""Benchmark the trending tracker: update cost and top-k read latency at 100k posts.
+
+Usage: python scripts/bench_trending.py [posts] [events]
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+THIS_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(THIS_DIR, '..'))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from app.trending import TrendingTracker
+
+
+def main(n_posts=100_000, n_events=1_000_000):
+    rng = random.Random(42)
+    # skewed popularity, like real traffic: a few posts get most of the views
+    post_ids = [min(int(rng.paretovariate(1.2)), n_posts) for _ in range(n_events)]
+    clock = [0.0]
+    tracker = TrendingTracker(half_life=6 * 3600, clock=lambda: clock[0])
+    for post_id in range(1, n_posts + 1):
+        tracker.record(post_id, at=0.0)
+
+    start = time.perf_counter()
+    for i, post_id in enumerate(post_ids):
+        tracker.record(post_id, at=i * 0.05)  # ~14h of traffic at 20 events/s
+    elapsed = time.perf_counter() - start
+    clock[0] = n_events * 0.05
+
+    reads = []
+    for _ in range(1000):
+        t = time.perf_counter()
+        tracker.top(10)
+        reads.append(time.perf_counter() - t)
+    reads.sort()
+
+    print(f'posts tracked:       {len(tracker)}')
+    print(f'updates:             {n_events} in {elapsed:.2f}s ({elapsed / n_events * 1e6:.2f} us/update)')
+    print(f'top-10 read p50/p99: {statistics.median(reads) * 1e3:.3f} ms / {reads[int(len(reads) * 0.99)] * 1e3:.3f} ms')
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*args)
@@ -0,0 +1,21 @@
+import os
+import sys
+
+# Ensure backend package (the backend/ directory) is on sys.path so imports work
+THIS_DIR = os.path.dirname(__file__)
+BACKEND_DIR = os.path.abspath(os.path.join(THIS_DIR, '..'))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from app import create_app
+from app import mentor_stats
+
+app = create_app()
+
+with app.app_context():
+    fix = '--fix' in sys.argv[1:]
+    drift = mentor_stats.reconcile(fix=fix)
+    for d in drift:
+        print(f"mentor {d['mentor_id']}: {d['field']} stored={d['stored']} actual={d['actual']}")
+    mentors = len({d['mentor_id'] for d in drift})
+    print(f"{len(drift)} drifted fields across {mentors} mentors{' (fixed)' if fix and drift else ''}.")
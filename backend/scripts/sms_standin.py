@@ -0,0 +1,87 @@
+"""A local stand-in for Twilio's Messages API, for tests, benchmarks and development.
+
+Usage: python scripts/sms_standin.py [port] [latency_ms]
+
+Point the app at it with SMS_PROVIDER=twilio, TWILIO_BASE_URL=http://127.0.0.1:<port>
+and any TWILIO_ACCOUNT_SID / TWILIO_AUTH_TOKEN / TWILIO_FROM. Numbers in ``replies``
+get that status code instead of 201; ``latency`` is added to every request to mimic a
+remote API. The server speaks HTTP/1.1 keep-alive and counts the connections it got.
+"""
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import count
+from urllib.parse import parse_qs
+
+
+class SMSStandIn(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.0, replies=None):
+        super().__init__(('127.0.0.1', port), _Handler)
+        self.latency = latency
+        self.replies = replies or {}
+        self.messages = []
+        self.connections = 0
+        self._ids = count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name='sms-standin', daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # one write per response, without Nagle: otherwise keep-alive clients wait on delayed ACKs
+    wbufsize = 1 << 16
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server._lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        form = parse_qs(self.rfile.read(int(self.headers.get('Content-Length', 0))).decode())
+        to = form.get('To', [''])[0]
+        if server.latency:
+            time.sleep(server.latency)
+        status = server.replies.get(to, 201)
+        if status == 201 and self.path.endswith('/Messages.json'):
+            with server._lock:
+                sid = f'SM{next(server._ids):032d}'
+                server.messages.append({'sid': sid, 'to': to, 'from': form.get('From', [''])[0],
+                                        'body': form.get('Body', [''])[0]})
+            payload = {'sid': sid, 'status': 'queued', 'to': to}
+        else:
+            status = status if status != 201 else 404
+            payload = {'code': status, 'message': 'rejected by stand-in'}
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8030
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.0
+    server = SMSStandIn(port, latency)
+    print(f'SMS stand-in listening on {server.base_url}')
+    server.serve_forever()
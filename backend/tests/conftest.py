@@ -7,17 +7,23 @@ if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
 import tempfile
+
+import jwt
 import pytest
 
+# minimum bcrypt cost keeps the auth tests fast; hashing runs inline under TESTING
+os.environ.setdefault('BCRYPT_ROUNDS', '4')
+
 
 @pytest.fixture
-def app():
+def app(tmp_path):
     # create a temporary sqlite database for tests
     db_fd, db_path = tempfile.mkstemp()
     os.environ['DATABASE_URL'] = 'sqlite:///' + db_path
     from app import create_app, db
     app = create_app()
     app.config['TESTING'] = True
+    app.config['UPLOAD_DIR'] = str(tmp_path / 'uploads')
 
     with app.app_context():
         db.create_all()
@@ -45,3 +51,13 @@ def db_session(app):
     with app.app_context():
         yield _db.session
         _db.session.rollback()
+
+
+@pytest.fixture
+def auth_headers(app):
+    """``auth_headers(user_id, role='student')`` -> an Authorization header with a long-lived token."""
+    def make(user_id, role='student'):
+        secret = app.config.get('JWT_SECRET') or app.config.get('SECRET_KEY')
+        token = jwt.encode({'sub': user_id, 'role': role, 'exp': 9999999999, 'tv': 0}, secret, algorithm='HS256')
+        return {'Authorization': f'Bearer {token}'}
+    return make
@@ -24,3 +24,46 @@ def test_register_and_login(client):
     assert rv.status_code == 200
     data = rv.get_json()
     assert 'access_token' in data and 'refresh_token' in data
+
+
+def test_login_rehashes_when_cost_changes(client):
+    import bcrypt
+    from app.models import User
+    from app.passwords import hash_cost
+
+    app = client.application
+    with app.app_context():
+        old = bcrypt.hashpw(b'pass123', bcrypt.gensalt(5)).decode('utf-8')
+        db.session.add(User(name='Old', email='old@example.com', password_hash=old))
+        db.session.commit()
+    rv = client.post('/auth/login', json={'email': 'old@example.com', 'password': 'pass123'})
+    assert rv.status_code == 200
+    with app.app_context():
+        stored = User.query.filter_by(email='old@example.com').first().password_hash
+        assert hash_cost(stored) == app.config['BCRYPT_ROUNDS'] != 5
+        assert bcrypt.checkpw(b'pass123', stored.encode('utf-8'))
+
+
+def test_saturated_hasher_rejects_fast(client):
+    from app.passwords import PasswordHasher
+
+    app = client.application
+    app.password_hasher = PasswordHasher(rounds=4, workers=1, max_pending=0)
+    app.config['TESTING'] = False  # TESTING hashes inline, bypassing the pool
+    rv = client.post('/auth/login', json={'email': 'a@example.com', 'password': 'pass123'})
+    assert rv.status_code == 401  # unknown user never reaches the hasher
+    rv = client.post('/auth/register', json={'email': 'b@example.com', 'password': 'pass123'})
+    assert rv.status_code == 503
+    assert rv.headers['Retry-After'] == '1'
+    assert app.password_hasher.rejected == 1
+
+
+def test_hasher_process_pool():
+    from app.passwords import PasswordHasher
+
+    hasher = PasswordHasher(rounds=4, workers=1, max_pending=4)
+    try:
+        hashed = hasher.hash('secret')
+        assert hasher.check('secret', hashed) and not hasher.check('wrong', hashed)
+    finally:
+        hasher.shutdown()
@@ -1,7 +1,7 @@
 import os
 import tempfile
 import pytest
-from app import create_app, db
+from app import create_app, db, outbox
 from app.models import User
 
 
@@ -15,9 +15,26 @@ def client():
     with app.test_client() as client:
         with app.app_context():
             db.create_all()
+        client.sent = []
+
+        class RecordingCelery:
+            def send_task(self, name, args=(), **kwargs):
+                client.sent.append(tuple(args))
+
+        app.celery = RecordingCelery()
         yield client
 
 
+def sent_token(client, subject):
+    """Last token mailed with ``subject`` (tokens are only stored hashed)."""
+    with client.application.app_context():
+        outbox.drain()
+    for to, subj, body in reversed(client.sent):
+        if subj == subject:
+            return body.rsplit(' ', 1)[1]
+    raise AssertionError(f'no {subject!r} email sent')
+
+
 def register_user(client, email='b@example.com'):
     rv = client.post('/auth/register', json={'email': email, 'password': 'pass123', 'name': 'Bob'})
     assert rv.status_code == 201
@@ -28,14 +45,13 @@ def test_forgot_and_reset_flow(client):
     # request reset
     rv = client.post('/auth/forgot-password', json={'email': 'c@example.com'})
     assert rv.status_code == 200
-    # fetch token from DB
-    from app.models import User
-    user = User.query.filter_by(email='c@example.com').first()
-    assert user.reset_token is not None
-    token = user.reset_token
+    token = sent_token(client, 'Password reset')
     # reset password
     rv = client.post('/auth/reset-password', json={'token': token, 'password': 'newpass'})
     assert rv.status_code == 200
+    # the token is single use
+    rv = client.post('/auth/reset-password', json={'token': token, 'password': 'other'})
+    assert rv.status_code == 400
     # login with new password
     rv = client.post('/auth/login', json={'email': 'c@example.com', 'password': 'newpass'})
     assert rv.status_code == 200
@@ -43,10 +59,7 @@ def test_forgot_and_reset_flow(client):
 
 def test_verify_and_refresh_flow(client):
     register_user(client, 'd@example.com')
-    user = User.query.filter_by(email='d@example.com').first()
-    # ensure verification token set
-    assert user.verification_token is not None
-    token = user.verification_token
+    token = sent_token(client, 'Verify your email')
     rv = client.post('/auth/verify-email', json={'token': token})
     assert rv.status_code == 200
     # login and refresh
@@ -55,3 +68,27 @@ def test_verify_and_refresh_flow(client):
     refresh = data['refresh_token']
     rv = client.post('/auth/refresh-token', json={'refresh_token': refresh})
     assert rv.status_code == 200
+    # rotation: the old refresh token is gone, a second device's session is unaffected
+    rv = client.post('/auth/refresh-token', json={'refresh_token': refresh})
+    assert rv.status_code == 401
+    other = client.post('/auth/login', json={'email': 'd@example.com', 'password': 'pass123'}).get_json()
+    rv = client.post('/auth/refresh-token', json={'refresh_token': other['refresh_token']})
+    assert rv.status_code == 200
+
+
+def test_sweep_deletes_expired_tokens(client):
+    from datetime import datetime, timedelta, timezone
+    from app import auth_tokens
+    from app.models import AuthToken
+
+    register_user(client, 'e@example.com')
+    with client.application.app_context():
+        user = User.query.filter_by(email='e@example.com').first()
+        for _ in range(5):
+            auth_tokens.issue(user.user_id, auth_tokens.REFRESH)
+        db.session.commit()
+        later = datetime.now(timezone.utc) + timedelta(days=3)
+        # the verification token (2 days) has expired by then, the refresh tokens have not
+        assert auth_tokens.sweep(batch_size=2, now=later) == 1
+        assert AuthToken.query.count() == 5
+        assert auth_tokens.sweep(batch_size=2, now=later + timedelta(days=30)) == 5
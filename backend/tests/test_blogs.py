@@ -1,4 +1,5 @@
 import json
+import datetime
 from app.models import User, BlogPost
 
 
@@ -37,3 +38,119 @@ def test_moderate_blog_reject(client, app, db_session):
     assert rv2.status_code == 200
     j = rv2.get_json()
     assert j['status'] == 'rejected'
+
+
+def test_blog_views_are_buffered_until_flush(client, app, db_session):
+    post = BlogPost(author_id=1, title='Counted', content='x', status='published', views_count=0)
+    db_session.add(post)
+    db_session.commit()
+    post_id = post.post_id
+
+    for expected in (1, 2, 3):
+        rv = client.get(f'/blogs/{post_id}')
+        assert rv.status_code == 200
+        assert rv.get_json()['views'] == expected
+
+    # nothing has been written yet; the read path is SELECT-only
+    db_session.expire_all()
+    assert BlogPost.query.get(post_id).views_count == 0
+
+    assert app.view_counter.flush() == 1
+    db_session.expire_all()
+    assert BlogPost.query.get(post_id).views_count == 3
+    assert app.view_counter.pending(post_id) == 0
+    assert app.view_counter.flush() == 0
+
+
+def test_list_blogs_keyset_pagination(client, app, db_session):
+    created = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+    posts = [BlogPost(author_id=1, title=f'P{i}', content='long body', status='published', created_at=created)
+             for i in range(5)]
+    posts.append(BlogPost(author_id=1, title='Draft', content='x', status='draft', created_at=created))
+    db_session.add_all(posts)
+    db_session.commit()
+
+    seen = []
+    cursor = None
+    while True:
+        url = '/blogs/?limit=2' + (f'&cursor={cursor}' if cursor else '')
+        data = client.get(url).get_json()
+        assert len(data['items']) <= 2
+        assert all('content' not in item for item in data['items'])
+        seen.extend(item['post_id'] for item in data['items'])
+        cursor = data['next_cursor']
+        if not cursor:
+            break
+    # identical created_at values are disambiguated by post_id, newest first
+    assert seen == sorted((p.post_id for p in posts[:5]), reverse=True)
+
+    legacy = client.get('/blogs/?legacy=1').get_json()
+    assert isinstance(legacy, list) and len(legacy) == 5
+    assert client.get('/blogs/?cursor=garbage').status_code == 400
+
+
+def test_search_index_follows_publication(client, app, db_session):
+    user = User(name='Searcher', email='search@example.com', password_hash='x')
+    db_session.add(user)
+    db_session.commit()
+
+    ids = []
+    for title, content in [
+        ('Coding bootcamp diary', 'Learning python and python tooling every day'),
+        ('Farming in Kenya', 'Soil, rain and a little python scripting for irrigation'),
+        ('Poetry', 'Nothing technical here'),
+    ]:
+        rv = client.post('/blogs/', json={'author_id': user.user_id, 'title': title, 'content': content})
+        ids.append(rv.get_json()['post_id'])
+
+    # unpublished posts are not searchable
+    assert client.get('/blogs/search?q=python').get_json()['items'] == []
+
+    for post_id in ids:
+        client.post(f'/blogs/{post_id}/publish')
+    items = client.get('/blogs/search?q=python').get_json()['items']
+    assert [i['post_id'] for i in items] == ids[:2]
+
+    client.post(f'/blogs/{ids[0]}/moderate', json={'action': 'reject'})
+    items = client.get('/blogs/search?q=python').get_json()['items']
+    assert [i['post_id'] for i in items] == [ids[1]]
+
+    from app import blog_search
+    assert blog_search.rebuild_index(batch_size=1) == 2
+    items = client.get('/blogs/search?q=Kenya farming').get_json()['items']
+    assert [i['post_id'] for i in items] == [ids[1]]
+    assert client.get('/blogs/search').status_code == 400
+
+
+def test_tags_are_normalized_and_counted(client, app, db_session):
+    user = User(name='Tagger', email='tags@example.com', password_hash='x')
+    db_session.add(user)
+    db_session.commit()
+
+    a = client.post('/blogs/', json={'author_id': user.user_id, 'title': 'A', 'content': 'x', 'tags': 'Python, Career ,python'}).get_json()['post_id']
+    b = client.post('/blogs/', json={'author_id': user.user_id, 'title': 'B', 'content': 'x', 'tags': ['career']}).get_json()['post_id']
+    assert BlogPost.query.get(a).tags == 'python,career'
+    # pending posts are not counted
+    assert client.get('/blogs/tags').get_json() == []
+
+    client.post(f'/blogs/{a}/publish')
+    client.post(f'/blogs/{b}/moderate', json={'action': 'approve'})
+    assert client.get('/blogs/tags').get_json() == [{'tag': 'career', 'count': 2}, {'tag': 'python', 'count': 1}]
+    items = client.get('/blogs/?tag=Python').get_json()['items']
+    assert [i['post_id'] for i in items] == [a]
+
+    client.post(f'/blogs/{a}/moderate', json={'action': 'reject'})
+    assert client.get('/blogs/tags').get_json() == [{'tag': 'career', 'count': 1}]
+
+
+def test_tag_backfill_from_legacy_column(client, app, db_session):
+    from app import blog_tags
+    db_session.add_all([
+        BlogPost(author_id=1, title='Old', content='x', status='published', tags='Health,  Girls'),
+        BlogPost(author_id=1, title='Older', content='x', status='draft', tags='health'),
+    ])
+    db_session.commit()
+    assert blog_tags.backfill(batch_size=1) == 2
+    # running it again is a no-op
+    assert blog_tags.backfill(batch_size=1) == 2
+    assert blog_tags.tag_cloud() == [{'tag': 'girls', 'count': 1}, {'tag': 'health', 'count': 1}]
@@ -0,0 +1,71 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+from flask_mail import Mail, email_dispatched
+
+from app import digests
+from app.models import OutboxMessage, PendingEmail, User
+
+
+def test_digest_users_get_one_email_per_period(client, app, db_session):
+    hourly = User(name='Hana', email='hourly@example.com', password_hash='x', email_digest='hourly')
+    instant = User(name='Ivo', email='instant@example.com', password_hash='x')
+    db_session.add_all([hourly, instant])
+    db_session.commit()
+
+    with app.test_request_context():
+        for user in (hourly, instant):
+            digests.notify_email(user, 'Payment received', 'Thanks for your payment.')
+            digests.notify_email(user, template_name='blog_published.txt',
+                                 template_context={'name': user.name, 'title': 'My Story', 'published_at': datetime(2026, 10, 17)})
+        db_session.commit()
+    # the instant user's emails were written to the outbox by that commit, as one task
+    (task,) = OutboxMessage.query.all()
+    assert [item['to'] for item in json.loads(task.args)[0]] == ['instant@example.com'] * 2
+    assert PendingEmail.query.filter_by(user_id=hourly.user_id).count() == 2
+
+    app.config.update(MAIL_SUPPRESS_SEND=True, MAIL_DEFAULT_SENDER='noreply@example.com')
+    mail = Mail().init_app(app)
+    sent = []
+    now = datetime.now(timezone.utc)
+    with email_dispatched.connected_to(lambda message, app: sent.append(message)):
+        assert digests.compact(now=now, mail=mail)['sent'] == 0  # not an hour old yet
+        stats = digests.compact(now=now + timedelta(minutes=61), mail=mail)
+    assert stats == {'users': 1, 'events': 2, 'sent': 1, 'connections': 1}
+    assert [m.recipients for m in sent] == [['hourly@example.com']]
+    assert sent[0].subject == 'Your hourly update from Girls I Save (2 new)'
+    assert 'Payment received' in sent[0].body and 'My Story' in sent[0].body
+    assert PendingEmail.query.count() == 0
+
+
+def test_overlapping_digest_runs_send_once(client, app, db_session):
+    user = User(name='Olga', email='overlap@example.com', password_hash='x', email_digest='hourly')
+    db_session.add(user)
+    db_session.commit()
+    digests.notify_email(user, 'Payment received', 'Thanks.')
+    db_session.commit()
+
+    app.config.update(MAIL_SUPPRESS_SEND=True, MAIL_DEFAULT_SENDER='noreply@example.com')
+    mail = Mail().init_app(app)
+    sent = []
+    later = datetime.now(timezone.utc) + timedelta(minutes=61)
+    # another run leased the event and is still sending it
+    token = digests.claim([user.user_id], timedelta(seconds=600), later)
+    with email_dispatched.connected_to(lambda message, app: sent.append(message)):
+        assert digests.compact(now=later, mail=mail)['sent'] == 0
+        assert digests.build_digests([user.user_id], token)  # still the other run's
+        # that run died: once the lease is over the event goes out, once
+        assert digests.compact(now=later + timedelta(seconds=601), mail=mail)['sent'] == 1
+        assert digests.compact(now=later + timedelta(seconds=1300), mail=mail)['sent'] == 0
+    assert len(sent) == 1
+    assert PendingEmail.query.count() == 0
+
+
+def test_digest_preference_on_profile(client, app, db_session, auth_headers):
+    user = User(name='Pref', email='pref@example.com', password_hash='x')
+    db_session.add(user)
+    db_session.commit()
+    headers = auth_headers(user.user_id)
+    assert client.put('/users/me', json={'email_digest': 'weekly'}, headers=headers).status_code == 400
+    assert client.put('/users/me', json={'email_digest': 'daily'}, headers=headers).status_code == 200
+    assert client.get(f'/users/{user.user_id}').get_json()['email_digest'] == 'daily'
@@ -18,3 +18,22 @@ def test_render_blog_published():
     assert result.get('subject') == 'Your blog post is live'
     assert 'Bob' in result.get('text', '')
     assert 'My Story' in result.get('text', '')
+
+
+def test_templates_are_compiled_once_unless_auto_reload(tmp_path):
+    from app import email_templates
+    (tmp_path / 'hello.txt').write_text('Subject: Hi\n\nHello {{ name }}')
+    try:
+        email_templates.configure(cache_dir=str(tmp_path / 'cache'), template_dir=tmp_path)
+        assert email_templates.preload() == 1
+        assert email_templates.render_email_template('hello', {'name': 'Ann'}) == {'subject': 'Hi', 'text': 'Hello Ann', 'html': None}
+        assert list((tmp_path / 'cache').iterdir())  # bytecode written to disk
+        (tmp_path / 'hello.txt').write_text('Subject: Changed\n\nBye {{ name }}')
+        assert email_templates.render_email_template('hello', {'name': 'Ann'})['text'] == 'Hello Ann'
+
+        email_templates.configure(auto_reload=True, cache_dir=str(tmp_path / 'cache'), template_dir=tmp_path)
+        assert email_templates.render_email_template('hello', {'name': 'Ann'})['text'] == 'Bye Ann'
+        (tmp_path / 'hello.html').write_text('<p>{{ name }}</p>')
+        assert email_templates.render_email_template('hello', {'name': '<b>'})['html'] == '<p>&lt;b&gt;</p>'
+    finally:
+        email_templates.configure()
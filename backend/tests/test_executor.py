@@ -0,0 +1,95 @@
+import threading
+
+import pytest
+
+from app.executor import ExecutorBusy, TaskExecutor, backoff_interval
+from app.models import User
+
+
+def test_tasks_run_off_the_calling_thread_and_drain_on_shutdown(app):
+    executor = TaskExecutor(app, workers=2)
+    seen = []
+
+    @executor.task(name='app.tasks.record')
+    def record(value):
+        seen.append((value, threading.current_thread().name))
+
+    for value in range(5):
+        executor.send_task('app.tasks.record', args=[value])
+    assert executor.shutdown(timeout=5) == 0
+    assert sorted(v for v, _ in seen) == list(range(5))
+    assert all(name.startswith('task-executor-') for _, name in seen)
+    assert executor.stats()['completed'] == 5
+    with pytest.raises(ExecutorBusy):
+        executor.send_task('app.tasks.record', args=[6])
+
+
+def test_retries_follow_the_task_options(app):
+    executor = TaskExecutor(app, workers=1)
+    calls = []
+    done = threading.Event()
+
+    @executor.task(name='app.tasks.flaky', bind=True, autoretry_for=(ConnectionError,),
+                   retry_kwargs={'max_retries': 2, 'countdown': 0})
+    def flaky(self, n):
+        calls.append((n, self.request.retries))
+        if self.request.retries < 2:
+            raise ConnectionError('try again')
+        done.set()
+
+    @executor.task(name='app.tasks.partial', bind=True, max_retries=1)
+    def partial(self, items):
+        calls.append((items, self.request.retries))
+        if len(items) > 1:
+            raise self.retry(args=[items[1:]], countdown=0)
+
+    executor.send_task('app.tasks.flaky', args=[1])
+    executor.send_task('app.tasks.partial', args=[['a', 'b', 'c']])
+    assert done.wait(5)
+    executor.shutdown(timeout=5)
+    assert [c for c in calls if c[0] == 1] == [(1, 0), (1, 1), (1, 2)]
+    # max_retries=1: the second retry is refused and the task counted as failed
+    assert [c for c in calls if c[0] != 1] == [(['a', 'b', 'c'], 0), (['b', 'c'], 1)]
+    stats = executor.stats()
+    assert stats['retried'] == 3 and stats['completed'] == 1 and stats['failed'] == 1
+
+
+def test_backoff_matches_celery():
+    assert [backoff_interval(1, r, 600, full_jitter=False) for r in (0, 1, 5, 10)] == [1, 2, 32, 600]
+    assert 0 <= backoff_interval(1, 3, 600) <= 8
+
+
+def test_queue_is_bounded_and_reported(app, client, db_session, auth_headers):
+    admin = User(name='Ops', email='ops@example.com', password_hash='x', role='admin')
+    db_session.add(admin)
+    db_session.commit()
+    executor = TaskExecutor(app, workers=1, max_queue=2)
+    release = threading.Event()
+    started = threading.Event()
+
+    @executor.task(name='app.tasks.block')
+    def block():
+        started.set()
+        release.wait(5)
+
+    executor.send_task('app.tasks.block')
+    assert started.wait(5)
+    executor.send_task('app.tasks.block')
+    executor.send_task('app.tasks.block', countdown=60)
+    with pytest.raises(ExecutorBusy):
+        executor.send_task('app.tasks.block')
+
+    app.celery = executor
+    resp = client.get('/admin/tasks', headers=auth_headers(admin.user_id, role='admin'))
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert (body['queued'], body['scheduled'], body['active'], body['rejected']) == (1, 1, 1, 1)
+
+    release.set()
+    assert executor.shutdown(timeout=5) == 0
+    assert executor.stats()['completed'] == 2  # the retry-style delayed task was dropped
+
+
+def test_app_without_broker_runs_registered_tasks(app):
+    assert 'app.tasks.send_email' in app.celery.tasks
+    assert app.celery.tasks['app.tasks.send_email'].max_retries == 5
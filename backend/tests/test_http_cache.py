@@ -0,0 +1,95 @@
+from app.models import User, Program, BlogPost, Mentor
+
+
+def test_program_etag_revalidation(client, app, db_session):
+    prog = Program(title='Coding Club', category='tech', status='active')
+    db_session.add(prog)
+    db_session.commit()
+
+    rv = client.get('/programs/')
+    assert rv.status_code == 200
+    etag = rv.headers['ETag']
+    assert not etag.startswith('W/')
+    assert 'max-age' in rv.headers['Cache-Control']
+
+    rv = client.get('/programs/', headers={'If-None-Match': etag})
+    assert rv.status_code == 304
+    assert rv.data == b''
+
+    # any program change bumps the version and invalidates the validator
+    prog.title = 'Coding Club 2'
+    db_session.commit()
+    rv = client.get('/programs/', headers={'If-None-Match': etag})
+    assert rv.status_code == 200
+    assert rv.headers['ETag'] != etag
+    assert rv.get_json()[0]['title'] == 'Coding Club 2'
+
+
+def test_blog_validators_invalidated_by_publish(client, app, db_session):
+    user = User(name='Author', email='etag@example.com', password_hash='x')
+    db_session.add(user)
+    db_session.commit()
+    post_id = client.post('/blogs/', json={'author_id': user.user_id, 'title': 'T', 'content': 'C'}).get_json()['post_id']
+
+    rv = client.get('/blogs/')
+    etag = rv.headers['ETag']
+    assert etag.startswith('W/')
+    assert client.get('/blogs/', headers={'If-None-Match': etag}).status_code == 304
+
+    client.post(f'/blogs/{post_id}/publish')
+    rv = client.get('/blogs/', headers={'If-None-Match': etag})
+    assert rv.status_code == 200
+    assert [i['post_id'] for i in rv.get_json()['items']] == [post_id]
+
+    # a revalidated post read still counts as a view
+    etag = client.get(f'/blogs/{post_id}').headers['ETag']
+    assert client.get(f'/blogs/{post_id}', headers={'If-None-Match': etag}).status_code == 304
+    assert app.view_counter.pending(post_id) == 2
+
+
+def test_mentor_directory_is_private_and_versioned(client, app, db_session, auth_headers):
+    user = User(name='Mentor', email='m-etag@example.com', password_hash='x')
+    db_session.add(user)
+    db_session.commit()
+    db_session.add(Mentor(mentor_id=user.user_id, expertise_areas='math'))
+    db_session.commit()
+    headers = auth_headers(user.user_id, role='mentor')
+
+    assert client.get('/mentors/list').status_code == 401
+    rv = client.get('/mentors/list', headers=headers)
+    assert rv.status_code == 200
+    assert rv.headers['Cache-Control'].startswith('private')
+    etag = rv.headers['ETag']
+    assert client.get('/mentors/list', headers=dict(headers, **{'If-None-Match': etag})).status_code == 304
+
+    # login bookkeeping does not invalidate the directory, profile edits do
+    user.last_login = user.date_joined
+    db_session.commit()
+    assert client.get('/mentors/list', headers=dict(headers, **{'If-None-Match': etag})).status_code == 304
+    user.bio = 'new bio'
+    db_session.commit()
+    assert client.get('/mentors/list', headers=dict(headers, **{'If-None-Match': etag})).status_code == 200
+
+
+def test_mentor_version_ignores_users_outside_the_directory(app, db_session):
+    from app.content_versions import bump, get_version
+
+    student = User(name='Plain', email='plain@example.com', password_hash='x')
+    db_session.add(student)
+    db_session.commit()
+    assert get_version(db_session, 'mentors') == 0
+    student.name = 'Still plain'
+    db_session.commit()
+    assert get_version(db_session, 'mentors') == 0
+
+    db_session.add(Mentor(mentor_id=student.user_id, expertise_areas='math'))
+    db_session.commit()
+    assert get_version(db_session, 'mentors') == 1
+    student.name = 'Now listed'
+    db_session.commit()
+    assert get_version(db_session, 'mentors') == 2
+
+    # first bump of a namespace is an upsert, not update-then-insert
+    connection = db_session.connection()
+    assert [bump(connection, 'fresh'), bump(connection, 'fresh')] == [1, 2]
+    db_session.rollback()
@@ -0,0 +1,127 @@
+import socketserver
+import threading
+
+from flask import Response
+from flask_mail import Mail
+
+from app import db, mailer, outbox
+from app.models import User
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """A minimal SMTP server: records messages, refuses recipients listed in ``replies``."""
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, replies=None):
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+        self.replies = replies or {}
+        self.connections = 0
+        self.messages = []
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply('220 stand-in ready')
+        rcpts = []
+        while True:
+            line = self.rfile.readline().decode().strip()
+            verb = line[:4].upper()
+            if not line or verb == 'QUIT':
+                self.reply('221 bye')
+                return
+            if verb in ('EHLO', 'HELO'):
+                self.reply('250 stand-in')
+            elif verb == 'RCPT':
+                address = line.split(':', 1)[1].strip('<> ')
+                code = server.replies.get(address)
+                if code:
+                    self.reply(f'{code} refused')
+                else:
+                    rcpts.append(address)
+                    self.reply('250 ok')
+            elif verb == 'DATA':
+                self.reply('354 go ahead')
+                data = []
+                while True:
+                    chunk = self.rfile.readline()
+                    if chunk in (b'.\r\n', b'.\n', b''):
+                        break
+                    data.append(chunk)
+                server.messages.append((rcpts, b''.join(data).decode()))
+                rcpts = []
+                self.reply('250 queued')
+            elif verb == 'RSET':
+                rcpts = []
+                self.reply('250 ok')
+            else:
+                self.reply('250 ok')
+
+
+def test_send_bulk_uses_one_connection_and_tracks_recipients(app):
+    server = SMTPStandIn({'gone@example.com': 550, 'busy@example.com': 451})
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        app.config.update(MAIL_SERVER='127.0.0.1', MAIL_PORT=server.server_address[1],
+                          MAIL_DEFAULT_SENDER='noreply@example.com', MAIL_SUPPRESS_SEND=False)
+        mail = Mail().init_app(app)
+        items = [
+            mailer.email('a@example.com', 'Hello', 'first'),
+            mailer.email('gone@example.com', 'Hello', 'refused for good'),
+            mailer.email('busy@example.com', 'Hello', 'refused for now'),
+            mailer.email('b@example.com', template_name='blog_published.txt',
+                         template_context={'name': 'Bob', 'title': 'My Story', 'published_at': '2026-10-17'}),
+            mailer.email('c@example.com', 'Hello', 'last'),
+        ]
+        with app.app_context():
+            result = mailer.send_bulk(items, mail)
+        assert result['sent'] == 3
+        assert [item['to'] for item, _ in result['failed']] == ['gone@example.com']
+        assert [item['to'] for item in result['retry']] == ['busy@example.com']
+        assert server.connections == 1
+        assert [rcpts for rcpts, _ in server.messages] == [['a@example.com'], ['b@example.com'], ['c@example.com']]
+        assert 'Your blog post is live' in server.messages[1][1]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_emails_queued_during_a_request_go_out_as_one_task(app):
+    calls = []
+
+    class RecordingCelery:
+        def send_task(self, name, args=(), **kwargs):
+            calls.append((name, args))
+
+    app.celery = RecordingCelery()
+    with app.test_request_context():
+        mailer.queue_email('a@example.com', 'One', 'body')
+        mailer.queue_email('b@example.com', template_name='blog_moderation.txt', template_context={'name': 'B'})
+        app.process_response(Response())
+        assert calls == []  # written to the outbox, published by the relay
+        assert outbox.drain() == 1
+    assert len(calls) == 1
+    name, (items,) = calls[0]
+    assert name == mailer.BULK_TASK
+    assert [item['to'] for item in items] == ['a@example.com', 'b@example.com']
+
+    with app.test_request_context():
+        mailer.queue_email('c@example.com', 'Dropped', 'body')
+        app.process_response(Response(status=500))
+        assert outbox.drain() == 0
+    assert len(calls) == 1
+
+    # a handler's leftovers are not committed along with its emails
+    with app.test_request_context():
+        db.session.add(User(name='Leftover', email='leftover@example.com', password_hash='x'))
+        mailer.queue_email('d@example.com', 'Still sent', 'body')
+        app.process_response(Response(status=400))
+        db.session.rollback()
+        assert outbox.drain() == 1
+        assert User.query.filter_by(email='leftover@example.com').count() == 0
+    assert len(calls) == 2
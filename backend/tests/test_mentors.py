@@ -48,3 +48,149 @@ def test_mentor_apply_and_approve():
             # Mentor profile created
             m = Mentor.query.filter_by(mentor_id=user.user_id).first()
             assert m is not None
+
+
+def test_mentor_directory_cache(client, app, db_session, auth_headers):
+    from sqlalchemy import event
+    from app.content_versions import bump
+
+    users = [User(name=f'M{i}', email=f'dir{i}@example.com', password_hash='x') for i in range(4)]
+    db_session.add_all(users)
+    db_session.commit()
+    db_session.add_all([
+        Mentor(mentor_id=u.user_id, expertise_areas='math,physics', availability_status='available' if i % 2 == 0 else 'busy')
+        for i, u in enumerate(users)
+    ])
+    db_session.commit()
+    headers = auth_headers(users[0].user_id)
+    app.token_versions.publish(users[0].user_id, 0)  # keep the revocation lookup out of the count
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        data = client.get('/mentors/list', headers=headers).get_json()
+        first_load = len(statements)
+        assert [m['name'] for m in data] == ['M0', 'M1', 'M2', 'M3']
+        assert data[0]['expertise_areas'] == ['math', 'physics']
+        # one joined query regardless of the number of mentors, then cache hits
+        assert sum('JOIN users' in s for s in statements) == 1
+        statements.clear()
+        page = client.get('/mentors/list?availability=available&limit=1', headers=headers).get_json()
+        assert [m['name'] for m in page['items']] == ['M0']
+        assert page['total'] == 2 and page['next_offset'] == 1
+        assert not any('JOIN users' in s for s in statements)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    assert first_load <= 3
+
+    # a local profile edit patches only that mentor
+    users[1].name = 'Renamed'
+    db_session.commit()
+    directory = app.mentor_directory
+    data = client.get('/mentors/list', headers=headers).get_json()
+    assert data[1]['name'] == 'Renamed'
+
+    # a change committed elsewhere (another worker) forces a full reload
+    with db.engine.begin() as conn:
+        conn.execute(Mentor.__table__.update().where(Mentor.mentor_id == users[2].user_id).values(availability_status='busy'))
+        version = bump(conn, 'mentors')
+    data = client.get('/mentors/list?availability=available', headers=headers).get_json()
+    assert [m['name'] for m in data] == ['M0']
+    assert directory.version == version
+
+
+def test_mentor_search_ranking_and_filters(client, app, db_session, auth_headers):
+    from app.models import MentorshipSession
+    specs = [
+        ('Ada', 'Data Science, Python', 'Nairobi', 4.8, 40),
+        ('Bea', 'python', 'Mombasa', 4.9, 2),
+        ('Cleo', 'Design', 'Nairobi', 5.0, 90),
+    ]
+    users = [User(name=name, email=f'{name}@example.com', password_hash='x', region=region) for name, _, region, _, _ in specs]
+    db_session.add_all(users)
+    db_session.commit()
+    db_session.add_all([
+        Mentor(mentor_id=u.user_id, expertise_areas=areas, rating=rating, sessions_completed=done)
+        for u, (_, areas, _, rating, done) in zip(users, specs)
+    ])
+    db_session.commit()
+    headers = auth_headers(users[0].user_id)
+
+    items = client.get('/mentors/search?expertise=python', headers=headers).get_json()['items']
+    # experience outweighs a slightly higher rating
+    assert [m['name'] for m in items] == ['Ada', 'Bea']
+    items = client.get('/mentors/search?expertise=science,python', headers=headers).get_json()['items']
+    assert items[0]['name'] == 'Ada' and items[0]['matched_terms'] == 2
+    items = client.get('/mentors/search?expertise=python&region=mombasa', headers=headers).get_json()['items']
+    assert [m['name'] for m in items] == ['Bea']
+    items = client.get('/mentors/search?region=Nairobi', headers=headers).get_json()['items']
+    assert [m['name'] for m in items] == ['Cleo', 'Ada']
+
+    # the index follows mentor changes incrementally
+    mentor = Mentor.query.get(users[2].user_id)
+    mentor.expertise_areas = 'design,python'
+    mentor.availability_status = 'busy'
+    db_session.commit()
+    items = client.get('/mentors/search?expertise=python&availability=busy', headers=headers).get_json()['items']
+    assert [m['name'] for m in items] == ['Cleo']
+
+    # booked sessions count as load and push a mentor down, without invalidating the directory
+    from app.content_versions import get_version
+    version = get_version(db_session, 'mentors')
+    before = client.get('/mentors/search?expertise=python', headers=headers).get_json()['items']
+    db_session.add_all([MentorshipSession(mentor_id=users[0].user_id, mentee_id=users[1].user_id, status='pending')
+                        for _ in range(30)])
+    db_session.commit()
+    assert get_version(db_session, 'mentors') == version
+    app.mentor_directory.load_ttl = 0
+    after = client.get('/mentors/search?expertise=python', headers=headers).get_json()['items']
+    ada = lambda items: next(m['score'] for m in items if m['name'] == 'Ada')
+    assert ada(after) < ada(before)
+    assert client.get('/mentors/search').status_code == 401
+
+
+def test_application_queue_and_bulk_decide(client, app, db_session, auth_headers):
+    from datetime import datetime, timedelta, timezone
+    from app.models import AuditLog, Notification
+
+    admin = User(name='Admin', email='queue-admin@example.com', password_hash='x', role='admin')
+    applicants = [User(name=f'A{i}', email=f'applicant{i}@example.com', password_hash='x') for i in range(5)]
+    db_session.add_all([admin] + applicants)
+    db_session.commit()
+    base = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    apps = [MentorApplication(user_id=u.user_id, expertise='math', documents='["http://example.com/cv.pdf"]',
+                              status='pending', submitted_at=base + timedelta(minutes=i % 3))
+            for i, u in enumerate(applicants)]
+    db_session.add_all(apps)
+    db_session.commit()
+    apps[4].status = 'rejected'
+    db_session.commit()
+    headers = auth_headers(admin.user_id, role='admin')
+
+    seen = []
+    cursor = None
+    while True:
+        rv = client.get('/mentors/applications', headers=headers, query_string={'limit': 2, **({'cursor': cursor} if cursor else {})})
+        body = rv.get_json()
+        seen.extend(body['items'])
+        cursor = body['next_cursor']
+        if not cursor:
+            break
+    assert [a['id'] for a in seen] == [apps[i].id for i in (0, 3, 1, 2)]
+    assert seen[0]['email'] == 'applicant0@example.com' and 'documents' not in seen[0]
+
+    rv = client.post('/mentors/applications/decide', headers=headers,
+                     json={'ids': [apps[0].id, apps[1].id, apps[4].id, 999999], 'action': 'approve', 'note': 'ok'})
+    assert rv.status_code == 200
+    body = rv.get_json()
+    assert body['decided'] == sorted([apps[0].id, apps[1].id])
+    assert body['skipped'] == sorted([apps[4].id, 999999])
+
+    db_session.expire_all()
+    assert {m.mentor_id for m in Mentor.query.all()} == {applicants[0].user_id, applicants[1].user_id}
+    assert AuditLog.query.filter_by(action='mentor_application_approved').count() == 2
+    assert Notification.query.filter_by(user_id=applicants[0].user_id, title='Application approved').count() == 1
+    assert MentorApplication.query.get(apps[4].id).status == 'rejected'
+    rv = client.get('/mentors/applications', headers=headers, query_string={'status': 'approved'})
+    assert len(rv.get_json()['items']) == 2
@@ -0,0 +1,269 @@
+import json
+import queue
+from datetime import datetime, timedelta, timezone
+
+from app import db, inbox
+from app.models import Notification, NotificationCounter, NotificationReceipt, User
+from app.notification_stream import RedisBroker, stream
+
+
+def _user(db_session, email='inbox@example.com'):
+    user = User(name='Inbox', email=email, password_hash='x')
+    db_session.add(user)
+    db_session.commit()
+    return user.user_id
+
+
+def test_feed_pagination_and_unread_counter(client, app, db_session, auth_headers):
+    user_id = _user(db_session)
+    base = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    db_session.add_all([
+        Notification(user_id=user_id, title=f'n{i}', message='m', type='system', created_at=base + timedelta(minutes=i // 2))
+        for i in range(5)
+    ])
+    db_session.commit()
+    headers = auth_headers(user_id)
+    assert client.get(f'/notifications/user/{user_id}/unread-count', headers=headers).get_json()['unread'] == 5
+
+    titles, cursor = [], None
+    while True:
+        body = client.get(f'/notifications/user/{user_id}', headers=headers,
+                          query_string={'limit': 2, **({'cursor': cursor} if cursor else {})}).get_json()
+        titles += [n['title'] for n in body['items']]
+        cursor = body['next_cursor']
+        if not cursor:
+            break
+    assert titles == ['n4', 'n3', 'n2', 'n1', 'n0']
+
+    first = Notification.query.filter_by(user_id=user_id, title='n0').first()
+    client.post(f'/notifications/{first.notification_id}/read')
+    client.post(f'/notifications/{first.notification_id}/read')  # marking twice counts once
+    db_session.delete(Notification.query.filter_by(user_id=user_id, title='n4').first())
+    db_session.commit()
+    inbox.add_many([{'user_id': user_id, 'title': 'bulk', 'message': 'm', 'type': 'system'}])
+    db_session.commit()
+    assert client.get(f'/notifications/user/{user_id}/unread-count', headers=headers).get_json()['unread'] == 4
+
+    # the counter agrees with a recount from the table
+    db.session.execute(NotificationCounter.__table__.update().values(unread=99))
+    inbox.recount()
+    assert inbox.unread_count(user_id) == 4
+    assert client.get(f'/notifications/user/{user_id}?cursor=bogus', headers=headers).status_code == 400
+
+
+def test_feed_and_unread_count_are_private(client, app, db_session, auth_headers):
+    user_id = _user(db_session, 'private@example.com')
+    other_id = _user(db_session, 'private-other@example.com')
+    inbox.broadcast('User s@x applied', 'm', audience='admin')
+    db_session.commit()
+    for path in (f'/notifications/user/{user_id}', f'/notifications/user/{user_id}/unread-count',
+                 f'/notifications/user/{user_id}?legacy=1'):
+        assert client.get(path).status_code == 401
+        assert client.get(path, headers=auth_headers(other_id)).status_code == 403
+        assert client.get(path, headers=auth_headers(user_id)).status_code == 200
+        assert client.get(path, headers=auth_headers(other_id, role='admin')).status_code == 200
+
+
+def test_bulk_mark_read(client, app, db_session, auth_headers):
+    user_id = _user(db_session, 'bulk-read@example.com')
+    other_id = _user(db_session, 'bulk-other@example.com')
+    base = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    inbox.add_many([{'user_id': user_id, 'title': f'n{i}', 'message': 'm', 'type': 'system',
+                     'created_at': base + timedelta(minutes=i)} for i in range(6)])
+    inbox.add_many([{'user_id': other_id, 'title': 'x', 'message': 'm', 'type': 'system', 'created_at': base}])
+    db_session.commit()
+    ids = [n.notification_id for n in Notification.query.filter_by(user_id=user_id).order_by(Notification.created_at)]
+    other = Notification.query.filter_by(user_id=other_id).first().notification_id
+
+    assert client.post('/notifications/read', json={'user_id': user_id, 'ids': ids}).status_code == 401
+    rv = client.post('/notifications/read', json={'user_id': user_id, 'ids': ids}, headers=auth_headers(other_id))
+    assert rv.status_code == 403
+    headers = auth_headers(user_id)
+    rv = client.post('/notifications/read', json={'ids': [ids[0], ids[1], other]}, headers=headers)
+    assert rv.get_json() == {'marked': 2, 'unread': 4}
+    # the cursor of a page (n5, n4) covers its last item and everything older
+    page = client.get(f'/notifications/user/{user_id}', query_string={'limit': 2}, headers=headers).get_json()
+    rv = client.post('/notifications/read', json={'all_before': page['next_cursor']}, headers=headers)
+    assert rv.get_json() == {'marked': 3, 'unread': 1}
+    # admins may act on another user's inbox
+    rv = client.post('/notifications/read', json={'user_id': user_id, 'all_before': '2031-01-01T00:00:00Z'},
+                     headers=auth_headers(other_id, role='admin'))
+    assert rv.get_json() == {'marked': 1, 'unread': 0}
+    assert inbox.unread_count(other_id) == 1
+    assert client.post('/notifications/read', json={}, headers=headers).status_code == 400
+
+
+def test_broadcasts_are_stored_once_and_read_per_user(client, app, db_session, auth_headers):
+    student = _user(db_session, 'bc-student@example.com')
+    reader = _user(db_session, 'bc-reader@example.com')
+    admin = User(name='Admin', email='bc-admin@example.com', password_hash='x', role='admin')
+    db_session.add(admin)
+    db_session.commit()
+    admin_id = admin.user_id
+
+    db_session.add(Notification(user_id=student, title='personal', message='m', type='system'))
+    db_session.commit()
+    before = Notification.query.count()
+    rv = client.post('/notifications/broadcast', json={'title': 'maintenance', 'message': 'tonight'},
+                     headers=auth_headers(admin_id, role='admin'))
+    assert rv.status_code == 201
+    broadcast_id = rv.get_json()['notification_id']
+    inbox.broadcast('admins only', 'm', audience='admin')
+    db_session.commit()
+    assert Notification.query.count() == before + 2  # one row per broadcast, not per user
+
+    titles = [n['title'] for n in client.get(f'/notifications/user/{student}', headers=auth_headers(student)).get_json()['items']]
+    assert titles == ['maintenance', 'personal']
+    assert [n['title'] for n in inbox.feed(admin_id)[0]] == ['admins only', 'maintenance']
+    assert client.get(f'/notifications/user/{student}/unread-count', headers=auth_headers(student)).get_json()['unread'] == 2
+
+    # reading a broadcast writes that user's receipt only
+    assert client.post(f'/notifications/{broadcast_id}/read').status_code == 401
+    assert client.post(f'/notifications/{broadcast_id}/read', json={'user_id': student},
+                       headers=auth_headers(reader)).status_code == 403
+    assert client.post(f'/notifications/{broadcast_id}/read', headers=auth_headers(student)).status_code == 200
+    assert client.post(f'/notifications/{broadcast_id}/read', headers=auth_headers(student)).status_code == 200
+    assert NotificationReceipt.query.filter_by(notification_id=broadcast_id).count() == 1
+    items = client.get(f'/notifications/user/{student}', headers=auth_headers(student)).get_json()['items']
+    assert [n['is_read'] for n in items] == [True, False]
+    assert client.get(f'/notifications/user/{reader}/unread-count', headers=auth_headers(reader)).get_json()['unread'] == 1
+
+    rv = client.post('/notifications/read', json={'all_before': datetime.now(timezone.utc).isoformat()},
+                     headers=auth_headers(reader))
+    assert rv.get_json() == {'marked': 1, 'unread': 0}
+    assert client.get(f'/notifications/user/{student}/unread-count', headers=auth_headers(student)).get_json()['unread'] == 1
+    # broadcasts never touch the counters; they are counted per audience when read
+    assert {c.user_id: c.unread for c in NotificationCounter.query} == {student: 1}
+    assert inbox.unread_count(admin_id) == 2
+    inbox.recount()
+    assert {c.user_id: c.unread for c in NotificationCounter.query} == {student: 1}
+    # so a role change brings that audience's broadcasts along, without drift
+    User.query.get(reader).role = 'admin'
+    db_session.commit()
+    assert client.get(f'/notifications/user/{reader}/unread-count', headers=auth_headers(reader)).get_json()['unread'] == 1
+
+    # cursor pagination walks across both sources
+    titles, cursor = [], None
+    while True:
+        items, cursor = inbox.feed(student, 1, cursor)
+        titles += [n['title'] for n in items]
+        if not cursor:
+            break
+    assert titles == ['maintenance', 'personal']
+
+
+def _chunk(body):
+    chunk = next(body)
+    return chunk.decode('utf-8') if isinstance(chunk, bytes) else chunk
+
+
+def test_stream_pushes_committed_notifications(client, app, db_session, auth_headers):
+    user_id = _user(db_session, 'stream@example.com')
+    other_id = _user(db_session, 'stream-other@example.com')
+    db_session.add(Notification(user_id=user_id, title='missed', message='m', type='system'))
+    db_session.commit()
+    missed = Notification.query.filter_by(title='missed').first().notification_id
+    token = auth_headers(user_id)['Authorization'].split(' ', 1)[1]  # EventSource passes it as ?token=
+
+    assert client.get('/notifications/stream').status_code == 401
+    rv = client.get('/notifications/stream', query_string={'token': token},
+                    headers={'Last-Event-ID': str(missed - 1)}, buffered=False)
+    assert rv.status_code == 200 and rv.mimetype == 'text/event-stream'
+    assert rv.headers['Cache-Control'] == 'no-cache'
+    body = iter(rv.response)
+    assert _chunk(body).startswith('retry:')
+    assert f'id: {missed}' in _chunk(body)  # replayed after Last-Event-ID
+
+    db_session.add(Notification(user_id=other_id, title='not yours', message='m', type='system'))
+    db_session.add(Notification(user_id=user_id, title='live', message='m', type='system'))
+    db_session.flush()
+    assert app.notification_broker.connections() == 1
+    db_session.rollback()  # nothing is pushed for a rolled-back transaction
+    db_session.add(Notification(user_id=other_id, title='not yours', message='m', type='system'))
+    db_session.add(Notification(user_id=user_id, title='live', message='m', type='system'))
+    db_session.commit()
+    event = _chunk(body)
+    assert 'event: notification' in event
+    assert json.loads(event.split('data: ', 1)[1])['title'] == 'live'
+    inbox.broadcast('for admins', 'm', audience='admin')
+    inbox.broadcast('for everyone', 'm')
+    db_session.commit()
+    assert json.loads(_chunk(body).split('data: ', 1)[1])['title'] == 'for everyone'
+
+    # bulk inserts carry their ids too, so Last-Event-ID can resume past them
+    inbox.add_many([{'user_id': user_id, 'title': f'bulk {i}', 'message': 'm', 'type': 'system'} for i in range(2)])
+    db_session.commit()
+    pushed = [_chunk(body), _chunk(body)]
+    stored = [n.notification_id for n in Notification.query.filter(Notification.title.like('bulk %'))
+              .order_by(Notification.notification_id)]
+    assert sorted(int(e.split('id: ', 1)[1].split('\n', 1)[0]) for e in pushed) == stored
+
+    rv.close()
+    assert app.notification_broker.connections() == 0
+
+
+def test_stream_connections_are_capped(client, app, db_session, auth_headers):
+    user_id = _user(db_session, 'stream-cap@example.com')
+    token = auth_headers(user_id)['Authorization'].split(' ', 1)[1]  # EventSource passes it as ?token=
+    app.notification_broker.max_connections = 1
+    first = client.get('/notifications/stream', query_string={'token': token}, buffered=False)
+    assert first.status_code == 200
+    busy = client.get('/notifications/stream', query_string={'token': token})
+    assert busy.status_code == 503 and busy.headers['Retry-After'] == '30'
+    first.close()
+    again = client.get('/notifications/stream', query_string={'token': token}, buffered=False)
+    assert again.status_code == 200
+    again.close()
+    assert app.notification_broker.connections() == 0
+
+
+def test_stream_ends_on_deadline_with_keepalives():
+    from app.notification_stream import LocalBroker
+    now = [0.0]
+    broker = LocalBroker(max_queue=1)
+    sub = broker.subscribe(1)
+    sub.get = lambda timeout: now.__setitem__(0, now[0] + timeout)
+    chunks = list(stream(sub, keepalive=10, max_seconds=25, clock=lambda: now[0]))
+    assert chunks[1:] == [': keep-alive\n\n'] * 3
+    assert broker.connections() == 0
+
+
+class FakeRedis:
+    """Just enough of redis-py's publish / pubsub for RedisBroker, shared across clients."""
+
+    def __init__(self):
+        self.subscribers = []
+
+    def publish(self, channel, data):
+        for prefix, messages in self.subscribers:
+            if channel.startswith(prefix):
+                messages.put({'type': 'pmessage', 'channel': channel.encode(), 'data': data})
+
+    def pubsub(self):
+        redis, messages = self, queue.Queue()
+
+        class PubSub:
+            def psubscribe(self, pattern):
+                redis.subscribers.append((pattern.rstrip('*'), messages))
+
+            def get_message(self, timeout):
+                try:
+                    return messages.get(timeout=timeout)
+                except queue.Empty:
+                    return None
+
+        return PubSub()
+
+
+def test_redis_broker_fans_out_across_workers():
+    redis = FakeRedis()
+    worker_a, worker_b = RedisBroker(redis), RedisBroker(redis)
+    try:
+        sub = worker_b.subscribe(7)
+        worker_a.publish(7, {'notification_id': 1, 'title': 'hi'})
+        worker_a.publish(8, {'notification_id': 2, 'title': 'other user'})
+        assert sub.get(timeout=2) == {'notification_id': 1, 'title': 'hi'}
+        assert sub.get(timeout=0.1) is None
+    finally:
+        worker_a.close()
+        worker_b.close()
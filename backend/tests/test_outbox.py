@@ -0,0 +1,153 @@
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+
+from app import outbox
+from app.executor import TaskExecutor
+from app.models import OutboxMessage
+
+
+class RecordingCelery:
+    def __init__(self, fail=()):
+        self.sent = []
+        self.fail = set(fail)
+
+    def send_task(self, name, args=(), kwargs=None, **options):
+        if name in self.fail:
+            raise ConnectionError('broker down')
+        self.sent.append((name, args, kwargs))
+
+
+def test_tasks_are_written_with_the_transaction(app, db_session):
+    app.celery = RecordingCelery()
+    outbox.enqueue('app.tasks.send_email', args=['a@example.com', 'Kept', 'body'])
+    db_session.commit()
+    outbox.enqueue('app.tasks.send_email', args=['b@example.com', 'Rolled back', 'body'])
+    db_session.rollback()
+
+    assert OutboxMessage.query.count() == 1
+    assert app.celery.sent == []
+    assert outbox.drain() == 1
+    assert app.celery.sent == [('app.tasks.send_email', ['a@example.com', 'Kept', 'body'], None)]
+
+    row = OutboxMessage.query.one()
+    assert row.dispatched_at is not None
+    assert row.args is None and row.locked_by is None  # payload (tokens) scrubbed
+    assert outbox.drain() == 0  # nothing is published twice
+
+    assert outbox.purge(retention=0, now=datetime.now(timezone.utc) + timedelta(seconds=1)) == 1
+    assert OutboxMessage.query.count() == 0
+
+
+def test_failed_publish_backs_off_and_is_retried(app, db_session):
+    app.celery = RecordingCelery(fail={'app.tasks.flaky'})
+    outbox.enqueue('app.tasks.flaky', kwargs={'n': 1})
+    outbox.enqueue('app.tasks.send_email', args=['c@example.com', 'Fine', 'body'])
+    db_session.commit()
+
+    now = datetime.now(timezone.utc)
+    assert outbox.relay_once(now=now) == 1
+    flaky = OutboxMessage.query.filter_by(task_name='app.tasks.flaky').one()
+    assert flaky.attempts == 1 and 'broker down' in flaky.last_error
+    assert flaky.dispatched_at is None and json.loads(flaky.kwargs) == {'n': 1}
+
+    assert outbox.relay_once(now=now) == 0  # still backing off
+    app.celery.fail.clear()
+    assert outbox.relay_once(now=now + timedelta(seconds=5)) == 1
+    assert app.celery.sent[-1] == ('app.tasks.flaky', [], {'n': 1})
+
+
+def test_expired_lease_is_claimed_again(app, db_session):
+    app.celery = RecordingCelery()
+    outbox.enqueue('app.tasks.send_email', args=['d@example.com', 'Lost', 'body'])
+    db_session.commit()
+
+    # a relay that claimed the row and died before publishing it
+    now = datetime.now(timezone.utc)
+    assert [row.task_name for row in outbox._claim(10, timedelta(seconds=60), now)] == ['app.tasks.send_email']
+    assert outbox.relay_once(now=now) == 0
+    assert outbox.relay_once(now=now + timedelta(seconds=61)) == 1
+    assert len(app.celery.sent) == 1
+
+
+def test_rows_are_given_up_after_max_attempts(app, db_session):
+    app.celery = RecordingCelery(fail={'app.tasks.unknown'})
+    outbox.enqueue('app.tasks.unknown')
+    db_session.commit()
+
+    now = datetime.now(timezone.utc)
+    for attempt in range(3):
+        assert outbox.relay_once(now=now + timedelta(seconds=600 * attempt), max_attempts=3) == 0
+    row = OutboxMessage.query.one()
+    assert row.attempts == 3 and row.failed_at is not None and row.locked_until is None
+    # no longer claimed, however long we wait
+    app.celery.fail.clear()
+    assert outbox.relay_once(now=now + timedelta(days=1), max_attempts=3) == 0
+    assert app.celery.sent == []
+
+
+def test_executor_rows_are_settled_only_when_the_task_ran(app, db_session):
+    first = app.celery = TaskExecutor(app, workers=1)
+    calls = []
+
+    @first.task(name='app.tasks.later', bind=True)
+    def later(self, n):
+        calls.append(n)
+        self.retry(countdown=60)  # still pending when the process exits
+
+    outbox.enqueue('app.tasks.later', args=[1])
+    db_session.commit()
+    now = datetime.now(timezone.utc)
+    assert outbox.relay_once(now=now) == 1
+    # handed over but not acknowledged: a relay that re-claims it does not queue it twice
+    assert outbox.relay_once(now=now + timedelta(seconds=61)) == 1
+    assert first.stats()['submitted'] == 1
+    first.shutdown(timeout=5)
+    row = OutboxMessage.query.one()
+    assert row.dispatched_at is None and row.args is not None
+
+    # the next worker picks it up once the lease ran out
+    second = app.celery = TaskExecutor(app, workers=1)
+    ran = threading.Event()
+
+    @second.task(name='app.tasks.later')
+    def later_again(n):
+        calls.append(n)
+        ran.set()
+
+    assert outbox.relay_once(now=now + timedelta(seconds=200)) == 1
+    assert ran.wait(5)
+    assert second.shutdown(timeout=5) == 0
+    db_session.expire_all()
+    row = OutboxMessage.query.one()
+    assert calls == [1, 1]
+    assert row.dispatched_at is not None and row.args is None and row.locked_by is None
+
+
+def test_a_full_executor_defers_rows_without_using_attempts(app, db_session):
+    executor = app.celery = TaskExecutor(app, workers=1, max_queue=1)
+    started, release = threading.Event(), threading.Event()
+
+    @executor.task(name='app.tasks.block')
+    def block():
+        started.set()
+        release.wait(5)
+
+    executor.send_task('app.tasks.block')
+    assert started.wait(5)
+    executor.send_task('app.tasks.block')  # the queue is full now
+    for n in range(3):
+        outbox.enqueue('app.tasks.send_email', args=[f'{n}@example.com', 'Hi', 'body'])
+    db_session.commit()
+
+    now = datetime.now(timezone.utc)
+    for attempt in range(3):
+        assert outbox.relay_once(now=now + timedelta(seconds=10 * attempt), max_attempts=1) == 0
+    rows = OutboxMessage.query.all()
+    assert [(r.attempts, r.failed_at, r.locked_by) for r in rows] == [(0, None, None)] * 3
+    release.set()
+    executor.shutdown(timeout=5)
+
+    app.celery = RecordingCelery()
+    assert outbox.relay_once(now=now + timedelta(seconds=60), max_attempts=1) == 3
+    assert len(app.celery.sent) == 3
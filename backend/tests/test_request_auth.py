@@ -0,0 +1,94 @@
+import jwt
+
+from app.models import Mentor, User
+from app.request_auth import TokenCache
+
+
+def _token(app, **claims):
+    secret = app.config.get('JWT_SECRET') or app.config.get('SECRET_KEY')
+    return jwt.encode(claims, secret, algorithm='HS256')
+
+
+def test_token_cache_lru_and_expiry():
+    now = [1000.0]
+    cache = TokenCache(maxsize=2, clock=lambda: now[0])
+    cache.put('a', {'sub': 1, 'exp': 1010})
+    cache.put('b', {'sub': 2, 'exp': 2000})
+    cache.put('no-exp', {'sub': 3})
+    assert len(cache) == 2
+    assert cache.get('a') == {'sub': 1, 'exp': 1010}  # 'a' is now most recent
+    cache.put('c', {'sub': 4, 'exp': 2000})
+    assert cache.get('b') is None and cache.get('c') is not None
+    now[0] = 1010
+    assert cache.get('a') is None and len(cache) == 1
+
+
+def test_token_decoded_once_and_cached(client, app, db_session, monkeypatch):
+    user = User(name='Tok', email='tok@example.com', password_hash='x', role='mentor')
+    db_session.add(user)
+    db_session.commit()
+    db_session.add(Mentor(mentor_id=user.user_id))
+    db_session.commit()
+    calls = []
+    real_decode = jwt.decode
+    monkeypatch.setattr(jwt, 'decode', lambda *a, **kw: calls.append(1) or real_decode(*a, **kw))
+    headers = {'Authorization': f'Bearer {_token(app, sub=user.user_id, role="mentor", exp=9999999999)}'}
+
+    # one decode for the first request, the second is served from the cache
+    assert client.post('/mentors/dev/become-mentor', headers=headers).status_code == 200
+    assert client.get('/mentors/search', headers=headers).status_code == 200
+    assert len(calls) == 1 and app.token_cache.hits == 1
+
+    assert client.get('/mentors/search').get_json() == {'error': 'missing token'}
+    bad = {'Authorization': f'Bearer {_token(app, sub=user.user_id, exp=1)}'}
+    rv = client.put('/users/me', headers=bad, json={'name': 'x'})
+    assert rv.status_code == 401 and rv.get_json()['details'] == 'Signature has expired'
+
+
+def test_revoked_tokens_are_rejected(client, app, db_session):
+    admin = User(name='Root', email='revoke-admin@example.com', password_hash='x', role='admin')
+    user = User(name='Rev', email='revoke@example.com', password_hash='x')
+    db_session.add_all([admin, user])
+    db_session.commit()
+    old = {'Authorization': f'Bearer {_token(app, sub=user.user_id, role="student", exp=9999999999, tv=0)}'}
+    assert client.get('/mentors/search', headers=old).status_code == 200
+
+    admin_headers = {'Authorization': f'Bearer {_token(app, sub=admin.user_id, role="admin", exp=9999999999, tv=0)}'}
+    rv = client.post(f'/admin/users/{user.user_id}/revoke-tokens', headers=admin_headers)
+    assert rv.get_json()['token_version'] == 1
+
+    # the cached version was replaced on commit, not left to expire
+    assert client.get('/mentors/search', headers=old).status_code == 401
+    new = {'Authorization': f'Bearer {_token(app, sub=user.user_id, role="student", exp=9999999999, tv=1)}'}
+    assert client.get('/mentors/search', headers=new).status_code == 200
+    ghost = {'Authorization': f'Bearer {_token(app, sub=999999, role="student", exp=9999999999, tv=0)}'}
+    assert client.get('/mentors/search', headers=ghost).status_code == 401
+
+
+def test_shared_version_cache_reaches_other_workers():
+    from app.token_revocation import LocalVersionCache, RedisVersionCache, TokenVersions
+
+    class FakeRedis(dict):
+        def get(self, key):
+            return super().get(key)
+
+        def set(self, key, value, ex=None, nx=False):
+            if not (nx and key in self):
+                self[key] = str(value)
+
+    now = [0.0]
+    shared = RedisVersionCache(FakeRedis())
+    loads = []
+
+    def worker():
+        return TokenVersions(LocalVersionCache(ttl=1, clock=lambda: now[0]), shared=shared,
+                             loader=lambda uid: loads.append(uid) or 0)
+
+    a, b = worker(), worker()
+    assert not b.is_revoked({'sub': 7, 'tv': 0})
+    assert not a.is_revoked({'sub': 7, 'tv': 0})
+    assert loads == [7]  # the second worker found the version in the shared cache
+    a.publish(7, 1)
+    assert a.is_revoked({'sub': 7, 'tv': 0})
+    now[0] = 1.5  # b's local entry expires and it picks the new version up from Redis
+    assert b.is_revoked({'sub': 7, 'tv': 0}) and loads == [7]
@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta, timezone
+from app.models import User, Mentor, MentorshipSession
+from app.booking import IntervalIndex
+
+
+def _setup(db_session):
+    mentor_user = User(name='Mentor', email='book-mentor@example.com', password_hash='x', role='mentor')
+    mentee = User(name='Mentee', email='book-mentee@example.com', password_hash='x')
+    db_session.add_all([mentor_user, mentee])
+    db_session.commit()
+    db_session.add(Mentor(mentor_id=mentor_user.user_id))
+    db_session.commit()
+    return mentor_user.user_id, mentee.user_id
+
+
+def test_interval_index():
+    idx = IntervalIndex([(10, 20), (30, 40)])
+    assert idx.conflict(20, 30) is None
+    assert idx.conflict(15, 16) == (10, 20)
+    assert idx.conflict(5, 11) == (10, 20)
+    assert idx.conflict(39, 50) == (30, 40)
+    assert idx.free_windows(0, 50) == [(0, 10), (20, 30), (40, 50)]
+    assert idx.free_windows(15, 35, min_length=10) == [(20, 30)]
+
+
+def test_booking_conflicts_and_availability(client, app, db_session, auth_headers):
+    mentor_id, mentee_id = _setup(db_session)
+    headers = auth_headers(mentee_id)
+    day = datetime(2030, 5, 1, tzinfo=timezone.utc)
+
+    def book(start_h, end_h):
+        return client.post('/sessions/', headers=headers, json={
+            'mentor_id': mentor_id,
+            'start': (day + timedelta(hours=start_h)).isoformat(),
+            'end': (day + timedelta(hours=end_h)).isoformat(),
+        })
+
+    rv = book(9, 10)
+    assert rv.status_code == 201
+    first_id = rv.get_json()['session_id']
+    assert book(11, 12).status_code == 201
+    # touching intervals are fine, overlapping ones are not
+    assert book(10, 11).status_code == 201
+    rv = book(9.25, 9.75)
+    assert rv.status_code == 409
+    assert rv.get_json()['conflict']['session_id'] == first_id
+    assert book(12, 11).status_code == 400
+    assert client.post('/sessions/', headers=headers, json={'mentor_id': 9999, 'start': day.isoformat(),
+                                                            'end': (day + timedelta(hours=1)).isoformat()}).status_code == 404
+
+    rv = client.get(f'/sessions/availability/{mentor_id}', query_string={
+        'from': (day + timedelta(hours=8)).isoformat(),
+        'to': (day + timedelta(hours=14)).isoformat(),
+        'slot_minutes': 60,
+    })
+    free = [(f['start'][11:16], f['end'][11:16]) for f in rv.get_json()['free']]
+    assert free == [('08:00', '09:00'), ('12:00', '13:00'), ('13:00', '14:00')]
+
+    # cancelling frees the slot again
+    assert client.post(f'/sessions/{first_id}/cancel', headers=headers).status_code == 200
+    assert book(9.5, 10).status_code == 201
+    assert MentorshipSession.query.filter_by(mentor_id=mentor_id, status='confirmed').count() == 3
+
+
+def test_mentor_stats_are_maintained_incrementally(client, app, db_session, auth_headers):
+    from app import db
+    from app.mentor_stats import reconcile
+    mentor_id, mentee_id = _setup(db_session)
+    other = User(name='Other', email='book-other@example.com', password_hash='x')
+    db_session.add(other)
+    db_session.commit()
+    day = datetime(2030, 6, 1, tzinfo=timezone.utc)
+    ids = []
+    for hour, who in ((9, mentee_id), (10, mentee_id), (11, other.user_id)):
+        rv = client.post('/sessions/', headers=auth_headers(who), json={
+            'mentor_id': mentor_id, 'start': (day + timedelta(hours=hour)).isoformat(),
+            'end': (day + timedelta(hours=hour + 1)).isoformat()})
+        ids.append(rv.get_json()['session_id'])
+
+    from app.content_versions import get_version
+    version = get_version(db_session, 'mentors')
+    mentor_headers = auth_headers(mentor_id, role='mentor')
+    for session_id in ids:
+        assert client.post(f'/sessions/{session_id}/complete', headers=mentor_headers).status_code == 200
+    # the stats are listed in the directory, so each completion moves its version
+    assert get_version(db_session, 'mentors') == version + 3
+    # completing twice is a no-op
+    client.post(f'/sessions/{ids[0]}/complete', headers=mentor_headers)
+    assert client.post(f'/sessions/{ids[0]}/review', headers=auth_headers(mentee_id), json={'rating': 5}).status_code == 200
+    assert client.post(f'/sessions/{ids[0]}/review', headers=auth_headers(mentee_id), json={'rating': 1}).status_code == 400
+    assert client.post(f'/sessions/{ids[1]}/review', headers=auth_headers(mentee_id), json={'rating': 6}).status_code == 400
+    assert client.post(f'/sessions/{ids[2]}/review', headers=auth_headers(other.user_id), json={'rating': 2}).status_code == 200
+
+    # completed (and reviewed) sessions stay counted: they cannot be cancelled any more
+    rv = client.post(f'/sessions/{ids[0]}/cancel', headers=auth_headers(mentee_id))
+    assert rv.status_code == 409
+    assert rv.get_json()['error'] == 'cannot cancel a completed session'
+
+    db_session.expire_all()
+    m = Mentor.query.get(mentor_id)
+    assert (m.sessions_completed, m.total_mentees, m.rating_count) == (3, 2, 2)
+    assert m.rating == 3.5
+    assert reconcile() == []
+
+    # drift introduced behind the counters' back is reported and repaired
+    db.session.execute(Mentor.__table__.update().values(sessions_completed=10, rating=4.9))
+    db.session.commit()
+    drift = reconcile(fix=True)
+    assert {(d['field'], d['actual']) for d in drift} == {('sessions_completed', 3), ('rating', 3.5)}
+    assert reconcile() == []
+
+
+def test_concurrent_complete_and_review_count_once(app, db_session):
+    import pytest
+    from sqlalchemy.orm.attributes import set_committed_value
+    from app.mentor_stats import StatsError, complete_session, review_session
+    mentor_id, mentee_id = _setup(db_session)
+    s = MentorshipSession(mentor_id=mentor_id, mentee_id=mentee_id, status='confirmed')
+    db_session.add(s)
+    db_session.commit()
+
+    assert complete_session(s) is True
+    db_session.commit()
+    # a second request that loaded the session before the first one committed
+    set_committed_value(s, 'status', 'confirmed')
+    assert complete_session(s) is False
+    db_session.commit()
+
+    review_session(s, 4)
+    db_session.commit()
+    set_committed_value(s, 'rating', None)
+    with pytest.raises(StatsError):
+        review_session(s, 2)
+    db_session.rollback()
+
+    m = db_session.get(Mentor, mentor_id)
+    assert (m.sessions_completed, m.total_mentees, m.rating_sum, m.rating_count) == (1, 1, 4, 1)
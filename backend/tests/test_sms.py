@@ -0,0 +1,63 @@
+from app.sms import RateLimiter, SMSDispatcher, TwilioProvider
+from scripts.sms_standin import SMSStandIn
+
+
+def test_bulk_send_reuses_connections_and_tracks_failures():
+    server = SMSStandIn(replies={'+15550000400': 400, '+15550000429': 429}).start()
+    try:
+        provider = TwilioProvider('AC123', 'secret', '+15559990000', base_url=server.base_url)
+        sms = SMSDispatcher(provider, concurrency=4)
+        messages = [{'to': f'+1555100{i:04d}', 'body': f'hello {i}'} for i in range(40)]
+        messages += [{'to': '+15550000400', 'body': 'bad number'}, {'to': '+15550000429', 'body': 'throttled'}]
+        result = sms.send_bulk(messages)
+        assert result['sent'] == 40
+        assert [m['to'] for m, _ in result['failed']] == ['+15550000400']
+        assert [m['to'] for m in result['retry']] == ['+15550000429']
+        assert sorted(m['body'] for m in server.messages) == sorted(f'hello {i}' for i in range(40))
+        # one keep-alive connection per pooled session, not one per message
+        assert server.connections <= 4
+        sms.send('+15551234567', 'single')
+        assert server.connections <= 4
+        sms.close()
+    finally:
+        server.stop()
+
+
+def test_rate_limiter_spaces_permits():
+    now = [0.0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    limiter = RateLimiter(rate=10, burst=2, clock=lambda: now[0], sleep=sleep)
+    for _ in range(6):
+        limiter.acquire()
+    # two from the burst, then one every 100 ms
+    assert round(now[0], 3) == 0.4
+
+
+def test_accepted_reply_without_json_counts_as_sent():
+    class Reply:
+        status_code = 201
+        text = 'Created'
+
+        def json(self):
+            raise ValueError('not JSON')
+
+    class Session:
+        def post(self, url, **kwargs):
+            return Reply()
+
+    provider = TwilioProvider('AC123', 'secret', '+15559990000')
+    assert provider.send(Session(), '+15551234567', 'hi', timeout=1) is None
+
+    class Broken:
+        name = 'broken'
+
+        def send(self, session, to, body, timeout):
+            if to.endswith('2'):
+                raise KeyError('sid')
+            return 'SM1'
+
+    result = SMSDispatcher(Broken(), concurrency=2).send_bulk([{'to': f'+1555000000{i}', 'body': 'x'} for i in range(4)])
+    assert result['sent'] == 3 and [m['to'] for m in result['retry']] == ['+15550000002']
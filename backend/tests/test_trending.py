@@ -0,0 +1,100 @@
+import pytest
+from app.models import BlogPost, TrendingScore
+from app.trending import TrendingTracker, snapshot, load_snapshot
+
+
+def test_scores_decay_with_half_life():
+    tracker = TrendingTracker(half_life=100, clock=lambda: 0.0)
+    tracker.record(1, at=0)
+    tracker.record(2, at=100)
+    assert tracker.score(1, at=100) == pytest.approx(0.5)
+    assert tracker.score(2, at=200) == pytest.approx(0.5)
+    # the newer event wins although both posts have one view
+    assert [p for p, _ in tracker.top(2, at=100)] == [2, 1]
+
+
+def test_leaderboard_is_exact_and_bounded():
+    tracker = TrendingTracker(half_life=3600, capacity=3, clock=lambda: 0.0)
+    for post_id, views in [(1, 5), (2, 1), (3, 3), (4, 2), (5, 4)]:
+        for _ in range(views):
+            tracker.record(post_id, at=0)
+    assert [p for p, _ in tracker.top(3, at=0)] == [1, 5, 3]
+    # a post outside the board re-enters once it overtakes the minimum
+    for _ in range(5):
+        tracker.record(2, at=0)
+    assert [p for p, _ in tracker.top(3, at=0)] == [2, 1, 5]
+
+
+def test_rescale_keeps_order():
+    tracker = TrendingTracker(half_life=1, clock=lambda: 0.0)
+    tracker.record(1, weight=2, at=0)
+    tracker.record(2, weight=1, at=0)
+    tracker.record(3, weight=1000, at=1000)  # forces a rescale
+    assert [p for p, _ in tracker.top(3, at=1000)] == [3]
+    assert tracker.score(3, at=1001) == pytest.approx(500)
+
+
+def test_trending_endpoint_and_snapshot(client, app, db_session):
+    posts = [BlogPost(author_id=1, title=f'P{i}', content='x', status='published') for i in range(3)]
+    db_session.add_all(posts)
+    db_session.commit()
+    ids = [p.post_id for p in posts]
+
+    for post_id, views in zip(ids, (1, 3, 2)):
+        for _ in range(views):
+            client.get(f'/blogs/{post_id}')
+    client.post('/analytics/log', json={'action': 'blog_share', 'metadata': {'post_id': ids[0]}})
+
+    data = client.get('/blogs/trending?limit=2').get_json()
+    assert [i['post_id'] for i in data] == [ids[0], ids[1]]
+
+    assert snapshot(app.trending) == 3
+    fresh = TrendingTracker()
+    load_snapshot(fresh)
+    assert [p for p, _ in fresh.top(3)] == [ids[0], ids[1], ids[2]]
+
+
+def test_snapshots_of_several_workers_add_up(app, db_session):
+    posts = [BlogPost(author_id=1, title=f'W{i}', content='x', status='published') for i in range(2)]
+    db_session.add_all(posts)
+    db_session.commit()
+    a, b = (p.post_id for p in posts)
+
+    now = 1_000_000.0
+    first, second = (TrendingTracker(half_life=100, clock=lambda: now) for _ in range(2))
+    first.record(a, weight=2)
+    second.record(a, weight=3)
+    second.record(b, weight=1)
+    assert snapshot(first) == 1
+    assert snapshot(second) == 2
+    assert snapshot(second) == 0  # nothing new since
+
+    # a worker's later events are added, not written over the others
+    now += 100
+    first.record(a, weight=1)
+    assert snapshot(first) == 1
+    stored = {row.post_id: row.score for row in TrendingScore.query}
+    assert stored[a] == pytest.approx(5 * 0.5 + 1)
+    assert stored[b] == pytest.approx(1)
+
+    # each snapshot re-seeds the worker, so both rank by the events of both
+    assert snapshot(second) == 0
+    assert first.score(a) == pytest.approx(second.score(a)) == pytest.approx(3.5)
+    assert second.score(b) == pytest.approx(0.5)
+
+
+def test_decayed_posts_are_dropped(app, db_session):
+    posts = [BlogPost(author_id=1, title=f'D{i}', content='x', status='published') for i in range(2)]
+    db_session.add_all(posts)
+    db_session.commit()
+    old, new = (p.post_id for p in posts)
+
+    now = 1_000_000.0
+    tracker = TrendingTracker(half_life=100, clock=lambda: now)
+    tracker.record(old)
+    snapshot(tracker)
+    now += 100 * 20  # about 1e-6 of the original weight is left
+    tracker.record(new)
+    snapshot(tracker)
+    assert len(tracker) == 1 and tracker.top(2) == [(new, pytest.approx(1))]
+    assert [row.post_id for row in TrendingScore.query] == [new]
@@ -4,11 +4,14 @@ import tempfile
 from app import create_app, db
 
 
-def test_file_upload_and_use():
+def test_file_upload_and_use(tmp_path):
     db_fd, db_path = tempfile.mkstemp()
     os.environ['DATABASE_URL'] = 'sqlite:///' + db_path
     app = create_app()
     app.config['TESTING'] = True
+    # keep uploads out of the source tree
+    app.instance_path = str(tmp_path)
+    app.config['UPLOAD_DIR'] = str(tmp_path / 'uploads')
 
     with app.test_client() as client:
         with app.app_context():